@@ -186,6 +186,25 @@ MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
 
+# STORAGES
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/ref/settings/#std-setting-STORAGES
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    # Compressed pull request diffs, see democrasite.webiscite.diffs
+    "diffs": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": env("WEBISCITE_DIFF_ROOT", default=str(BASE_DIR / "diffs"))
+        },
+    },
+}
+
 # TEMPLATES
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#templates
@@ -280,13 +299,17 @@ LOGGING = {
 }
 
 
+# Redis
+# ------------------------------------------------------------------------------
+REDIS_URL = env("REDIS_URL", default="")
+
 # Celery
 # ------------------------------------------------------------------------------
 if USE_TZ:
     # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std:setting-timezone
     CELERY_TIMEZONE = TIME_ZONE
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std:setting-broker_url
-CELERY_BROKER_URL = env("REDIS_URL", default="")
+CELERY_BROKER_URL = REDIS_URL
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std:setting-result_backend
 CELERY_RESULT_BACKEND = CELERY_BROKER_URL
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#result-extended
@@ -421,6 +444,15 @@ WEBISCITE_GITHUB_WEBHOOK_SECRET = env("GITHUB_WEBHOOK_SECRET", default="")
 # User token for requests to Github API
 # https://docs.github.com/en/github/authenticating-to-github/keeping-your-account-and-data-secure/creating-a-personal-access-token
 WEBISCITE_GITHUB_TOKEN = env("GITHUB_TOKEN", default="")
+# Requests per rate limit window that tasks leave unused for other clients of the token
+# https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api
+WEBISCITE_GITHUB_RATE_LIMIT_RESERVE = env.int(
+    "WEBISCITE_GITHUB_RATE_LIMIT_RESERVE", default=100
+)
+# Root of the GitHub REST API, which can be pointed at a local server in tests
+WEBISCITE_GITHUB_API_URL = env(
+    "WEBISCITE_GITHUB_API_URL", default="https://api.github.com"
+)
 # Github repo on which this app operates
 # NOTE: this setting has no effect on the host server, so you can't just change it to
 # host your own repo on my site
@@ -435,3 +467,62 @@ WEBISCITE_NORMAL_MAJORITY = 1 / 2
 WEBISCITE_SUPERMAJORITY = 2 / 3
 # Length, in days, that bills are up for vote
 WEBISCITE_VOTING_PERIOD = 7
+# Interval, in seconds, between checks for bills whose voting period has ended
+WEBISCITE_SUBMIT_INTERVAL = 60
+# Maximum total size, in bytes, of the compressed diffs kept in the "diffs" storage
+WEBISCITE_DIFF_CACHE_SIZE = env.int(
+    "WEBISCITE_DIFF_CACHE_SIZE", default=256 * 1024 * 1024
+)
+# Where live vote tallies are kept: "database" updates the bill on every vote, while
+# "redis" records votes in Redis and periodically flushes them to the database
+WEBISCITE_TALLY_BACKEND = env("WEBISCITE_TALLY_BACKEND", default="database")
+# Interval, in seconds, between reconciliations of pull requests with GitHub, which
+# catch up on any webhooks that were missed
+WEBISCITE_RECONCILE_INTERVAL = 60 * 60
+# Interval, in seconds, between flushes of votes recorded in Redis to the database
+WEBISCITE_TALLY_FLUSH_INTERVAL = 10
+# Time, in seconds, that responses of the bills API are cached for, which limits how
+# long they can be stale after a change that doesn't invalidate them
+WEBISCITE_API_CACHE_TIMEOUT = 60 * 5
+
+# Social
+# ------------------------------------------------------------------------------
+# Interval, in seconds, between recounts of the stored like, repost, reply and follow
+# counts, which repair any that drifted from the rows they count
+SOCIAL_RECOUNT_INTERVAL = 60 * 60 * 24
+
+# Periodic tasks, loaded into the database by django-celery-beat
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    "webiscite-submit-due-bills": {
+        "task": "democrasite.webiscite.tasks.submit_due_bills",
+        "schedule": WEBISCITE_SUBMIT_INTERVAL,
+        # Skip runs that queued up while the workers were busy
+        "options": {"expires": WEBISCITE_SUBMIT_INTERVAL},
+    },
+    "webiscite-retry-submissions": {
+        "task": "democrasite.webiscite.tasks.retry_submissions",
+        "schedule": WEBISCITE_SUBMIT_INTERVAL,
+        "options": {"expires": WEBISCITE_SUBMIT_INTERVAL},
+    },
+    "webiscite-retry-webhook-deliveries": {
+        "task": "democrasite.webiscite.tasks.retry_webhook_deliveries",
+        "schedule": WEBISCITE_SUBMIT_INTERVAL,
+        "options": {"expires": WEBISCITE_SUBMIT_INTERVAL},
+    },
+    "webiscite-reconcile-pull-requests": {
+        "task": "democrasite.webiscite.tasks.reconcile_pull_requests",
+        "schedule": WEBISCITE_RECONCILE_INTERVAL,
+        "options": {"expires": WEBISCITE_RECONCILE_INTERVAL},
+    },
+    "social-recount-counts": {
+        "task": "democrasite.social.tasks.recount_counts",
+        "schedule": SOCIAL_RECOUNT_INTERVAL,
+        "options": {"expires": SOCIAL_RECOUNT_INTERVAL},
+    },
+}
+if WEBISCITE_TALLY_BACKEND == "redis":
+    CELERY_BEAT_SCHEDULE["webiscite-flush-votes"] = {
+        "task": "democrasite.webiscite.tasks.flush_votes",
+        "schedule": WEBISCITE_TALLY_FLUSH_INTERVAL,
+    }
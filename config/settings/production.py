@@ -63,6 +63,7 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
+    "diffs": STORAGES["diffs"],  # noqa: F405
 }
 # MEDIA
 # ------------------------------------------------------------------------------
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.12 on 2026-10-18 01:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_time', models.DateTimeField(help_text='When the note was posted, or reposted if it was reposted')),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='social.note')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='social.person')),
+                ('repost', models.ForeignKey(blank=True, help_text='The repost that put the note on the timeline, if any', null=True, on_delete=django.db.models.deletion.CASCADE, to='social.repost')),
+            ],
+            options={
+                'verbose_name_plural': 'Timeline entries',
+                'indexes': [models.Index(fields=['person', '-order_time'], name='timeline_person_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('person', 'note'), name='unique_timeline_note')],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.12 on 2026-10-18 01:35
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    return Coalesce(
+        models.Subquery(
+            queryset.filter(**{field: models.OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=models.Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+def count_interactions(apps, schema_editor):
+    Note = apps.get_model('social', 'Note')
+    Person = apps.get_model('social', 'Person')
+    Like = apps.get_model('social', 'Like')
+    Repost = apps.get_model('social', 'Repost')
+    Follow = apps.get_model('social', 'Follow')
+
+    Note.objects.update(
+        like_count=_count(Like.objects.all(), 'note'),
+        repost_count=_count(Repost.objects.all(), 'note'),
+        reply_count=_count(Note.objects.all(), 'in_reply_to'),
+    )
+    Person.objects.update(
+        follower_count=_count(Follow.objects.all(), 'following'),
+        following_count=_count(Follow.objects.all(), 'follower'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of likes of the note'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of replies to the note'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='repost_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of reposts of the note'),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of people following the person'),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of people the person follows'),
+        ),
+        migrations.RunPython(count_interactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-18 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_note_stream_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='timeline_status',
+            field=models.CharField(choices=[('missing', 'Not built'), ('queued', 'Queued to be built'), ('built', 'Built')], default='missing', editable=False, help_text="Whether the person's home timeline has been built", max_length=7),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0005_person_timeline_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='timeline_queued_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text="When the person's home timeline was last queued to be built", null=True),
+        ),
+    ]
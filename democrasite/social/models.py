@@ -1,8 +1,13 @@
 """Models for the social app."""
 
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.db import models
+from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from model_utils.models import TimeStampedModel
 from mptt.models import MPTTModel
@@ -11,8 +16,110 @@ from mptt.models import TreeManager
 from simple_history import register
 from simple_history.models import HistoricalRecords
 
+from .pagination import ORDERING
+from .pagination import Position
+from .pagination import page_of
+
 User = get_user_model()
 
+# Toggles a like or repost of a note and updates its count in one statement. The
+# person's row is deleted if there is one and inserted otherwise, and a concurrent
+# insert of the same row is ignored rather than raising an error, so the count is
+# adjusted by what actually happened. Like Note.likes.add() and remove(), this also
+# records the note and its likes and reposts as they now are in its history.
+# {interaction} is "like" or "repost", and {other} is the other one. The history
+# tables and their columns are filled in from _history_tables().
+_INTERACTION_SQL = """
+WITH removed AS (
+    DELETE FROM social_{interaction}
+    WHERE note_id = %(note)s AND person_id = %(person)s
+    RETURNING *
+), added AS (
+    INSERT INTO social_{interaction} (note_id, person_id, created)
+    SELECT %(note)s, %(person)s, %(now)s
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT (person_id, note_id) DO NOTHING
+    RETURNING *
+), note AS (
+    UPDATE social_note SET
+        {interaction}_count = {interaction}_count
+            + (SELECT count(*) FROM added)
+            - (SELECT count(*) FROM removed)
+    WHERE id = %(note)s
+    RETURNING *
+), history AS (
+    INSERT INTO {history_table} ({history_columns}, history_date, history_type)
+    SELECT {history_columns}, %(now)s, '~'
+    FROM note
+    WHERE EXISTS (SELECT 1 FROM added) OR EXISTS (SELECT 1 FROM removed)
+    RETURNING history_id
+), {interaction}_history AS (
+    INSERT INTO {interaction_history_table} ({interaction_columns}, history_id)
+    SELECT i.*, history.history_id
+    FROM history, (
+        SELECT {interaction_columns} FROM social_{interaction}
+        WHERE note_id = %(note)s AND person_id <> %(person)s
+        UNION ALL
+        SELECT {interaction_columns} FROM added
+    ) AS i
+), {other}_history AS (
+    INSERT INTO {other_history_table} ({other_columns}, history_id)
+    SELECT i.*, history.history_id
+    FROM history, (
+        SELECT {other_columns} FROM social_{other} WHERE note_id = %(note)s
+    ) AS i
+)
+SELECT NOT EXISTS (SELECT 1 FROM removed), {interaction}_count FROM note
+"""
+
+# Toggles a follow and updates the counts of both people in one statement, in the
+# same way as _INTERACTION_SQL, recording the follower and who they follow in their
+# history like Person.following.add() and remove().
+_FOLLOW_SQL = """
+WITH removed AS (
+    DELETE FROM social_follow
+    WHERE follower_id = %(follower)s AND following_id = %(following)s
+    RETURNING *
+), added AS (
+    INSERT INTO social_follow (follower_id, following_id, created)
+    SELECT %(follower)s, %(following)s, %(now)s
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT (following_id, follower_id) DO NOTHING
+    RETURNING *
+), difference AS (
+    SELECT (SELECT count(*) FROM added) - (SELECT count(*) FROM removed) AS value
+), person AS (
+    UPDATE social_person SET
+        following_count = following_count
+            + CASE WHEN id = %(follower)s THEN difference.value ELSE 0 END,
+        follower_count = follower_count
+            + CASE WHEN id = %(following)s THEN difference.value ELSE 0 END
+    FROM difference
+    WHERE id IN (%(follower)s, %(following)s)
+    RETURNING social_person.*
+), history AS (
+    INSERT INTO {history_table} ({history_columns}, history_date, history_type)
+    SELECT {history_columns}, %(now)s, '~'
+    FROM person
+    WHERE id = %(follower)s
+        AND (EXISTS (SELECT 1 FROM added) OR EXISTS (SELECT 1 FROM removed))
+    RETURNING history_id
+), follow_history AS (
+    INSERT INTO {follow_history_table} ({follow_columns}, history_id)
+    SELECT f.*, history.history_id
+    FROM history, (
+        SELECT {follow_columns} FROM social_follow
+        WHERE follower_id = %(follower)s AND following_id <> %(following)s
+        UNION ALL
+        SELECT {follow_columns} FROM added
+    ) AS f
+)
+SELECT
+    NOT EXISTS (SELECT 1 FROM removed),
+    (SELECT following_count FROM person WHERE id = %(follower)s),
+    (SELECT follower_count FROM person WHERE id = %(following)s)
+"""
+
 
 class Follow(models.Model):
     """Timestamped record of a person following another"""
@@ -43,16 +150,64 @@ class Follow(models.Model):
         return f"{self.follower} followed {self.following} on {self.created}"
 
 
+def _count(queryset: models.QuerySet, field: str = "note") -> models.Expression:
+    """Count the rows of a queryset filtered by ``<field>=OuterRef("pk")``."""
+    return Coalesce(
+        models.Subquery(
+            queryset.order_by()
+            .values(field)
+            .annotate(count=models.Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
 class PersonManager(models.Manager):
     """Manager for Person model with user prefetched."""
 
     def get_queryset(self):
         return super().get_queryset().select_related("user")
 
+    def recount_follows(self, people: models.QuerySet | None = None) -> int:
+        """Recount the stored follower and following counts of people.
+
+        Args:
+            people (models.QuerySet | None): The people to recount; defaults to all
+                people.
+
+        Returns:
+            int: The number of people whose counts were out of date.
+        """
+        follower_count = _count(
+            Follow.objects.filter(following=models.OuterRef("pk")), "following"
+        )
+        following_count = _count(
+            Follow.objects.filter(follower=models.OuterRef("pk")), "follower"
+        )
+
+        if people is None:
+            people = self.all()
+
+        stale = people.annotate(
+            actual_followers=follower_count, actual_following=following_count
+        ).exclude(
+            follower_count=models.F("actual_followers"),
+            following_count=models.F("actual_following"),
+        )
+        return self.filter(pk__in=stale.values("pk")).update(
+            follower_count=follower_count, following_count=following_count
+        )
+
 
 class Person(TimeStampedModel):
     """A person in the ActivityPub network, linked to a Django User."""
 
+    class TimelineStatus(models.TextChoices):
+        MISSING = "missing", _("Not built")
+        QUEUED = "queued", _("Queued to be built")
+        BUILT = "built", _("Built")
+
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     private_key = models.TextField()
     public_key = models.TextField()
@@ -69,17 +224,61 @@ class Person(TimeStampedModel):
         blank=True,
         help_text=_("People this person is following"),
     )
+    # Counts, only ever changed atomically by follow() and recount_follows()
+    follower_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of people following the person")
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of people the person follows")
+    )
+    # These are only ever changed by timelines.rebuild() and PersonFollowingNotesView
+    timeline_status = models.CharField(
+        max_length=7,
+        choices=TimelineStatus.choices,
+        default=TimelineStatus.MISSING,
+        editable=False,
+        help_text=_("Whether the person's home timeline has been built"),
+    )
+    timeline_queued_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("When the person's home timeline was last queued to be built"),
+    )
 
-    history = HistoricalRecords(m2m_fields=[following])
+    history = HistoricalRecords(
+        m2m_fields=[following],
+        excluded_fields=[
+            "follower_count",
+            "following_count",
+            "timeline_status",
+            "timeline_queued_at",
+        ],
+    )
 
     objects = PersonManager()
 
+    COUNT_FIELDS = ("follower_count", "following_count")
+    TIMELINE_FIELDS = ("timeline_status", "timeline_queued_at")
+
     class Meta:
         verbose_name_plural = _("People")
 
     def __str__(self):
         return self.display_name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # The in-memory counts and timeline status may be stale, so never write
+            # them back
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in (*self.COUNT_FIELDS, *self.TIMELINE_FIELDS)
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def display_name(self):
         """Get the display name for the person.
@@ -113,16 +312,22 @@ class Person(TimeStampedModel):
     def follow(self, person: "Person") -> bool:
         """Toggle whether this person follows another person.
 
+        The follow and the stored counts of both people are updated in a single
+        database round trip, after which this person's ``following_count`` and the
+        other person's ``follower_count`` hold the new counts.
+
         Args:
             person (Person): The person following or unfollowing this person.
         Returns:
             bool: True if the follow was added, False if it was removed.
         """
-        if self.is_following(person):
-            self.following.remove(person)
-            return False
-        self.following.add(person)
-        return True
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _TOGGLE_FOLLOW_SQL,
+                {"follower": self.pk, "following": person.pk, "now": timezone.now()},
+            )
+            following, self.following_count, person.follower_count = cursor.fetchone()
+        return following
 
 
 class Like(models.Model):
@@ -150,27 +355,133 @@ class Repost(models.Model):
     class Meta:
         unique_together = ("person", "note")
         ordering = ["-created"]
+        indexes = [
+            # Used by the keyset pagination of a person's reposts
+            models.Index(
+                fields=("person", "created", "note"), name="repost_person_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f'{self.person} reposted "{self.note}"'
 
 
+def _merge(
+    posts: models.QuerySet,
+    reposts: models.QuerySet,
+    before: Position | None,
+    limit: int | None,
+) -> models.QuerySet:
+    """Merge posts and reposts into a stream, limiting each side before the union."""
+    return (
+        page_of(posts, before, limit)
+        .union(page_of(reposts, before, limit))
+        .order_by(*ORDERING)[:limit]
+    )
+
+
 class NoteManager(TreeManager):
     def get_queryset(self) -> models.QuerySet:
         """Get the queryset for notes, ordered by creation date."""
         return super().get_queryset().order_by(*self.model._meta.ordering)  # noqa: SLF001
 
-    def get_person_notes(self, person: Person) -> models.QuerySet:
+    def annotate_interactions(
+        self, viewer: Person | None, queryset: models.QuerySet | None = None
+    ) -> models.QuerySet:
+        """Annotate notes with what is shown alongside them in lists of notes.
+
+        Notes are annotated with ``viewer_liked`` and ``viewer_reposted`` flags for
+        whether the viewer liked or reposted them, and their counts are stored on
+        them. Their authors and the notes they reply to are selected with them, so a
+        list of notes is displayed with a single query.
+
+        Args:
+            viewer (Person | None): The person viewing the notes, if they have a
+                profile.
+            queryset (models.QuerySet | None): The notes to annotate; defaults to all
+                notes.
+
+        Returns:
+            models.QuerySet[T]: The annotated notes.
+        """
+        if queryset is None:
+            queryset = self.all()
+        if viewer is None:
+            viewer_liked = viewer_reposted = models.Value(value=False)
+        else:
+            viewer_liked = models.Exists(
+                Like.objects.filter(note=models.OuterRef("pk"), person=viewer)
+            )
+            viewer_reposted = models.Exists(
+                Repost.objects.filter(note=models.OuterRef("pk"), person=viewer)
+            )
+
+        return queryset.select_related("author__user", "in_reply_to").annotate(
+            viewer_liked=viewer_liked, viewer_reposted=viewer_reposted
+        )
+
+    def recount_interactions(self, notes: models.QuerySet | None = None) -> int:
+        """Recount the stored like, repost and reply counts of notes.
+
+        Args:
+            notes (models.QuerySet | None): The notes to recount; defaults to all
+                notes.
+
+        Returns:
+            int: The number of notes whose counts were out of date.
+        """
+        like_count = _count(Like.objects.filter(note=models.OuterRef("pk")))
+        repost_count = _count(Repost.objects.filter(note=models.OuterRef("pk")))
+        reply_count = _count(
+            self.model.objects.filter(in_reply_to=models.OuterRef("pk")),
+            "in_reply_to",
+        )
+
+        if notes is None:
+            notes = self.all()
+
+        stale = notes.annotate(
+            actual_likes=like_count,
+            actual_reposts=repost_count,
+            actual_replies=reply_count,
+        ).exclude(
+            like_count=models.F("actual_likes"),
+            repost_count=models.F("actual_reposts"),
+            reply_count=models.F("actual_replies"),
+        )
+        return (
+            self.filter(pk__in=stale.values("pk"))
+            .order_by()
+            .update(
+                like_count=like_count,
+                repost_count=repost_count,
+                reply_count=reply_count,
+            )
+        )
+
+    def get_person_notes(
+        self,
+        person: Person,
+        viewer: Person | None = None,
+        *,
+        before: Position | None = None,
+        limit: int | None = None,
+    ) -> models.QuerySet:
         """Get notes for display on a person's profile page.
 
         This method returns all notes authored by the person as well as all their
         reposts, ordered by their creation or repost time. Reposts are annotated with
         the `reposted_by` and `reposted_at` fields for use in templates. If a user has
         reposted their own note, both the original note and the repost will be included
-        in the results.
+        in the results. Notes are also annotated by :meth:`annotate_interactions`.
 
         Args:
             person (Person): The person whose notes and reposts are to be retrieved.
+            viewer (Person | None): The person viewing the notes, if they have a
+                profile.
+            before (Position | None): Only get the notes after this position, for
+                :mod:`~democrasite.social.pagination`.
+            limit (int | None): The maximum number of notes to get.
 
         Returns:
             models.QuerySet[T]: A queryset of notes and reposts ordered by time.
@@ -186,17 +497,32 @@ class NoteManager(TreeManager):
             repost_time=models.Value(None, output_field=models.DateTimeField()),
             order_time=models.F("created"),
         )
-        return posts.union(reposts).order_by("-order_time")
+        return _merge(
+            self.annotate_interactions(viewer, posts),
+            self.annotate_interactions(viewer, reposts),
+            before,
+            limit,
+        )
 
-    def get_person_following_notes(self, person: Person) -> models.QuerySet:
+    def get_person_following_notes(
+        self,
+        person: Person,
+        *,
+        before: Position | None = None,
+        limit: int | None = None,
+    ) -> models.QuerySet:
         """Get notes from people the person is following.
 
         This method retrieves all notes authored or reposted by people that the
         specified person is following, ordered by the creation or repost time of the
-        notes. This method removes duplicate notes.
+        notes. This method removes duplicate notes. Notes are also annotated by
+        :meth:`annotate_interactions`, with the person as the viewer.
 
         Args:
             person (Person): The person whose following notes are to be retrieved.
+            before (Position | None): Only get the notes after this position, for
+                :mod:`~democrasite.social.pagination`.
+            limit (int | None): The maximum number of notes to get.
 
         Returns:
             models.QuerySet[T]: A queryset of notes and reposts from followed persons,
@@ -231,7 +557,46 @@ class NoteManager(TreeManager):
             order_time=models.F("repost_time"),
         )
 
-        return repost_notes.union(posts).order_by("-order_time")
+        return _merge(
+            self.annotate_interactions(person, posts),
+            self.annotate_interactions(person, repost_notes),
+            before,
+            limit,
+        )
+
+    def get_person_timeline(
+        self,
+        person: Person,
+        *,
+        before: Position | None = None,
+        limit: int | None = None,
+    ) -> models.QuerySet:
+        """Get the notes on a person's home timeline.
+
+        This method reads the :class:`TimelineEntry` objects written for the person as
+        notes are posted and reposted, instead of searching the notes of everyone they
+        follow like :meth:`get_person_following_notes`. Notes are annotated the same
+        way, including by :meth:`annotate_interactions` with the person as the viewer,
+        and only the most recent repost of each note is included.
+
+        Args:
+            person (Person): The person whose timeline is to be retrieved.
+            before (Position | None): Only get the notes after this position, for
+                :mod:`~democrasite.social.pagination`.
+            limit (int | None): The maximum number of notes to get.
+
+        Returns:
+            models.QuerySet[T]: A queryset of the notes on the timeline, ordered by
+            time.
+        """
+        notes = self.annotate_interactions(
+            person, self.filter(timeline_entries__person=person)
+        ).annotate(
+            repost_person=models.F("timeline_entries__repost__person__user__username"),
+            repost_time=models.F("timeline_entries__repost__created"),
+            order_time=models.F("timeline_entries__order_time"),
+        )
+        return page_of(notes, before, limit)
 
 
 class Note(TimeStampedModel, MPTTModel):
@@ -252,9 +617,22 @@ class Note(TimeStampedModel, MPTTModel):
     reposts = models.ManyToManyField(
         Person, through=Repost, related_name="reposts", blank=True
     )
+    # Counts, only ever changed atomically when the note is liked, reposted or replied
+    # to, and by recount_interactions()
+    like_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of likes of the note")
+    )
+    repost_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of reposts of the note")
+    )
+    reply_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of replies to the note")
+    )
 
     objects = NoteManager()
 
+    COUNT_FIELDS = ("like_count", "repost_count", "reply_count")
+
     class MPTTMeta:
         order_insertion_by = ["created"]
         parent_attr = "in_reply_to"
@@ -262,6 +640,13 @@ class Note(TimeStampedModel, MPTTModel):
     class Meta:
         # TODO: determine why queryset ordering is not being applied
         ordering = ["-created"]
+        indexes = [
+            # Used by the keyset pagination of all notes and of a person's notes
+            models.Index(fields=("created", "id"), name="note_created_idx"),
+            models.Index(
+                fields=("author", "created", "id"), name="note_author_created_idx"
+            ),
+        ]
 
     def __str__(self):
         preview_length = 10
@@ -270,6 +655,36 @@ class Note(TimeStampedModel, MPTTModel):
             f"{'...' if len(self.content) > preview_length else ''}"
         )
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            if kwargs.get("update_fields") is None:
+                # The in-memory counts may be stale, so never write them back
+                kwargs["update_fields"] = [
+                    name
+                    for name in self._get_user_field_names()
+                    if name not in self.COUNT_FIELDS
+                ]
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.in_reply_to_id is not None:
+                Note.objects.filter(pk=self.in_reply_to_id).update(
+                    reply_count=models.F("reply_count") + 1
+                )
+
+    def _toggle(self, interaction: str, person: Person) -> bool:
+        """Toggle a like or repost of the note and return whether it was added."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _TOGGLE_SQL[interaction],
+                {"note": self.pk, "person": person.pk, "now": timezone.now()},
+            )
+            added, count = cursor.fetchone()
+        setattr(self, f"{interaction}_count", count)
+        return added
+
     def get_absolute_url(self):
         """Get the URL for the note's detail view.
 
@@ -294,16 +709,15 @@ class Note(TimeStampedModel, MPTTModel):
     def like(self, person: Person) -> bool:
         """Toggle a like on the note for a person.
 
+        The like and the ``like_count`` of the note are updated in a single
+        database round trip, after which ``like_count`` holds the new count.
+
         Args:
             person (Person): The person liking or unliking the note.
         Returns:
             bool: True if the like was added, False if it was removed.
         """
-        if self.liked_by(person):
-            self.likes.remove(person)
-            return False
-        self.likes.add(person)
-        return True
+        return self._toggle("like", person)
 
     def get_repost_url(self):
         return reverse("social:note-repost", kwargs={"pk": self.id})
@@ -321,17 +735,112 @@ class Note(TimeStampedModel, MPTTModel):
     def repost(self, person: Person) -> bool:
         """Toggle a repost on the note for a person.
 
+        The repost and the ``repost_count`` of the note are updated in a single
+        database round trip, after which ``repost_count`` holds the new count.
+
         Args:
             person (Person): The person reposting or un-reposting the note.
         Returns:
             bool: True if the repost was added, False if it was removed.
         """
-        if self.reposted_by(person):
-            self.reposts.remove(person)
-            return False
-        self.reposts.add(person)
-        return True
+        return self._toggle("repost", person)
+
+
+class TimelineEntry(models.Model):
+    """A note on a person's home timeline, written when the note is posted or reposted.
+
+    See :mod:`democrasite.social.timelines`.
+    """
+
+    person = models.ForeignKey(
+        Person, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    note = models.ForeignKey(
+        Note, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    repost = models.ForeignKey(
+        Repost,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text=_("The repost that put the note on the timeline, if any"),
+    )
+    order_time = models.DateTimeField(
+        help_text=_("When the note was posted, or reposted if it was reposted")
+    )
+
+    class Meta:
+        verbose_name_plural = _("Timeline entries")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("person", "note"), name="unique_timeline_note"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("person", "-order_time"), name="timeline_person_time_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f'"{self.note}" on the timeline of {self.person}'
 
 
 # HistoricalRecords field doesn't work on MPTT models (see https://github.com/django-commons/django-simple-history/issues/87)
-register(Note, m2m_fields=["likes", "reposts"])
+register(Note, m2m_fields=["likes", "reposts"], excluded_fields=list(Note.COUNT_FIELDS))
+
+
+def _history_tables(model: type[models.Model], **through_models) -> dict[str, str]:
+    """Get the history tables and columns of a model, to fill in a SQL statement.
+
+    The columns are read from the models simple_history created, so a statement
+    records the same history as the ORM even if which fields are tracked changes.
+
+    Args:
+        model (type[models.Model]): The model whose history is recorded.
+        **through_models (type[models.Model]): The through model of each
+            many-to-many relation whose history is recorded, by name.
+
+    Returns:
+        dict[str, str]: The ``history_table`` and ``history_columns`` of the model, and
+        the ``<name>_history_table`` and ``<name>_columns`` of each relation.
+    """
+    quote_name = connection.ops.quote_name
+
+    def columns(fields) -> str:
+        return ", ".join(quote_name(field.column) for field in fields)
+
+    history_model = model.history.model  # type: ignore[attr-defined]
+    tables = {
+        "history_table": quote_name(history_model._meta.db_table),  # noqa: SLF001
+        "history_columns": columns(history_model.tracked_fields),
+    }
+    for name, through in through_models.items():
+        # The history of a relation is a copy of the rows of its through model
+        through_meta = through._meta  # noqa: SLF001
+        m2m_history_model = apps.get_model(
+            through_meta.app_label,
+            f"Historical{through.__name__}",
+            # Called while the models are loaded, after simple_history created these
+            require_ready=False,
+        )
+        tables[f"{name}_history_table"] = quote_name(
+            m2m_history_model._meta.db_table  # noqa: SLF001
+        )
+        tables[f"{name}_columns"] = columns(through_meta.concrete_fields)
+    return tables
+
+
+#: The statement toggling each interaction with a note
+_TOGGLE_SQL = {
+    interaction: _INTERACTION_SQL.format(
+        interaction=interaction,
+        other=other,
+        **_history_tables(Note, interaction=through, other=other_through),
+    )
+    for interaction, through, other, other_through in (
+        ("like", Like, "repost", Repost),
+        ("repost", Repost, "like", Like),
+    )
+}
+_TOGGLE_FOLLOW_SQL = _FOLLOW_SQL.format(**_history_tables(Person, follow=Follow))
@@ -0,0 +1,83 @@
+"""Keyset pagination of notes.
+
+Lists of notes are streams of posts and reposts, newest first, each annotated with the
+``order_time`` it is shown at. Pages are found by the ``(order_time, id)`` of the last
+note on the previous page rather than by an offset, using the same opaque cursors as
+:mod:`democrasite.webiscite.pagination`. A stream merged from posts and reposts, like
+:meth:`~democrasite.social.models.NoteManager.get_person_notes`, is filtered, ordered
+and limited by :func:`page_of` on each side of the union, so each side reads one page
+from its index instead of the union sorting every note.
+"""
+
+from collections.abc import Callable
+from collections.abc import Iterable
+from datetime import datetime
+
+from django.db import models
+
+from democrasite.webiscite.pagination import KeysetPage
+from democrasite.webiscite.pagination import decode_cursor
+from democrasite.webiscite.pagination import encode_cursor
+
+#: The fields notes are ordered by, newest first
+ORDERING = ("-order_time", "-id")
+#: The number of notes on each page
+PAGE_SIZE = 20
+
+#: The ``(order_time, id)`` of a note, which a page starts after
+type Position = tuple[datetime, int]
+
+
+def page_of(
+    queryset: models.QuerySet, before: Position | None, limit: int | None
+) -> models.QuerySet:
+    """Order notes newest first, and limit them to a page.
+
+    Args:
+        queryset (models.QuerySet): The notes, annotated with their ``order_time``.
+        before (Position | None): The position the page starts after, or None for the
+            first page.
+        limit (int | None): The maximum number of notes, or None for all of them.
+
+    Returns:
+        models.QuerySet: The notes on the page.
+    """
+    queryset = queryset.order_by(*ORDERING)
+    if before is not None:
+        order_time, pk = before
+        # The redundant order_time__lte bounds the index scan, which the OR alone can't
+        queryset = queryset.filter(
+            models.Q(order_time__lt=order_time) | models.Q(id__lt=pk),
+            order_time__lte=order_time,
+        )
+    return queryset[:limit]
+
+
+def paginate(
+    get_notes: Callable[[Position | None, int], Iterable[models.Model]],
+    cursor: str | None,
+    page_size: int,
+) -> KeysetPage:
+    """Return the page of a stream of notes after a cursor.
+
+    Args:
+        get_notes (Callable): Returns the notes after a position, or from the start if
+            it is None, limited to a number of notes and ordered by :data:`ORDERING`.
+        cursor (str | None): The cursor of the page, or None for the first page.
+        page_size (int): The number of notes on each page.
+
+    Returns:
+        KeysetPage: The page.
+
+    Raises:
+        ~democrasite.webiscite.pagination.InvalidCursorError: If the cursor is
+            malformed.
+    """
+    before = None if cursor is None else decode_cursor(cursor)
+
+    # One more than a page is fetched to tell whether there is another page
+    notes = list(get_notes(before, page_size + 1))
+    if len(notes) <= page_size:
+        return KeysetPage(notes, None)
+    last = notes[page_size - 1]
+    return KeysetPage(notes[:page_size], encode_cursor(last.order_time, last.pk))
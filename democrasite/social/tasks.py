@@ -0,0 +1,65 @@
+"""Celery tasks for the social app.
+
+Most of these tasks keep the home timelines in :mod:`democrasite.social.timelines` up
+to date, and are queued by the views once the change they are for is committed.
+:func:`recount_counts` runs periodically to repair the stored counts of notes and
+people.
+"""
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from . import timelines
+from .models import Note
+from .models import Person
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def fan_out_note(note_id: int, person_id: int) -> None:
+    """Write a note to the timelines of the followers of its author or reposter.
+
+    Args:
+        note_id (int): The id of the note that was posted, reposted or un-reposted.
+        person_id (int): The id of the author or reposter of the note.
+    """
+    try:
+        note = Note.objects.get(pk=note_id)
+        person = Person.objects.get(pk=person_id)
+    except (Note.DoesNotExist, Person.DoesNotExist):
+        logger.info("Note %s or person %s no longer exists", note_id, person_id)
+        return
+
+    count = timelines.fan_out(note, person)
+    logger.info("Wrote note %s to %s timelines", note_id, count)
+
+
+@shared_task
+def rebuild_timeline(person_id: int) -> None:
+    """Rebuild the timeline of a person after they follow or unfollow someone.
+
+    Args:
+        person_id (int): The id of the person.
+    """
+    try:
+        person = Person.objects.get(pk=person_id)
+    except Person.DoesNotExist:
+        logger.info("Person %s no longer exists", person_id)
+        return
+
+    count = timelines.rebuild(person)
+    logger.info("Rebuilt the timeline of person %s with %s notes", person_id, count)
+
+
+@shared_task
+def recount_counts() -> None:
+    """Repair the stored like, repost, reply, follower and following counts.
+
+    The counts are kept up to date as notes are liked, reposted and replied to and
+    people are followed, but can drift if the rows they count are changed directly,
+    e.g. when a note or person is deleted.
+    """
+    notes = Note.objects.recount_interactions()
+    people = Person.objects.recount_follows()
+    logger.info("Recounted %s notes and %s people", notes, people)
@@ -1,11 +1,28 @@
 from democrasite.social.models import Note
 from democrasite.social.models import Person
+from democrasite.social.models import TimelineEntry
 from democrasite.users.models import User
 
 from .factories import NoteFactory
 from .factories import PersonFactory
 
 
+def history_snapshot(history, *relations: str) -> dict:
+    """Get a history row and the rows of its relations, without their own ids."""
+    ignored = {"history_id", "history_date", "m2m_history_id"}
+
+    def values(queryset):
+        return [
+            {key: value for key, value in row.items() if key not in ignored}
+            for row in queryset.order_by("pk").values()
+        ]
+
+    (row,) = values(type(history).objects.filter(pk=history.pk))
+    return row | {
+        relation: values(getattr(history, relation)) for relation in relations
+    }
+
+
 class TestFollow:
     def test_str(self, person: Person):
         follower = PersonFactory.create()
@@ -25,6 +42,29 @@ class TestPersonManager:
             p = Person.objects.get(id=person.id)
             assert p.user.username is not None
 
+    def test_recount_follows(self, person: Person):
+        people = PersonFactory.create_batch(2)
+        for other in people:
+            other.follow(person)
+        Person.objects.filter(pk=person.pk).update(follower_count=0)
+        Person.objects.filter(pk=people[0].pk).update(following_count=5)
+
+        assert Person.objects.recount_follows() == len(people)
+
+        person.refresh_from_db()
+        people[0].refresh_from_db()
+        assert person.follower_count == len(people)
+        assert people[0].following_count == 1
+
+    def test_recount_follows_subset(self, person: Person):
+        other = PersonFactory.create()
+        Person.objects.update(follower_count=1)
+
+        assert Person.objects.recount_follows(Person.objects.filter(pk=person.pk)) == 1
+
+        other.refresh_from_db()
+        assert other.follower_count == 1
+
 
 class TestPerson:
     def test_str(self, user: User):
@@ -55,6 +95,71 @@ class TestPerson:
         person.follow(person2)
         assert person2 not in person.following.all()
 
+    def test_follow_counts(self, person: Person):
+        person2 = PersonFactory.create()
+
+        assert person.follow(person2)
+
+        assert (person.following_count, person2.follower_count) == (1, 1)
+        assert (person.follower_count, person2.following_count) == (0, 0)
+
+        assert not person.follow(person2)
+
+        assert (person.following_count, person2.follower_count) == (0, 0)
+
+    def test_follow_queries(self, person: Person, django_assert_num_queries):
+        person2 = PersonFactory.create()
+
+        with django_assert_num_queries(1):
+            person.follow(person2)
+
+    def test_follow_history(self, person: Person):
+        people = PersonFactory.create_batch(2)
+        person.follow(people[0])
+
+        person.follow(people[1])
+
+        history = person.history.latest()
+        assert history.history_type == "~"
+        assert list(history.following.values_list("following", flat=True)) == [
+            p.pk for p in people
+        ]
+
+        person.follow(people[0])
+
+        history = person.history.latest()
+        assert list(history.following.values_list("following", flat=True)) == [
+            people[1].pk
+        ]
+
+    def test_follow_history_matches_orm(self, person: Person):
+        people = PersonFactory.create_batch(2)
+        person.follow(people[0])
+        person.follow(people[1])
+
+        person.follow(people[1])
+        toggled = history_snapshot(person.history.latest(), "following")
+        person.following.add(people[1])
+        person.following.remove(people[1])
+
+        assert history_snapshot(person.history.latest(), "following") == toggled
+
+    def test_follow_self(self, person: Person):
+        assert person.follow(person)
+
+        person.refresh_from_db()
+        assert (person.follower_count, person.following_count) == (1, 1)
+
+    def test_save_keeps_counts(self, person: Person):
+        stale = Person.objects.get(pk=person.pk)
+        PersonFactory.create().follow(person)
+
+        stale.bio = "Updated"
+        stale.save()
+
+        person.refresh_from_db()
+        assert (person.bio, person.follower_count) == ("Updated", 1)
+
 
 class TestLike:
     def test_str(self, note: Note, person: Person):
@@ -72,12 +177,40 @@ class TestRepost:
         )
 
 
+class TestTimelineEntry:
+    def test_str(self, note: Note, person: Person):
+        entry = TimelineEntry(person=person, note=note, order_time=note.created)
+
+        assert str(entry) == f'"{note}" on the timeline of {person}'
+
+
 class TestNoteManager:
     def test_get_queryset(self):
         notes = NoteFactory.create_batch(5)
         # Test reversed sorting
         assert list(Note.objects.all()) == list(reversed(notes))
 
+    def test_annotate_interactions(self, person: Person, note: Note):
+        reply = NoteFactory.create(in_reply_to=note)
+        note.like(person)
+        note.like(note.author)
+        reply.repost(person)
+
+        notes = Note.objects.annotate_interactions(person)
+
+        assert [
+            (n.like_count, n.repost_count, n.viewer_liked, n.viewer_reposted)
+            for n in notes
+        ] == [(0, 1, False, True), (2, 0, True, False)]
+
+    def test_annotate_interactions_no_viewer(self, note: Note, person: Person):
+        note.like(person)
+
+        (annotated,) = Note.objects.annotate_interactions(None)
+
+        assert annotated.like_count == 1
+        assert annotated.viewer_liked is False
+
     def test_get_person_notes(self, person: Person, note: Note):
         notes = NoteFactory.create_batch(3, author=person)
         note.repost(person)
@@ -121,6 +254,20 @@ class TestNoteManager:
         assert repost.repost_person == person2.display_name
         assert repost.repost_time == own_notes[0].repost_set.first().created  # type: ignore[union-attr]
 
+    def test_recount_interactions(self, person: Person, note: Note):
+        note.like(person)
+        note.repost(person)
+        NoteFactory.create(in_reply_to=note)
+        Note.objects.filter(pk=note.pk).update(
+            like_count=0, repost_count=3, reply_count=0
+        )
+
+        assert Note.objects.recount_interactions() == 1
+
+        note.refresh_from_db()
+        assert (note.like_count, note.repost_count, note.reply_count) == (1, 1, 1)
+        assert Note.objects.recount_interactions() == 0
+
 
 class TestNote:
     def test_str_long_content(self):
@@ -153,6 +300,50 @@ class TestNote:
 
         assert person not in note.likes.all()
 
+    def test_like_count(self, note: Note, person: Person):
+        assert note.like(person)
+        assert note.like_count == 1
+
+        assert not note.like(person)
+        assert note.like_count == 0
+
+    def test_like_queries(self, note: Note, person: Person, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            note.like(person)
+
+    def test_like_history(self, note: Note, person: Person):
+        note.repost(note.author)
+        note.like(note.author)
+
+        note.like(person)
+
+        history = note.history.latest()
+        assert history.history_type == "~"
+        assert set(history.likes.values_list("person", flat=True)) == {
+            note.author.pk,
+            person.pk,
+        }
+        assert list(history.reposts.values_list("person", flat=True)) == [
+            note.author.pk
+        ]
+
+        note.like(person)
+
+        history = note.history.latest()
+        assert list(history.likes.values_list("person", flat=True)) == [note.author.pk]
+
+    def test_like_history_matches_orm(self, note: Note, person: Person):
+        note.repost(note.author)
+        note.like(note.author)
+        note.like(person)
+
+        note.like(person)
+        toggled = history_snapshot(note.history.latest(), "likes", "reposts")
+        note.likes.add(person)
+        note.likes.remove(person)
+
+        assert history_snapshot(note.history.latest(), "likes", "reposts") == toggled
+
     def test_get_repost_url(self, note: Note):
         assert note.get_repost_url() == f"/social/notes/{note.id}/repost/"
 
@@ -171,3 +362,26 @@ class TestNote:
         note.repost(person)
 
         assert person not in note.reposts.all()
+
+    def test_repost_count(self, note: Note, person: Person):
+        assert note.repost(person)
+        assert note.repost_count == 1
+
+        assert not note.repost(person)
+        assert note.repost_count == 0
+
+    def test_reply_count(self, note: Note):
+        NoteFactory.create_batch(2, in_reply_to=note)
+
+        note.refresh_from_db()
+        assert note.reply_count == 2  # noqa: PLR2004
+
+    def test_save_keeps_counts(self, note: Note, person: Person):
+        stale = Note.objects.get(pk=note.pk)
+        note.like(person)
+
+        stale.content = "Updated"
+        stale.save()
+
+        note.refresh_from_db()
+        assert (note.content, note.like_count) == ("Updated", 1)
@@ -0,0 +1,87 @@
+from django.db import models
+
+from democrasite.social.models import Note
+from democrasite.social.models import Person
+from democrasite.social.pagination import page_of
+from democrasite.social.pagination import paginate
+
+from .factories import NoteFactory
+
+
+def all_notes(before, limit):
+    return page_of(Note.objects.annotate(order_time=models.F("created")), before, limit)
+
+
+class TestPaginate:
+    def test_first_page(self):
+        notes = NoteFactory.create_batch(3)
+
+        page = paginate(all_notes, None, 2)
+
+        assert page.object_list == [notes[2], notes[1]]
+        assert page.has_next
+
+    def test_last_page(self):
+        notes = NoteFactory.create_batch(2)
+
+        page = paginate(all_notes, None, 2)
+
+        assert page.object_list == [notes[1], notes[0]]
+        assert not page.has_next
+
+    def test_same_order_time(self):
+        notes = NoteFactory.create_batch(5)
+        Note.objects.update(created=notes[0].created)
+
+        first = paginate(all_notes, None, 2)
+        second = paginate(all_notes, first.next_cursor, 2)
+        third = paginate(all_notes, second.next_cursor, 2)
+
+        assert first.object_list + second.object_list + third.object_list == list(
+            reversed(notes)
+        )
+        assert not third.has_next
+
+    def test_stable_when_notes_added(self):
+        notes = NoteFactory.create_batch(3)
+        first = paginate(all_notes, None, 2)
+        NoteFactory.create()
+
+        second = paginate(all_notes, first.next_cursor, 2)
+
+        assert second.object_list == [notes[0]]
+
+    def test_merged_stream(self, person: Person):
+        notes = NoteFactory.create_batch(3, author=person)
+        other_notes = NoteFactory.create_batch(2)
+        for note in [other_notes[0], notes[0], other_notes[1]]:
+            note.repost(person)
+
+        def person_notes(before, limit):
+            return Note.objects.get_person_notes(person, before=before, limit=limit)
+
+        pages = [paginate(person_notes, None, 2)]
+        while pages[-1].has_next:
+            pages.append(paginate(person_notes, pages[-1].next_cursor, 2))
+
+        assert [note for page in pages for note in page.object_list] == list(
+            Note.objects.get_person_notes(person)
+        )
+        assert [len(page.object_list) for page in pages] == [2, 2, 2]
+
+    def test_merged_stream_limited(self, person: Person):
+        notes = NoteFactory.create_batch(3, author=person)
+        notes[0].repost(person)
+
+        page = paginate(
+            lambda before, limit: Note.objects.get_person_notes(
+                person, before=before, limit=limit
+            ),
+            None,
+            2,
+        )
+
+        assert [(note, note.repost_person) for note in page.object_list] == [
+            (notes[0], person.display_name),
+            (notes[2], None),
+        ]
@@ -0,0 +1,48 @@
+from democrasite.social import tasks
+from democrasite.social.models import Note
+from democrasite.social.models import Person
+
+from .factories import NoteFactory
+from .factories import PersonFactory
+
+
+class TestFanOutNote:
+    def test_fan_out_note(self, person: Person, note: Note):
+        person.follow(note.author)
+        Person.objects.filter(pk=person.pk).update(
+            timeline_status=Person.TimelineStatus.BUILT
+        )
+
+        tasks.fan_out_note(note.id, note.author.id)
+
+        assert list(Note.objects.get_person_timeline(person)) == [note]
+
+    def test_deleted(self, note: Note):
+        tasks.fan_out_note(note.id, note.author.id + 1)
+
+
+class TestRebuildTimeline:
+    def test_rebuild_timeline(self, person: Person):
+        note = NoteFactory.create()
+        person.follow(note.author)
+
+        tasks.rebuild_timeline(person.id)
+
+        assert list(Note.objects.get_person_timeline(person)) == [note]
+
+    def test_deleted(self):
+        tasks.rebuild_timeline(PersonFactory.create().id + 1)
+
+
+class TestRecountCounts:
+    def test_recount_counts(self, person: Person, note: Note):
+        note.like(person)
+        person.follow(note.author)
+        Note.objects.update(like_count=0)
+        Person.objects.update(following_count=0)
+
+        tasks.recount_counts()
+
+        note.refresh_from_db()
+        person.refresh_from_db()
+        assert (note.like_count, person.following_count) == (1, 1)
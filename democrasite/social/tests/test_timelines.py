@@ -0,0 +1,186 @@
+from unittest.mock import patch
+
+import pytest
+
+from democrasite.social import timelines
+from democrasite.social.models import Note
+from democrasite.social.models import Person
+from democrasite.social.models import TimelineEntry
+
+from .factories import NoteFactory
+from .factories import PersonFactory
+
+
+def timeline(person: Person) -> list[tuple[int, str | None]]:
+    """The ids of the notes on a person's timeline and who reposted them"""
+    return [
+        (note.id, note.repost_person)
+        for note in Note.objects.get_person_timeline(person)
+    ]
+
+
+class TestFanOut:
+    @pytest.fixture
+    def person(self) -> Person:
+        """A person whose timeline has been built."""
+        return PersonFactory.create(timeline_status=Person.TimelineStatus.BUILT)
+
+    def test_post(self, person: Person):
+        author = PersonFactory.create()
+        person.follow(author)
+        note = NoteFactory.create(author=author)
+
+        assert timelines.fan_out(note, author) == 1
+
+        assert timeline(person) == [(note.id, None)]
+        assert timeline(author) == []
+
+    def test_not_built(self, note: Note):
+        follower = PersonFactory.create()
+        follower.follow(note.author)
+
+        assert timelines.fan_out(note, note.author) == 0
+
+        assert not follower.timeline_entries.exists()
+
+    def test_repost(self, person: Person, note: Note):
+        reposter = PersonFactory.create()
+        person.follow(reposter)
+        note.repost(reposter)
+
+        timelines.fan_out(note, reposter)
+
+        assert timeline(person) == [(note.id, reposter.display_name)]
+
+    def test_repost_replaces_post(self, person: Person, note: Note):
+        reposter = PersonFactory.create()
+        person.follow(note.author)
+        person.follow(reposter)
+        timelines.fan_out(note, note.author)
+        note.repost(reposter)
+
+        timelines.fan_out(note, reposter)
+
+        assert timeline(person) == [(note.id, reposter.display_name)]
+        entry = person.timeline_entries.get()
+        assert entry.order_time == note.repost_set.get().created
+
+    def test_latest_repost(self, person: Person, note: Note):
+        reposters = PersonFactory.create_batch(2)
+        for reposter in reposters:
+            person.follow(reposter)
+            note.repost(reposter)
+
+        # Fanned out in the wrong order
+        timelines.fan_out(note, reposters[1])
+        timelines.fan_out(note, reposters[0])
+
+        assert timeline(person) == [(note.id, reposters[1].display_name)]
+
+    def test_unrepost(self, person: Person, note: Note):
+        reposter = PersonFactory.create()
+        person.follow(note.author)
+        person.follow(reposter)
+        note.repost(reposter)
+        timelines.fan_out(note, reposter)
+
+        note.repost(reposter)
+        timelines.fan_out(note, reposter)
+
+        assert timeline(person) == [(note.id, None)]
+
+    def test_unrepost_not_following_author(self, person: Person, note: Note):
+        reposter = PersonFactory.create()
+        person.follow(reposter)
+        note.repost(reposter)
+        timelines.fan_out(note, reposter)
+
+        note.repost(reposter)
+        timelines.fan_out(note, reposter)
+
+        assert timeline(person) == []
+
+    @patch.object(timelines, "TIMELINE_LENGTH", 2)
+    def test_trimmed(self, person: Person):
+        author = PersonFactory.create()
+        person.follow(author)
+        notes = NoteFactory.create_batch(3, author=author)
+
+        for note in notes:
+            timelines.fan_out(note, author)
+
+        assert timeline(person) == [(notes[2].id, None), (notes[1].id, None)]
+
+    @patch.object(timelines, "FAN_OUT_BATCH_SIZE", 2)
+    def test_batches(self, note: Note):
+        followers = PersonFactory.create_batch(
+            3, timeline_status=Person.TimelineStatus.BUILT
+        )
+        for follower in followers:
+            follower.follow(note.author)
+
+        assert timelines.fan_out(note, note.author) == len(followers)
+
+        assert TimelineEntry.objects.filter(note=note).count() == len(followers)
+
+
+class TestRebuild:
+    def test_matches_following_notes(self, person: Person):
+        # The same notes as TestNoteManager.test_get_person_following_notes
+        person2 = PersonFactory.create()
+        notes = NoteFactory.create_batch(3, author=person2)
+        own_notes = NoteFactory.create_batch(2, author=person)
+        own_notes[0].repost(person2)
+        notes[1].repost(person2)
+        notes[1].repost(person)
+        NoteFactory.create()  # Not followed
+        person.follow(person2)
+
+        assert timelines.rebuild(person) == 4  # noqa: PLR2004
+
+        person.refresh_from_db()
+        assert person.timeline_status == Person.TimelineStatus.BUILT
+        assert [note.id for note in Note.objects.get_person_timeline(person)] == [
+            note.id for note in Note.objects.get_person_following_notes(person)
+        ]
+        assert timeline(person)[1] == (own_notes[0].id, person2.display_name)
+
+    def test_unfollow(self, person: Person, note: Note):
+        person.follow(note.author)
+        timelines.rebuild(person)
+        person.follow(note.author)
+
+        assert timelines.rebuild(person) == 0
+
+        assert timeline(person) == []
+
+    @patch.object(timelines, "TIMELINE_LENGTH", 2)
+    def test_trimmed(self, person: Person):
+        author = PersonFactory.create()
+        notes = NoteFactory.create_batch(3, author=author)
+        notes[0].repost(author)  # The most recent
+        person.follow(author)
+
+        assert timelines.rebuild(person) == 2  # noqa: PLR2004
+
+        assert timeline(person) == [
+            (notes[0].id, author.display_name),
+            (notes[2].id, None),
+        ]
+
+
+class TestTrim:
+    @patch.object(timelines, "TIMELINE_LENGTH", 1)
+    def test_trim(self, person: Person):
+        other = PersonFactory.create()
+        notes = NoteFactory.create_batch(2)
+        for follower in (person, other):
+            TimelineEntry.objects.bulk_create(
+                TimelineEntry(person=follower, note=note, order_time=note.created)
+                for note in notes
+            )
+
+        assert timelines.trim([person.pk]) == 1
+
+        assert timeline(person) == [(notes[1].id, None)]
+        assert other.timeline_entries.count() == len(notes)
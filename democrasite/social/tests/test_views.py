@@ -1,5 +1,6 @@
 import json
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 from django.conf import settings
@@ -12,7 +13,10 @@ from django.http import HttpResponseRedirect
 from django.test import Client
 from django.test import RequestFactory
 from django.urls import reverse
+from django.utils import timezone
 
+from democrasite.social import pagination
+from democrasite.social import timelines
 from democrasite.social import views
 from democrasite.social.models import Note
 from democrasite.social.models import Person
@@ -22,6 +26,25 @@ from .factories import NoteFactory
 from .factories import PersonFactory
 
 
+def interacted_notes(
+    batch_size: int, author: Person, viewer: Person, **kwargs
+) -> list[Note]:
+    """Notes which the viewer and their author have liked and reposted"""
+    notes = NoteFactory.create_batch(batch_size, author=author, **kwargs)
+    for note in notes:
+        for person in (author, viewer):
+            note.like(person)
+            note.repost(person)
+    return notes
+
+
+def viewer_request(rf: RequestFactory, viewer: Person) -> HttpRequest:
+    """A request by the viewer, whose profile isn't loaded yet"""
+    request = rf.get("/fake-url/")
+    request.user = User.objects.get(pk=viewer.user_id)
+    return request
+
+
 class TestNoteListView:
     def test_queryset(self, client: Client):
         batch_size = 3
@@ -35,6 +58,79 @@ class TestNoteListView:
                 "Notes should be sorted descending"
             )
 
+    @pytest.mark.parametrize("batch_size", [1, 10])
+    def test_queries(
+        self,
+        batch_size: int,
+        person: Person,
+        rf: RequestFactory,
+        django_assert_num_queries,
+    ):
+        interacted_notes(batch_size, PersonFactory.create(), person)
+        request = viewer_request(rf, person)
+
+        # The viewer's profile, the site and its social apps (for the login links) and
+        # the notes
+        with django_assert_num_queries(4):
+            response = views.note_list_view(request)
+            response.render()
+
+        notes = response.context_data["object_list"]
+        assert [(n.like_count, n.repost_count) for n in notes] == [(2, 2)] * batch_size
+        assert all(n.viewer_liked and n.viewer_reposted for n in notes)
+
+    @patch.object(views.NoteListView, "page_size", 2)
+    def test_load_more(self, client: Client):
+        notes = NoteFactory.create_batch(3)
+
+        response = client.get(reverse("social:note-list"))
+        page = response.context["page_obj"]
+
+        assert list(response.context["note_list"]) == [notes[2], notes[1]]
+        assert f"?cursor={page.next_cursor}" in response.content.decode()
+
+        response = client.get(reverse("social:note-list"), {"cursor": page.next_cursor})
+
+        assert list(response.context["note_list"]) == [notes[0]]
+        assert not response.context["page_obj"].has_next
+
+    @patch.object(views.NoteListView, "page_size", 1)
+    def test_json(self, client: Client, person: Person):
+        notes = NoteFactory.create_batch(2)
+        notes[1].like(person)
+
+        response = client.get(reverse("social:note-list"), {"format": "json"})
+
+        data = response.json()
+        assert data["results"] == [
+            {
+                "id": notes[1].id,
+                "url": notes[1].get_absolute_url(),
+                "author": notes[1].author.display_name,
+                "content": notes[1].content,
+                "created": notes[1].created.isoformat(),
+                "in_reply_to": None,
+                "likes": 1,
+                "reposts": 0,
+                "replies": 0,
+                "liked": False,
+                "reposted": False,
+                "reposted_by": None,
+                "reposted_at": None,
+            }
+        ]
+
+        response = client.get(data["next"])
+
+        data = response.json()
+        assert [note["id"] for note in data["results"]] == [notes[0].id]
+        assert data["next"] is None
+
+    def test_invalid_cursor(self, client: Client):
+        response = client.get(reverse("social:note-list"), {"cursor": "invalid"})
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
 
 class TestUserProfileMixin:
     def dummy_get_response(self, request: HttpRequest):
@@ -128,9 +224,35 @@ class TestRequirePersonDecorator:
 class TestNoteDetailView:
     def test_view_response(self, note: Note, rf: RequestFactory):
         request = rf.get("/fake-url/")
+        request.user = AnonymousUser()
         response = views.note_detail_view(request, pk=note.id)
         assert response.status_code == HTTPStatus.OK
 
+    @pytest.mark.parametrize("batch_size", [1, 10])
+    def test_queries(
+        self,
+        batch_size: int,
+        person: Person,
+        rf: RequestFactory,
+        django_assert_num_queries,
+    ):
+        author = PersonFactory.create()
+        (parent,) = interacted_notes(1, author, person)
+        (note,) = interacted_notes(1, author, person, in_reply_to=parent)
+        interacted_notes(batch_size, author, person, in_reply_to=note)
+        request = viewer_request(rf, person)
+
+        # The viewer's profile, the note, the site and its social apps, and the note's
+        # ancestors and replies
+        with django_assert_num_queries(6):
+            response = views.note_detail_view(request, pk=note.id)
+            response.render()
+
+        replies = response.context_data["replies"]
+        assert len(replies) == batch_size
+        assert all(reply.viewer_liked for reply in replies)
+        assert response.context_data["ancestors"][0].like_count == 2  # noqa: PLR2004
+
 
 class TestNoteCreateView:
     def test_get(self, person: Person, rf: RequestFactory):
@@ -151,6 +273,23 @@ class TestNoteCreateView:
         assert response.status_code == HTTPStatus.FOUND
         assert response.url == new_note.get_absolute_url()
 
+    @patch.object(views.tasks, "fan_out_note")
+    def test_fan_out(
+        self,
+        mock_fan_out,
+        person: Person,
+        rf: RequestFactory,
+        django_capture_on_commit_callbacks,
+    ):
+        request = rf.post("/fake-url/", {"content": "This is a new note."})
+        request.user = person.user
+
+        with django_capture_on_commit_callbacks(execute=True):
+            views.note_create_view(request)
+
+        note = Note.objects.get()
+        mock_fan_out.delay.assert_called_once_with(note.id, person.id)
+
 
 class TestNoteReplyView:
     def test_get(self, person: Person, note: Note, rf: RequestFactory):
@@ -193,6 +332,23 @@ def test_note_repost_view(note: Note, rf: RequestFactory):
     assert json.loads(response.content)["reposts"] == 1
 
 
+@patch.object(views.tasks, "fan_out_note")
+def test_note_repost_view_fan_out(
+    mock_fan_out,
+    note: Note,
+    person: Person,
+    rf: RequestFactory,
+    django_capture_on_commit_callbacks,
+):
+    request = rf.post("/fake-url/")
+    request.user = person.user
+
+    with django_capture_on_commit_callbacks(execute=True):
+        views.note_repost_view(request, note.id)
+
+    mock_fan_out.delay.assert_called_once_with(note.id, person.id)
+
+
 class TestPersonDetailView:
     def test_get_context_data(self, person: Person, rf: RequestFactory):
         batch_size = 3
@@ -212,6 +368,47 @@ class TestPersonDetailView:
             person.notes.order_by("-created").all()
         )
 
+    def test_json_reposts(self, person: Person, note: Note, client: Client):
+        note.repost(person)
+
+        response = client.get(
+            reverse("social:person-detail", kwargs={"username": person.display_name}),
+            {"format": "json"},
+        )
+
+        (result,) = response.json()["results"]
+        assert result["id"] == note.id
+        assert result["reposted_by"] == person.display_name
+        assert result["reposted_at"] == note.repost_set.get().created.isoformat()
+
+    @pytest.mark.parametrize("batch_size", [1, 10])
+    def test_queries(
+        self,
+        batch_size: int,
+        person: Person,
+        rf: RequestFactory,
+        django_assert_num_queries,
+    ):
+        author = PersonFactory.create()
+        interacted_notes(batch_size, author, person)
+        interacted_notes(batch_size, PersonFactory.create(), author)  # Reposted
+        request = viewer_request(rf, person)
+
+        # The person, the viewer's profile, whether they follow the person, the site
+        # and its social apps, and the notes
+        with (
+            patch.object(views.PersonDetailView, "page_size", 3 * batch_size),
+            django_assert_num_queries(6),
+        ):
+            response = views.person_detail_view(request, username=author.display_name)
+            response.render()
+
+        notes = response.context_data["note_list"]
+        # The author's notes appear again as their reposts
+        assert len(notes) == 3 * batch_size
+        assert all(note.like_count == 2 for note in notes)  # noqa: PLR2004
+        assert sum(note.viewer_liked for note in notes) == 2 * batch_size
+
 
 class TestPersonCreateView:
     def dummy_get_response(self, request: HttpRequest):
@@ -298,7 +495,7 @@ class TestPersonUpdateView:
 
 
 class TestPersonFollowingNotesView:
-    def test_get_queryset(self, person: Person, rf: RequestFactory):
+    def test_get_notes(self, person: Person, rf: RequestFactory):
         person_followed = PersonFactory.create()
         person.follow(person_followed)
 
@@ -310,10 +507,121 @@ class TestPersonFollowingNotesView:
         view = views.PersonFollowingNotesView()
         view.request = request
 
-        queryset = view.get_queryset()
-        assert queryset.count() == 1
-        assert note_from_followed in queryset
-        assert note_from_other not in queryset
+        notes = view.get_notes(None, None)
+        assert notes.count() == 1
+        assert note_from_followed in notes
+        assert note_from_other not in notes
+
+    @patch.object(views.tasks, "rebuild_timeline")
+    def test_get_notes_rebuilds(
+        self,
+        mock_rebuild,
+        person: Person,
+        rf: RequestFactory,
+        django_capture_on_commit_callbacks,
+    ):
+        person.follow(PersonFactory.create())
+        request = rf.get("/fake-url/")
+        request.user = person.user
+        view = views.PersonFollowingNotesView()
+        view.request = request
+
+        with django_capture_on_commit_callbacks(execute=True):
+            view.get_notes(None, None)
+            # Only queued once, even before it runs
+            view.get_notes(None, None)
+
+        mock_rebuild.delay.assert_called_once_with(person.id)
+        person.refresh_from_db()
+        assert person.timeline_status == Person.TimelineStatus.QUEUED
+
+    @patch.object(views.tasks, "rebuild_timeline")
+    def test_get_notes_rebuild_lost(
+        self,
+        mock_rebuild,
+        person: Person,
+        rf: RequestFactory,
+        django_capture_on_commit_callbacks,
+    ):
+        person.follow(PersonFactory.create())
+        request = rf.get("/fake-url/")
+        request.user = person.user
+        view = views.PersonFollowingNotesView()
+        view.request = request
+        with django_capture_on_commit_callbacks(execute=True):
+            view.get_notes(None, None)
+
+        # The rebuild never ran
+        Person.objects.filter(pk=person.pk).update(
+            timeline_queued_at=timezone.now() - timelines.REBUILD_TIMEOUT
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            view.get_notes(None, None)
+
+        assert mock_rebuild.delay.call_count == 2  # noqa: PLR2004
+
+    def test_get_notes_timeline(self, person: Person, rf: RequestFactory):
+        person_followed = PersonFactory.create()
+        person.follow(person_followed)
+        person.timeline_status = Person.TimelineStatus.BUILT
+        person.save(update_fields=["timeline_status"])
+        note_from_followed = NoteFactory(author=person_followed)
+        note_not_fanned_out = NoteFactory(author=person_followed)
+        timelines.fan_out(note_from_followed, person_followed)
+
+        request = rf.get("/fake-url/")
+        request.user = person.user
+        view = views.PersonFollowingNotesView()
+        view.request = request
+
+        notes = view.get_notes(None, 20)
+        assert list(notes) == [note_from_followed]
+        assert note_not_fanned_out not in notes
+
+    @patch.object(timelines, "TIMELINE_LENGTH", 2)
+    def test_get_notes_past_timeline(self, person: Person, rf: RequestFactory):
+        person_followed = PersonFactory.create()
+        person.follow(person_followed)
+        notes = NoteFactory.create_batch(5, author=person_followed)
+        timelines.rebuild(person)
+
+        request = rf.get("/fake-url/")
+        request.user = person.user
+        view = views.PersonFollowingNotesView()
+        view.request = request
+
+        pages = [pagination.paginate(view.get_notes, None, 3)]
+        while pages[-1].has_next:
+            pages.append(pagination.paginate(view.get_notes, pages[-1].next_cursor, 3))
+
+        assert [note for page in pages for note in page.object_list] == list(
+            reversed(notes)
+        )
+
+    @pytest.mark.parametrize("batch_size", [1, 10])
+    def test_queries(
+        self,
+        batch_size: int,
+        person: Person,
+        rf: RequestFactory,
+        django_assert_num_queries,
+    ):
+        author = PersonFactory.create()
+        person.follow(author)
+        timelines.rebuild(person)
+        for note in interacted_notes(batch_size, author, person):
+            timelines.fan_out(note, author)
+        request = viewer_request(rf, person)
+
+        # The viewer's profile, the site and its social apps, the notes on the timeline,
+        # and the notes past the end of it
+        with django_assert_num_queries(5):
+            response = views.person_following_notes_view(request)
+            response.render()
+
+        notes = response.context_data["object_list"]
+        assert [(n.like_count, n.repost_count) for n in notes] == [(2, 2)] * batch_size
+        assert all(n.viewer_liked and n.repost_person for n in notes)
 
 
 def test_person_follow_view(person: Person, rf: RequestFactory):
@@ -325,3 +633,16 @@ def test_person_follow_view(person: Person, rf: RequestFactory):
 
     assert person in person2.followers.all()
     assert json.loads(response.content)["followers"] == 1
+
+
+@patch.object(views.tasks, "rebuild_timeline")
+def test_person_follow_view_rebuild(
+    mock_rebuild, person: Person, rf: RequestFactory, django_capture_on_commit_callbacks
+):
+    request = rf.post("/fake-url/")
+    request.user = person.user
+
+    with django_capture_on_commit_callbacks(execute=True):
+        views.person_follow_view(request, PersonFactory.create().display_name)
+
+    mock_rebuild.delay.assert_called_once_with(person.id)
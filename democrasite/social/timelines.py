@@ -0,0 +1,185 @@
+"""Home timelines, materialized by fan-out on write.
+
+Each person's home timeline, shown by
+:class:`~democrasite.social.views.PersonFollowingNotesView`, is kept as
+:class:`~democrasite.social.models.TimelineEntry` objects, so loading it reads one
+index instead of searching the notes and reposts of everyone they follow. When a note
+is posted or reposted, :func:`~democrasite.social.tasks.fan_out_note` writes it to the
+timelines of the followers of its author or reposter, and when a person follows or
+unfollows someone, :func:`~democrasite.social.tasks.rebuild_timeline` rebuilds their
+timeline from scratch. Notes are only written to timelines that have been built, since
+a person's timeline is otherwise missing the notes from before it was kept, and
+:class:`~democrasite.social.views.PersonFollowingNotesView` queues the first build,
+and queues it again if it hasn't run within :data:`REBUILD_TIMEOUT`.
+Timelines are trimmed to the most recent :data:`TIMELINE_LENGTH` notes.
+
+A note appears on a timeline at most once: as the most recent repost of it by someone
+the person follows, or otherwise as posted by its author.
+"""
+
+from collections.abc import Iterable
+from datetime import timedelta
+from itertools import batched
+
+from django.db import models
+from django.db import transaction
+from django.db.models.functions import RowNumber
+
+from .models import Follow
+from .models import Note
+from .models import Person
+from .models import Repost
+from .models import TimelineEntry
+
+#: The number of notes kept on each timeline
+TIMELINE_LENGTH = 500
+#: The number of followers whose timelines are written at once
+FAN_OUT_BATCH_SIZE = 1000
+#: How long a queued rebuild has to run before it is queued again, in case it was lost
+REBUILD_TIMEOUT = timedelta(minutes=10)
+
+
+def fan_out(note: Note, person: Person) -> int:
+    """Write a note to the timelines of a person's followers.
+
+    Called when the person posts or reposts the note, or removes their repost. Each
+    follower's entry for the note is replaced by the most recent repost of it by
+    someone they follow, or by the note itself if they follow its author, or removed
+    if neither is left. Followers whose timelines haven't been built are skipped.
+
+    Args:
+        note (Note): The note that was posted or reposted.
+        person (Person): The author or reposter of the note.
+
+    Returns:
+        int: The number of followers whose timelines were written.
+    """
+    followers = Follow.objects.filter(
+        following=person, follower__timeline_status=Person.TimelineStatus.BUILT
+    ).values_list("follower_id", flat=True)
+    count = 0
+    for batch in batched(followers.iterator(), FAN_OUT_BATCH_SIZE):
+        _write_note(note, batch)
+        count += len(batch)
+    return count
+
+
+@transaction.atomic
+def _write_note(note: Note, person_ids: Iterable[int]) -> None:
+    """Write the entries for a note on the timelines of some people."""
+    reposts = list(
+        Repost.objects.filter(note=note)
+        .order_by("-created")
+        .values_list("pk", "person_id", "created")
+    )
+    sources = {note.author_id} | {person_id for __, person_id, __ in reposts}
+    followed: dict[int, set[int]] = {person_id: set() for person_id in person_ids}
+    for follower_id, following_id in Follow.objects.filter(
+        follower_id__in=followed, following_id__in=sources
+    ).values_list("follower_id", "following_id"):
+        followed[follower_id].add(following_id)
+
+    entries = []
+    for person_id, following in followed.items():
+        # The most recent repost by someone the person follows, if any
+        repost = next((r for r in reposts if r[1] in following), None)
+        if repost is not None:
+            repost_id, __, order_time = repost
+            entries.append(
+                TimelineEntry(
+                    person_id=person_id,
+                    note=note,
+                    repost_id=repost_id,
+                    order_time=order_time,
+                )
+            )
+        elif note.author_id in following:
+            entries.append(
+                TimelineEntry(person_id=person_id, note=note, order_time=note.created)
+            )
+
+    TimelineEntry.objects.filter(note=note, person_id__in=followed).exclude(
+        person_id__in=[entry.person_id for entry in entries]
+    ).delete()
+    TimelineEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["person", "note"],
+        update_fields=["repost", "order_time"],
+    )
+    trim(followed)
+
+
+def rebuild(person: Person) -> int:
+    """Rebuild a person's timeline from the notes and reposts of who they follow,
+    and mark it built.
+
+    Args:
+        person (Person): The person whose timeline is rebuilt.
+
+    Returns:
+        int: The number of notes on the timeline.
+    """
+    following = person.following.all()
+    posts = list(
+        Note.objects.filter(author__in=following)
+        .order_by("-created")
+        .values_list("pk", "created")[:TIMELINE_LENGTH]
+    )
+    # The latest reposts, and any reposts of the latest posts, which replace them
+    reposts = Repost.objects.filter(person__in=following).filter(
+        models.Q(
+            pk__in=Repost.objects.filter(person__in=following)
+            .order_by("-created")
+            .values("pk")[:TIMELINE_LENGTH]
+        )
+        | models.Q(note__in=[pk for pk, __ in posts])
+    )
+
+    entries: dict[int, TimelineEntry] = {}
+    for repost_id, note_id, created in reposts.order_by("-created").values_list(
+        "pk", "note_id", "created"
+    ):
+        entries.setdefault(
+            note_id,
+            TimelineEntry(
+                person=person, note_id=note_id, repost_id=repost_id, order_time=created
+            ),
+        )
+    for note_id, created in posts:
+        entries.setdefault(
+            note_id, TimelineEntry(person=person, note_id=note_id, order_time=created)
+        )
+    latest = sorted(entries.values(), key=lambda entry: entry.order_time, reverse=True)
+
+    with transaction.atomic():
+        person.timeline_entries.all().delete()
+        TimelineEntry.objects.bulk_create(latest[:TIMELINE_LENGTH])
+        Person.objects.filter(pk=person.pk).update(
+            timeline_status=Person.TimelineStatus.BUILT
+        )
+    person.timeline_status = Person.TimelineStatus.BUILT
+    return min(len(latest), TIMELINE_LENGTH)
+
+
+def trim(person_ids: Iterable[int]) -> int:
+    """Remove all but the most recent :data:`TIMELINE_LENGTH` notes from timelines.
+
+    Args:
+        person_ids (Iterable[int]): The ids of the people whose timelines are trimmed.
+
+    Returns:
+        int: The number of notes removed.
+    """
+    old = (
+        TimelineEntry.objects.filter(person_id__in=list(person_ids))
+        .annotate(
+            rank=models.Window(
+                RowNumber(), partition_by="person", order_by="-order_time"
+            )
+        )
+        .filter(rank__gt=TIMELINE_LENGTH)
+        .values_list("pk", flat=True)
+    )
+    deleted, __ = TimelineEntry.objects.filter(pk__in=list(old)).delete()
+    return deleted
@@ -1,3 +1,6 @@
+from abc import ABC
+from abc import abstractmethod
+from collections.abc import Iterable
 from functools import wraps
 from http import HTTPStatus
 from typing import TYPE_CHECKING
@@ -8,18 +11,26 @@ from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.views import redirect_to_login
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db import models
+from django.db import transaction
 from django.http import HttpRequest
 from django.http import HttpResponseRedirect
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.views.generic import CreateView
 from django.views.generic import DetailView
 from django.views.generic import ListView
 from django.views.generic import UpdateView
 
+from democrasite.webiscite.pagination import InvalidCursorError
+
+from . import pagination
+from . import tasks
+from . import timelines
 from .models import Note
 from .models import Person
 
@@ -27,9 +38,96 @@ if TYPE_CHECKING:
     from django.forms import ModelForm  # pragma: no cover
 
 
-class NoteListView(ListView):
+def get_viewer(request: HttpRequest) -> Person | None:
+    """Get the profile of the user making a request, if they have one."""
+    return getattr(request.user, "person", None)
+
+
+def serialize_note(note: Note) -> dict:
+    """Get the JSON representation of a note in a stream of notes."""
+    return {
+        "id": note.pk,
+        "url": note.get_absolute_url(),
+        "author": note.author.display_name,
+        "content": note.content,
+        "created": note.created.isoformat(),
+        "in_reply_to": note.in_reply_to_id,
+        "likes": note.like_count,
+        "reposts": note.repost_count,
+        "replies": note.reply_count,
+        "liked": note.viewer_liked,
+        "reposted": note.viewer_reposted,
+        "reposted_by": getattr(note, "repost_person", None),
+        "reposted_at": (
+            note.repost_time.isoformat() if getattr(note, "repost_time", None) else None
+        ),
+    }
+
+
+class NoteStreamMixin(ABC):
+    """Paginate a stream of notes by cursor, as HTML or as JSON.
+
+    The notes of the page, from :meth:`get_notes`, are ``note_list``, and the cursor of
+    the next page is ``page_obj.next_cursor``, which is passed back in the ``cursor``
+    query parameter. If the ``format`` query parameter is ``json``, the page is
+    returned as JSON with a link to the next page instead. See
+    :mod:`~democrasite.social.pagination`.
+    """
+
+    page_size = pagination.PAGE_SIZE
+    request: HttpRequest
+
+    @abstractmethod
+    def get_notes(
+        self, before: pagination.Position | None, limit: int
+    ) -> Iterable[Note]:
+        """Get the notes after a position, ordered by ``pagination.ORDERING``."""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)  # type: ignore[misc]
+        try:
+            page = pagination.paginate(
+                self.get_notes, self.request.GET.get("cursor"), self.page_size
+            )
+        except InvalidCursorError as e:
+            raise http.Http404("Invalid cursor") from e
+        context["page_obj"] = page
+        context["note_list"] = page.object_list
+        if "object_list" in context:
+            context["object_list"] = page.object_list
+        return context
+
+    def get_next_url(self, page: pagination.KeysetPage) -> str | None:
+        """Get the absolute URL of the page after a page, if there is one."""
+        if page.next_cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query["cursor"] = page.next_cursor
+        return self.request.build_absolute_uri(f"?{query.urlencode()}")
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get("format") != "json":
+            return super().render_to_response(context, **response_kwargs)  # type: ignore[misc]
+        page = context["page_obj"]
+        return JsonResponse(
+            {
+                "next": self.get_next_url(page),
+                "results": [serialize_note(note) for note in page.object_list],
+            }
+        )
+
+
+class NoteListView(NoteStreamMixin, ListView):
     model = Note
 
+    def get_queryset(self):
+        return Note.objects.annotate_interactions(get_viewer(self.request)).annotate(
+            order_time=models.F("created")
+        )
+
+    def get_notes(self, before, limit):
+        return pagination.page_of(self.get_queryset(), before, limit)
+
 
 note_list_view = NoteListView.as_view()
 
@@ -73,6 +171,20 @@ def require_user_profile(view_func):
 class NoteDetailView(DetailView):
     model = Note
 
+    def get_queryset(self):
+        return Note.objects.annotate_interactions(get_viewer(self.request))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        viewer = get_viewer(self.request)
+        context["ancestors"] = Note.objects.annotate_interactions(
+            viewer, self.object.get_ancestors()
+        )
+        context["replies"] = Note.objects.annotate_interactions(
+            viewer, self.object.get_children()
+        )
+        return context
+
 
 note_detail_view = NoteDetailView.as_view()
 
@@ -93,6 +205,11 @@ class NoteForm(forms.ModelForm):
         fields = ["content"]
 
 
+def fan_out_on_commit(note: Note, person: Person) -> None:
+    """Write a note to the timelines of a person's followers once it is committed."""
+    transaction.on_commit(lambda: tasks.fan_out_note.delay(note.pk, person.pk))
+
+
 class NoteCreateView(UserProfileMixin, CreateView):
     model = Note
     form_class = NoteForm
@@ -100,7 +217,9 @@ class NoteCreateView(UserProfileMixin, CreateView):
     def form_valid(self, form):
         assert self.request.user.is_authenticated  # type guard
         form.instance.author = self.request.user.person
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        fan_out_on_commit(self.object, self.object.author)
+        return response
 
 
 note_create_view = NoteCreateView.as_view()
@@ -114,7 +233,9 @@ class NoteReplyView(UserProfileMixin, CreateView):
         assert self.request.user.is_authenticated  # type guard
         form.instance.author = self.request.user.person
         form.instance.in_reply_to_id = self.kwargs["pk"]
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        fan_out_on_commit(self.object, self.object.author)
+        return response
 
 
 note_reply_view = NoteReplyView.as_view()
@@ -128,7 +249,7 @@ def note_like_view(request: HttpRequest, pk: int) -> http.HttpResponse:
     note = get_object_or_404(Note, pk=pk)
     note.like(request.user.person)
 
-    return http.JsonResponse({"likes": note.likes.count()})
+    return http.JsonResponse({"likes": note.like_count})
 
 
 @require_POST
@@ -138,19 +259,24 @@ def note_repost_view(request: HttpRequest, pk: int) -> http.HttpResponse:
 
     note = get_object_or_404(Note, pk=pk)
     note.repost(request.user.person)
+    fan_out_on_commit(note, request.user.person)
 
-    return http.JsonResponse({"reposts": note.reposts.count()})
+    return http.JsonResponse({"reposts": note.repost_count})
 
 
-class PersonDetailView(DetailView):
+class PersonDetailView(NoteStreamMixin, DetailView):
     model = Person
 
     slug_field = "user__username"
     slug_url_kwarg = "username"
 
+    def get_notes(self, before, limit):
+        return Note.objects.get_person_notes(
+            self.object, get_viewer(self.request), before=before, limit=limit
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["note_list"] = Note.objects.get_person_notes(self.object)
         if hasattr(self.request.user, "person"):
             context["user_following_person"] = self.request.user.person.is_following(
                 self.object
@@ -224,12 +350,44 @@ class PersonUpdateView(UserProfileMixin, UpdateView):
 person_update_view = PersonUpdateView.as_view()
 
 
-class PersonFollowingNotesView(UserProfileMixin, ListView):
+class PersonFollowingNotesView(UserProfileMixin, NoteStreamMixin, ListView):
     model = Note
 
-    def get_queryset(self):
+    def get_notes(self, before, limit):
         assert self.request.user.is_authenticated  # type guard
-        return Note.objects.get_person_following_notes(self.request.user.person)
+        person = self.request.user.person
+        if person.timeline_status == Person.TimelineStatus.BUILT:
+            notes = list(
+                Note.objects.get_person_timeline(person, before=before, limit=limit)
+            )
+            if len(notes) == limit:
+                return notes
+            # The timeline is trimmed, so the notes past its oldest entry are read from
+            # the people the person follows instead
+            if notes:
+                before = (notes[-1].order_time, notes[-1].pk)
+            return notes + list(
+                Note.objects.get_person_following_notes(
+                    person, before=before, limit=limit - len(notes)
+                )
+            )
+
+        # The timeline hasn't been built yet, e.g. if the person followed people before
+        # timelines were kept, so build it for next time, unless that's already queued
+        # and the rebuild could still be running
+        now = timezone.now()
+        if person.following.exists() and Person.objects.filter(
+            models.Q(timeline_status=Person.TimelineStatus.MISSING)
+            | models.Q(
+                timeline_status=Person.TimelineStatus.QUEUED,
+                timeline_queued_at__lt=now - timelines.REBUILD_TIMEOUT,
+            ),
+            pk=person.pk,
+        ).update(timeline_status=Person.TimelineStatus.QUEUED, timeline_queued_at=now):
+            transaction.on_commit(lambda: tasks.rebuild_timeline.delay(person.pk))
+        return Note.objects.get_person_following_notes(
+            person, before=before, limit=limit
+        )
 
 
 person_following_notes_view = PersonFollowingNotesView.as_view()
@@ -243,5 +401,7 @@ def person_follow_view(request: HttpRequest, username: str) -> http.HttpResponse
 
     person = get_object_or_404(Person, user__username=username)
     request.user.person.follow(person)
+    follower_id = request.user.person.pk
+    transaction.on_commit(lambda: tasks.rebuild_timeline.delay(follower_id))
 
-    return JsonResponse({"followers": person.followers.count()})
+    return JsonResponse({"followers": person.follower_count})
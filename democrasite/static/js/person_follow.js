@@ -10,6 +10,7 @@ $(document).ready(function () {
       this.toggleClass("btn-dark");
       this.toggleClass("person-unfollow");
       console.log(this);
+      $(".person-follower-count").text(data["followers"]);
       if (this.hasClass("person-unfollow")) {
         $(this).text(""); // content comes from css
       } else {
@@ -5,7 +5,11 @@ from simple_history.admin import SimpleHistoryAdmin
 
 from .models import Bill
 from .models import PullRequest
+from .models import Submission
+from .models import WebhookDelivery
 
 # Register your models here.
 admin.site.register(Bill, SimpleHistoryAdmin)
 admin.site.register(PullRequest, SimpleHistoryAdmin)
+admin.site.register(Submission)
+admin.site.register(WebhookDelivery)
@@ -0,0 +1,141 @@
+"""Cache of the responses of the bills API
+
+Bills are listed and retrieved far more often than they change, so the responses of
+:class:`~democrasite.webiscite.api.views.BillViewSet` are kept in the default cache
+(Redis in production). The cached responses are shared by every user, as if they were
+anonymous, and each user's votes on the bills in a response are added to it from their
+own cache entries, so ``user_supports`` is right without caching every response for
+every user.
+
+All cached responses are invalidated at once when
+:data:`~democrasite.webiscite.signals.bills_changed` is sent, by changing the version
+in their keys, since a change to one bill can change every page it might be listed
+on. Responses of old versions expire after ``WEBISCITE_API_CACHE_TIMEOUT`` seconds,
+which also limits how stale a response can get after a change the signal isn't sent
+for, such as a pull request being retitled.
+"""
+
+import hashlib
+from collections.abc import Callable
+from collections.abc import Iterable
+from functools import partial
+from typing import Any
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework.request import Request
+
+from democrasite.users.models import User
+from democrasite.webiscite.models import Vote
+from democrasite.webiscite.signals import bills_changed
+
+VERSION_KEY = "webiscite:api:bills:version"
+
+
+def _response_key(request: Request) -> str:
+    version = cache.get_or_set(VERSION_KEY, lambda: uuid4().hex, timeout=None)
+    # Responses contain absolute links, so they are cached by the whole URL
+    url = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    return f"webiscite:api:bills:{version}:{url}"
+
+
+def _vote_key(user_id: int, bill_id: int) -> str:
+    return f"webiscite:api:votes:{user_id}:{bill_id}"
+
+
+def get_or_set_response[T](
+    request: Request, default: Callable[[], tuple[T, list[int]]]
+) -> tuple[T, list[int]]:
+    """Return the cached response data for a request, or cache it if there is none
+
+    Args:
+        request: The request, whose response must not depend on the user
+        default: Returns the response data and the ids of the bills in it, in order,
+            if they aren't cached
+
+    Returns:
+        The response data and the ids of the bills in it
+    """
+    return cache.get_or_set(
+        _response_key(request), default, settings.WEBISCITE_API_CACHE_TIMEOUT
+    )
+
+
+def user_votes(user: User, bill_ids: list[int]) -> dict[int, bool | None]:
+    """Return the user's vote on each of some bills
+
+    The vote on each bill is cached separately, so only the votes on the bills that
+    aren't cached are read from the database, in one query.
+
+    Args:
+        user: The user
+        bill_ids: The ids of the bills
+
+    Returns:
+        Whether the user supports each bill, or None if they haven't voted on it, by
+        the id of the bill
+    """
+    keys = {_vote_key(user.pk, bill_id): bill_id for bill_id in bill_ids}
+    votes = {keys[key]: support for key, support in cache.get_many(keys).items()}
+
+    missing = [bill_id for bill_id in bill_ids if bill_id not in votes]
+    if missing:
+        found = dict(
+            Vote.objects.filter(user=user, bill_id__in=missing).values_list(
+                "bill_id", "support"
+            )
+        )
+        fetched = {bill_id: found.get(bill_id) for bill_id in missing}
+        cache.set_many(
+            {_vote_key(user.pk, bill_id): vote for bill_id, vote in fetched.items()},
+            settings.WEBISCITE_API_CACHE_TIMEOUT,
+        )
+        votes |= fetched
+    return votes
+
+
+def add_user_votes(
+    bills: list[dict[str, Any]], bill_ids: list[int], user: User | AnonymousUser
+) -> list[dict[str, Any]]:
+    """Set ``user_supports`` in the cached representations of bills
+
+    Args:
+        bills: The representations of the bills
+        bill_ids: The ids of the bills
+        user: The user making the request
+
+    Returns:
+        Copies of the representations with the user's votes, or the representations
+        themselves if the user isn't authenticated
+    """
+    if not user.is_authenticated:
+        return bills
+    votes = user_votes(user, bill_ids)
+    return [
+        {**bill, "user_supports": votes.get(bill_id)}
+        for bill, bill_id in zip(bills, bill_ids, strict=True)
+    ]
+
+
+def invalidate(bill_ids: Iterable[int] = (), voter_ids: Iterable[int] = ()) -> None:
+    """Invalidate every cached response and the cached votes of some users on some
+    bills
+
+    Args:
+        bill_ids: The ids of the bills that were voted on
+        voter_ids: The ids of the users whose votes changed
+    """
+    cache.set(VERSION_KEY, uuid4().hex, timeout=None)
+    cache.delete_many(
+        [_vote_key(user_id, bill_id) for user_id in voter_ids for bill_id in bill_ids]
+    )
+
+
+@receiver(bills_changed, dispatch_uid="webiscite_api_cache")
+def _bills_changed(sender, bill_ids: list[int], voter_ids=(), **kwargs) -> None:
+    # Invalidating before the change is committed would let it be cached again unchanged
+    transaction.on_commit(partial(invalidate, list(bill_ids), list(voter_ids)))
@@ -0,0 +1,64 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from democrasite.webiscite import pagination
+
+
+class BillCursorPagination(BasePagination):
+    """Paginate bills by a cursor on ``(created, id)``
+
+    Unlike :class:`rest_framework.pagination.CursorPagination`, which finds its
+    position by the first ordering field and an offset among bills created at the same
+    time, the cursor holds both fields. See :mod:`~democrasite.webiscite.pagination`.
+    """
+
+    page_size = pagination.PAGE_SIZE
+    cursor_query_param = "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = pagination.paginate(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.page_size,
+            )
+        except pagination.InvalidCursorError as e:
+            raise NotFound("Invalid cursor") from e
+        return self.page.object_list
+
+    def get_next_link(self) -> str | None:
+        if self.page.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.page.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The cursor of the page, from the previous page's "
+                "next link",
+                "schema": {"type": "string"},
+            }
+        ]
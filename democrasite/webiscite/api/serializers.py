@@ -1,5 +1,3 @@
-from typing import TYPE_CHECKING
-
 from rest_framework.serializers import CharField
 from rest_framework.serializers import HyperlinkedModelSerializer
 from rest_framework.serializers import IntegerField
@@ -10,9 +8,6 @@ from democrasite.users.api.serializers import UserSerializer
 from democrasite.webiscite.models import Bill
 from democrasite.webiscite.models import PullRequest
 
-if TYPE_CHECKING:
-    from democrasite.users.models import User  # pragma: no cover
-
 
 class PullRequestSerializer(ModelSerializer):
     class Meta:
@@ -33,19 +28,20 @@ class BillSerializer(HyperlinkedModelSerializer):
     pull_request = PullRequestSerializer(read_only=True)
     status = CharField(read_only=True, source="get_status_display")
 
-    yes_votes = IntegerField(read_only=True, source="yes_votes.count")
-    no_votes = IntegerField(read_only=True, source="no_votes.count")
+    yes_votes = IntegerField(read_only=True, source="yes_count")
+    no_votes = IntegerField(read_only=True, source="no_count")
     user_supports = SerializerMethodField(required=False)
 
     class Meta:
         model = Bill
-        exclude = ["votes", "modified", "_submit_task"]
+        exclude = ["votes", "modified", "yes_count", "no_count"]
         read_only_fields = [
             "author",
             "pull_request",
             "status",
             "constitutional",
             "created",
+            "voting_ends_at",
             "yes_votes",
             "no_votes",
             "user_supports",
@@ -55,10 +51,15 @@ class BillSerializer(HyperlinkedModelSerializer):
         """Return whether the user supports the bill. If the user is not authenticated
         or has not voted on this bill, return None.
 
+        The representations of bills are cached and shared by every user, so this is
+        None unless the bill has the ``user_vote`` annotation added by
+        :meth:`~democrasite.webiscite.managers.BillManager.annotate_user_vote`. The
+        API adds the user's votes to each response with
+        :func:`~democrasite.webiscite.api.cache.add_user_votes`.
+
         Args:
             bill: The bill to check
 
         Returns:
             Whether the user supports the bill, or None if not applicable"""
-        user: User = self.context["user"]
-        return bill.user_supports(user) if user.is_authenticated else None
+        return getattr(bill, "user_vote", None)
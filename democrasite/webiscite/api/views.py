@@ -1,3 +1,5 @@
+from typing import Any
+
 from drf_spectacular.utils import extend_schema
 from drf_spectacular.utils import extend_schema_view
 from drf_spectacular.utils import inline_serializer
@@ -18,7 +20,10 @@ from rest_framework.viewsets import GenericViewSet
 
 from democrasite.webiscite.models import Bill
 from democrasite.webiscite.models import ClosedBillVoteError
+from democrasite.webiscite.signals import bills_changed
 
+from . import cache
+from .pagination import BillCursorPagination
 from .serializers import BillSerializer
 
 
@@ -55,11 +60,40 @@ class BillViewSet(RetrieveModelMixin, ListModelMixin, UpdateModelMixin, GenericV
     serializer_class = BillSerializer
     queryset = Bill.objects.all()
     permission_classes = [IsAuthorOrReadOnly]
+    pagination_class = BillCursorPagination
+
+    def _list_data(self) -> tuple[dict[str, Any], list[int]]:
+        bills = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        serializer = self.get_serializer(bills, many=True)
+        data = self.get_paginated_response(serializer.data).data
+        return data, [bill.pk for bill in bills]
+
+    def _retrieve_data(self) -> tuple[dict[str, Any], list[int]]:
+        bill = self.get_object()
+        return self.get_serializer(bill).data, [bill.pk]
+
+    # Responses are cached without the user's votes, which are added to them after, as
+    # they are to the response of an update
+    def list(self, request: Request, *args, **kwargs):
+        data, bill_ids = cache.get_or_set_response(request, self._list_data)
+        results = cache.add_user_votes(data["results"], bill_ids, request.user)
+        return Response({**data, "results": results})
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["user"] = self.request.user
-        return context
+    def retrieve(self, request: Request, *args, **kwargs):
+        data, bill_ids = cache.get_or_set_response(request, self._retrieve_data)
+        return Response(cache.add_user_votes([data], bill_ids, request.user)[0])
+
+    def update(self, request: Request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        bill_id = int(self.kwargs[self.lookup_field])
+        response.data = cache.add_user_votes([response.data], [bill_id], request.user)[
+            0
+        ]
+        return response
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bills_changed.send(sender=Bill, bill_ids=[serializer.instance.pk])
 
     @action(detail=True, methods=("post",), permission_classes=(IsAuthenticated,))
     def vote(self, request: Request, pk):
@@ -84,7 +118,4 @@ class BillViewSet(RetrieveModelMixin, ListModelMixin, UpdateModelMixin, GenericV
         except ClosedBillVoteError as err:
             raise PermissionDenied(str(err)) from err
 
-        bill = Bill.objects.get(pk=pk)
         return Response({"yes_votes": bill.yes_count, "no_votes": bill.no_count})
-
-    # TODO: Prefetch bill list votes
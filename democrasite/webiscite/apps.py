@@ -7,3 +7,6 @@ class WebisciteConfig(AppConfig):
     """Webiscite app definition."""
 
     name = "democrasite.webiscite"
+
+    def ready(self):
+        from .api import cache  # noqa: F401, PLC0415 Connects its signal receivers
@@ -0,0 +1,230 @@
+"""Import the existing pull requests of the repository, e.g. for a new deployment
+
+Pull requests are otherwise only stored when a webhook for them arrives, so a new
+deployment (or a fork) starts without any. The
+:mod:`~democrasite.webiscite.management.commands.backfill_pull_requests` command lists
+every pull request a page at a time with :func:`~.github_api.list_pulls` and imports
+each page with :func:`import_pulls`, saving a :class:`Checkpoint` after each page so an
+interrupted import can be resumed.
+
+The diffs of a page are downloaded into the diff store and checked against the
+constitution concurrently, in a pool of threads, since most of the time is spent
+waiting for GitHub. The number of lines changed is counted from the diff as it is
+checked, since the list of pull requests doesn't include it.
+"""
+
+import json
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import Executor
+from contextlib import closing
+from dataclasses import dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+from django.db import connection
+from django.db import transaction
+from simple_history.utils import bulk_create_with_history
+
+from democrasite.users.models import User
+
+from . import constitution
+from . import diffs
+from .models import Bill
+from .models import PullRequest
+from .signals import bills_changed
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class Checkpoint:
+    """The progress of an import, saved after each page"""
+
+    path: Path
+    #: The state of the pull requests being imported
+    state: str
+    #: The last page that was imported
+    page: int = 0
+
+    @classmethod
+    def load(cls, path: Path, state: str) -> "Checkpoint":
+        """Load the checkpoint of an import, or start a new one
+
+        Args:
+            path: The file the checkpoint is saved in
+            state: The state of the pull requests being imported
+
+        Returns:
+            The saved checkpoint, unless it was for pull requests of another state
+        """
+        try:
+            saved = json.loads(path.read_text())
+        except FileNotFoundError:
+            return cls(path, state)
+        if saved["state"] != state:
+            return cls(path, state)
+        return cls(path, state, saved["page"])
+
+    def save(self, page: int) -> None:
+        """Record that a page was imported"""
+        self.page = page
+        partial = self.path.with_suffix(".tmp")
+        partial.write_text(json.dumps({"state": self.state, "page": page}))
+        partial.replace(self.path)  # Atomic, so an interrupted save can't corrupt it
+
+    def clear(self) -> None:
+        """Delete the checkpoint once the import is finished"""
+        self.path.unlink(missing_ok=True)
+
+
+@dataclass
+class DiffCheck:
+    """What was learned from the diff of a pull request"""
+
+    additions: int
+    deletions: int
+    constitutional: bool
+
+
+class _LineCounter:
+    """Count the lines added and removed by a diff as its lines are read"""
+
+    def __init__(self, lines: Iterable[str]):
+        self.lines = lines
+        self.additions = 0
+        self.deletions = 0
+
+    def __iter__(self) -> Iterator[str]:
+        in_hunk = False
+        for line in self.lines:
+            if line.startswith("diff --git "):
+                in_hunk = False
+            elif line.startswith("@@"):
+                in_hunk = True
+            elif in_hunk and line.startswith("+"):
+                self.additions += 1
+            elif in_hunk and line.startswith("-"):
+                self.deletions += 1
+            yield line
+
+
+def check_diff(pull_request: PullRequest) -> DiffCheck:
+    """Read the whole diff of a pull request, storing it, and check it against the
+    constitution
+
+    Args:
+        pull_request: The pull request, which doesn't need to be saved
+
+    Returns:
+        The number of lines changed and whether the pull request is constitutional
+    """
+    with closing(diffs.iter_diff(pull_request)) as lines:
+        counter = _LineCounter(lines)
+        # Unlike when a bill is created, the whole diff is read to count its lines
+        constitutional = bool(constitution.protected_files(counter))
+    return DiffCheck(counter.additions, counter.deletions, constitutional)
+
+
+def _check_diff_in_thread(pull_request: PullRequest) -> DiffCheck:
+    try:
+        return check_diff(pull_request)
+    finally:
+        connection.close()  # Each thread has its own connection, used for the store
+
+
+def import_pulls(
+    pulls: list[dict[str, Any]], pool: Executor | None = None
+) -> tuple[list[PullRequest], list[Bill]]:
+    """Store the pull requests which aren't already stored, and create their bills
+
+    Bills are created as if the pull request's webhooks had been received: open for
+    open pull requests (or drafts for drafts) and closed for closed ones, and only if
+    the author has an account. Since head commits are unique, a pull request with the
+    same head as one already stored or earlier in the page (e.g. a duplicate branch)
+    is skipped and logged. The pull requests and bills are saved with
+    :func:`~simple_history.utils.bulk_create_with_history`, so
+    :meth:`Bill.save() <democrasite.webiscite.models.Bill.save>` isn't called.
+
+    Args:
+        pulls: The pull requests from :func:`~.github_api.list_pulls`
+        pool: The threads to check the diffs in; defaults to this thread
+
+    Returns:
+        The new pull requests and bills
+    """
+    stored = set(
+        PullRequest.objects.filter(
+            number__in=[pr["number"] for pr in pulls]
+        ).values_list("number", flat=True)
+    )
+    heads = dict(
+        PullRequest.objects.filter(
+            sha__in=[pr["head"]["sha"] for pr in pulls]
+        ).values_list("sha", "number")
+    )
+    new = []
+    for pr in pulls:
+        if pr["number"] in stored:
+            continue
+        sha = pr["head"]["sha"]
+        if sha in heads:
+            logger.warning(
+                "Skipped pull request #%s, which has the same head commit %s as #%s",
+                pr["number"],
+                sha,
+                heads[sha],
+            )
+            continue
+        heads[sha] = pr["number"]
+        new.append(pr)
+    pull_requests = [
+        PullRequest(
+            number=pr["number"],
+            **PullRequest.objects.fields_from_github(
+                {**pr, "additions": 0, "deletions": 0}
+            ),
+        )
+        for pr in new
+    ]
+    if pool is None:
+        checks = list(map(check_diff, pull_requests))
+    else:
+        checks = list(pool.map(_check_diff_in_thread, pull_requests))
+
+    authors = dict(
+        User.objects.filter(
+            socialaccount__provider="github",
+            socialaccount__uid__in=[str(pr["user"]["id"]) for pr in new],
+        ).values_list("socialaccount__uid", "pk")
+    )
+    bills = []
+    for pr, pull_request, check in zip(new, pull_requests, checks, strict=True):
+        pull_request.additions = check.additions
+        pull_request.deletions = check.deletions
+
+        author_id = authors.get(str(pr["user"]["id"]))
+        if author_id is None:
+            continue
+        bill = Bill(
+            name=pull_request.title,
+            description=pr["body"] or "",
+            author_id=author_id,
+            pull_request=pull_request,
+            constitutional=check.constitutional,
+        )
+        if pull_request.status == "closed":
+            bill.status = Bill.Status.CLOSED
+        elif pull_request.draft:
+            bill.status = Bill.Status.DRAFT
+        else:
+            bill._start_voting_period()  # noqa: SLF001
+        bills.append(bill)
+
+    with transaction.atomic():
+        bulk_create_with_history(pull_requests, PullRequest)
+        bulk_create_with_history(bills, Bill)
+        if bills:
+            bills_changed.send(sender=Bill, bill_ids=[bill.pk for bill in bills])
+    return pull_requests, bills
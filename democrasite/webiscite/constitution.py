@@ -5,12 +5,31 @@ contain constitutional amendments, and automatically update the constitution for
 that moved constitutionally protected sections without editing them
 """
 
+import copy
+import gzip
+import hashlib
+import io
 import json
+import re
+from bisect import bisect_right
+from collections.abc import Iterable
+from collections.abc import Iterator
+from dataclasses import dataclass
+from itertools import islice
 from typing import TYPE_CHECKING
+from typing import NamedTuple
 
 from django.conf import settings
+from unidiff import Hunk
 from unidiff import PatchedFile
 from unidiff import PatchSet
+from unidiff.constants import DEV_NULL
+from unidiff.constants import RE_DIFF_GIT_DELETED_FILE
+from unidiff.constants import RE_DIFF_GIT_HEADER
+from unidiff.constants import RE_DIFF_GIT_NEW_FILE
+from unidiff.constants import RE_HUNK_HEADER
+from unidiff.constants import RE_SOURCE_FILENAME
+from unidiff.constants import RE_TARGET_FILENAME
 
 if TYPE_CHECKING:
     from pathlib import Path  # pragma: no cover
@@ -19,36 +38,128 @@ if TYPE_CHECKING:
 # ranges within that file, or None to protect the entire file
 
 
-def _check_hunks(hunks: PatchedFile, locks: list[list[int]]) -> bool:
-    """Check if any portions of an edit overlap with constitutional protections"""
+class Locks(NamedTuple):
+    """The protected line ranges of a file, sorted and merged so they can be searched
+    with :func:`~bisect.bisect_right`"""
+
+    starts: tuple[int, ...]
+    ends: tuple[int, ...]
+
+    @classmethod
+    def from_pairs(cls, pairs: list[list[int]]) -> "Locks":
+        """Compile the line ranges of a file from the constitution
+
+        Args:
+            pairs: The first and last line of each protected range
+
+        Returns:
+            The ranges sorted, with overlapping and adjacent ranges merged
+        """
+        starts: list[int] = []
+        ends: list[int] = []
+        for start, end in sorted(pairs):
+            if ends and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        return cls(tuple(starts), tuple(ends))
+
+    def contains(self, line: int) -> bool:
+        """Return whether a line is protected"""
+        i = bisect_right(self.starts, line) - 1
+        return i >= 0 and line <= self.ends[i]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Return whether any line from start to end is protected
+
+        If end is before start, only those two lines are checked.
+        """
+        if end < start:
+            return self.contains(start) or self.contains(end)
+        # The last range starting at or before end is the only one that can overlap,
+        # since the ranges are disjoint and sorted
+        i = bisect_right(self.starts, end) - 1
+        return i >= 0 and start <= self.ends[i]
+
+
+@dataclass(frozen=True)
+class CompiledConstitution:
+    """The constitution prepared for checking diffs"""
+
+    #: The constitution as read from constitution.json
+    raw: dict[str, list[list[int]] | None]
+    #: The compiled locks of each file, or None if the whole file is protected
+    files: dict[str, Locks | None]
+
+    @classmethod
+    def compile(cls, raw: dict[str, list[list[int]] | None]) -> "CompiledConstitution":
+        """Compile a constitution in the format of constitution.json"""
+        files = {
+            path: None if pairs is None else Locks.from_pairs(pairs)
+            for path, pairs in raw.items()
+        }
+        return cls(raw, files)
+
+
+# The compiled constitution of this process, with the (mtime, size) and hash of the
+# file it was compiled from
+_compiled: tuple[tuple[int, int], str, CompiledConstitution] | None = None
+
+
+def _hunk_range(source_start: int, source_length: int) -> tuple[int, int]:
+    """Return the first and last line of the source file edited by a hunk"""
     HUNK_MIN_LENGTH = 7  # noqa: N806
-    for hunk in hunks:
-        # diff shows 3 lines above and below for context
-        # If the diff starts beyond line 1, remove the top 3 lines
-        start = 1 if hunk.source_start == 1 else hunk.source_start + 3
+    # diff shows 3 lines above and below for context
+    # If the diff starts beyond line 1, remove the top 3 lines
+    start = 1 if source_start == 1 else source_start + 3
 
-        # Subtract 1 from start because it's not 0-indexed
-        end = start + hunk.source_length - 1
-        # The following statements removed context lines. They won't catch all of them
-        # but are good enough
+    # Subtract 1 from start because it's not 0-indexed
+    end = start + source_length - 1
+    # The following statements removed context lines. They won't catch all of them
+    # but are good enough
 
-        # If start is not line 1, subtract 3 from source_length to ignore start context
-        if start != 1:
-            end -= 3
+    # If start is not line 1, subtract 3 from source_length to ignore start context
+    if start != 1:
+        end -= 3
 
-        # If diff is >= 7 lines, ignore end context (otherwise it reached EOF)
-        if hunk.source_length >= HUNK_MIN_LENGTH:
-            end -= 3
+    # If diff is >= 7 lines, ignore end context (otherwise it reached EOF)
+    if source_length >= HUNK_MIN_LENGTH:
+        end -= 3
 
-        for lock in locks:
-            # If any of the diff is within or contains the protected range, return True
-            start_prot = lock[0] <= start <= lock[1]
-            end_prot = lock[0] <= end <= lock[1]
-            full_prot = start <= lock[0] and lock[1] <= end
-            if any((start_prot, end_prot, full_prot)):
-                return True
+    return start, end
 
-    return False
+
+@dataclass
+class _DiffFile:
+    """The headers of a file in a diff read by :func:`protected_files`, with the same
+    semantics as :class:`~unidiff.PatchedFile`"""
+
+    source: str
+    target: str
+    hunks: int = 0
+    #: Whether the only hunk so far leaves the file empty
+    emptied: bool = False
+    protected: bool = False
+
+    @property
+    def is_rename(self) -> bool:
+        return DEV_NULL not in (self.source, self.target) and (
+            self.source[2:] != self.target[2:]
+        )
+
+    @property
+    def is_removed_file(self) -> bool:
+        return self.target == DEV_NULL or (self.hunks == 1 and self.emptied)
+
+    @property
+    def filepath(self) -> str:
+        """The path checked against the constitution, which is the source path of
+        renamed files"""
+        if self.is_rename:
+            return self.source[2:]
+        path = self.target if self.source == DEV_NULL else self.source
+        return path[2:] if path.startswith(("a/", "b/")) else path
 
 
 def read_constitution() -> dict[str, list[list[int]] | None]:
@@ -58,6 +169,31 @@ def read_constitution() -> dict[str, list[list[int]] | None]:
         return json.load(f)
 
 
+def get_constitution() -> CompiledConstitution:
+    """Return the compiled constitution, which is only read and compiled again when
+    constitution.json changes
+
+    The file is only read if its modification time or size changed, and only compiled
+    if its contents changed as well.
+    """
+    global _compiled  # noqa: PLW0603
+
+    path: Path = settings.BASE_DIR / "constitution.json"
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _compiled is not None and _compiled[0] == key:
+        return _compiled[2]
+
+    content = path.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    if _compiled is not None and _compiled[1] == digest:
+        compiled = _compiled[2]
+    else:
+        compiled = CompiledConstitution.compile(json.loads(content))
+    _compiled = (key, digest, compiled)
+    return compiled
+
+
 def is_constitutional(diff_str: str) -> list[str]:
     """Check which files include changes protected by the constitution
 
@@ -67,28 +203,185 @@ def is_constitutional(diff_str: str) -> list[str]:
     Returns:
         list[str]: A list of the files that include consitutionally protected edits
     """
-    constitution = read_constitution()
-    patch = PatchSet(diff_str)
-    matched_files: list[str] = []
+    return protected_files(io.StringIO(diff_str))
+
+
+def protected_files(lines: Iterable[str], *, first_only: bool = False) -> list[str]:
+    """Check which files include changes protected by the constitution, reading the
+    diff one line at a time
+
+    Only file and hunk headers are parsed; the body of each hunk is skipped by counting
+    its lines, so the diff never has to be held in memory.
+
+    Args:
+        lines: The lines of the output of a git diff, e.g. from
+            :func:`~democrasite.webiscite.diffs.iter_diff`
+        first_only: Whether to stop reading at the first protected file
+
+    Returns:
+        list[str]: The files that include constitutionally protected edits, in the
+        order they appear in the diff; only the first if ``first_only`` is set
+    """
+    matched_files = _DiffScanner(get_constitution().files).scan(lines)
+    if first_only:
+        return list(islice(matched_files, 1))
+    return list(matched_files)
+
+
+def is_stored_diff_constitutional(path: str, files: dict[str, Locks | None]) -> bool:
+    """Check whether a stored diff includes any changes protected by the constitution
+
+    Args:
+        path: The path of a gzip-compressed diff, from
+            :func:`~democrasite.webiscite.diffs.stored_path`
+        files: The compiled constitution to check against
+
+    Returns:
+        Whether any file in the diff includes constitutionally protected edits
+    """
+    with gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="") as lines:
+        return any(_DiffScanner(files).scan(lines))
+
+
+class _DiffScanner:
+    """Incremental parser behind :func:`protected_files`, which follows
+    :class:`~unidiff.PatchSet` in how it splits a diff into files"""
 
-    for file in patch:
-        # Remove "a/" from start of source file path
-        filepath = file.source_file[2:] if file.is_rename else file.path
-        if filepath in constitution:
-            locks = constitution[filepath]
+    def __init__(self, constitution: dict[str, Locks | None]):
+        self.constitution = constitution
+        self.file: _DiffFile | None = None
+        self.source = ""
+        # Lines left in the source and target of the current hunk
+        self.remaining = (0, 0)
 
-            if (
+    def scan(self, lines: Iterable[str]) -> Iterator[str]:
+        """Yield each protected file as soon as it is found"""
+        for line in lines:
+            if self.remaining != (0, 0):
+                self._skip(line)
+            elif (header := RE_HUNK_HEADER.match(line)) and self.file is not None:
+                if self._check_hunk(self.file, header):
+                    yield self.file.filepath
+            elif (finished := self._read_header(line)) is not None:
+                if self._is_protected(finished):
+                    yield finished.filepath
+
+        if self.file is not None and self._is_protected(self.file):
+            yield self.file.filepath
+
+    def _skip(self, line: str) -> None:
+        source, target = self.remaining
+        if line.startswith("-"):
+            source -= 1
+        elif line.startswith("+"):
+            target -= 1
+        elif not line.startswith("\\"):  # Context lines count for both sides
+            source -= 1
+            target -= 1
+        self.remaining = (max(source, 0), max(target, 0))
+
+    def _read_header(self, line: str) -> _DiffFile | None:
+        """Read a file header line, returning the previous file if this starts a new
+        one"""
+        finished = None
+        if header := RE_DIFF_GIT_HEADER.match(line):
+            finished = self.file
+            self.file = _DiffFile(header["source"], header["target"])
+        elif RE_DIFF_GIT_NEW_FILE.match(line) and self.file is not None:
+            self.file.source = DEV_NULL
+        elif RE_DIFF_GIT_DELETED_FILE.match(line) and self.file is not None:
+            self.file.target = DEV_NULL
+        elif header := RE_SOURCE_FILENAME.match(line):
+            self.source = header["filename"]
+            # A new file, unless this is the header of the file from "diff --git"
+            if self.file is not None and self.file.source != self.source:
+                finished, self.file = self.file, None
+        elif (header := RE_TARGET_FILENAME.match(line)) and self.file is None:
+            self.file = _DiffFile(self.source, header["filename"])
+        return finished
+
+    def _check_hunk(self, file: _DiffFile, header: re.Match[str]) -> bool:
+        """Start skipping a hunk, returning whether it makes its file protected"""
+        source_start, source_length, target_start, target_length, _ = header.groups()
+        source_length = 1 if source_length is None else int(source_length)
+        target_length = 1 if target_length is None else int(target_length)
+        self.remaining = (source_length, target_length)
+        file.hunks += 1
+        file.emptied = target_start == "0" and target_length == 0
+
+        filepath = file.filepath
+        if file.protected or filepath not in self.constitution:
+            return False
+        locks = self.constitution[filepath]
+        # If a protected hunk was edited
+        file.protected = locks is None or locks.overlaps(
+            *_hunk_range(int(source_start), source_length)
+        )
+        return file.protected
+
+    def _is_protected(self, file: _DiffFile) -> bool:
+        """Return whether a finished file is protected and was not already found to
+        be by one of its hunks"""
+        filepath = file.filepath
+        return (
+            not file.protected
+            and filepath in self.constitution
+            and (
                 file.is_removed_file
                 or file.is_rename
-                or locks is None  # If the file is fully protected
-                or _check_hunks(file, locks)  # If a protected hunk was edited
-            ):
-                matched_files.append(filepath)
+                or self.constitution[filepath] is None  # If the file is fully protected
+            )
+        )
+
 
-    return matched_files
+class LineMap:
+    """Maps the line numbers of a file before a diff to its line numbers after it
 
+    The offset of the lines after each hunk is the running total of the lines added
+    minus the lines removed by it and every earlier hunk, so lines outside the hunks
+    are mapped with :func:`~bisect.bisect_right` on the hunk boundaries. Lines within a
+    hunk are mapped exactly from the hunk's lines.
+    """
+
+    def __init__(self, hunks: PatchedFile):
+        self.hunks = list(hunks)
+        #: The first source line and the first source line after each hunk
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        #: The offset of the lines after each hunk
+        self.offsets: list[int] = []
+        offset = 0
+        for hunk in self.hunks:
+            # Lines are inserted after source_start when no source lines are shown
+            start = hunk.source_start + (hunk.source_length == 0)
+            offset += hunk.target_length - hunk.source_length
+            self.starts.append(start)
+            self.ends.append(start + hunk.source_length)
+            self.offsets.append(offset)
+
+    def __getitem__(self, line: int) -> int:
+        i = bisect_right(self.starts, line) - 1
+        if i < 0:
+            return line
+        if line < self.ends[i]:
+            return self._map_within(self.hunks[i], line)
+        return line + self.offsets[i]
+
+    @staticmethod
+    def _map_within(hunk: Hunk, line: int) -> int:
+        """Map a line within a hunk, or a removed line to the line that replaced it"""
+        target = hunk.target_start
+        for hunk_line in hunk:
+            if hunk_line.source_line_no == line:
+                return target if hunk_line.is_removed else hunk_line.target_line_no
+            if hunk_line.target_line_no is not None:
+                target = hunk_line.target_line_no + 1
+        return target  # pragma: no cover (every line in the hunk's range is in it)
 
-def update_constitution(diff_str: str) -> str:
+
+def update_constitution(
+    *diff_strs: str, raw: dict[str, list[list[int]] | None] | None = None
+) -> str:
     """Automatically update the constitution
 
     If a commit edits a file which has some portions protected by the constitution, but
@@ -100,29 +393,34 @@ def update_constitution(diff_str: str) -> str:
     constitutional amendment, so the constitution will be altered to protect lines 10
     and 11, ensuring the contents of the protected block remain consistent.
 
+    Several diffs can be given to update the constitution for all of them at once, in
+    which case each is applied to the result of the ones before it.
+
     Args:
-        diff_str: A string containing the output of a git diff
+        diff_strs: Strings containing the output of git diffs, in the order the diffs
+            were applied
+        raw: The constitution to update, in the format of constitution.json; defaults
+            to the local constitution
 
     Returns:
         str: A JSON string containing the updated constitution, or an empty string if no
         updates are needed
     """
-    constitution = read_constitution()
-    patch = PatchSet(diff_str)
+    # Copied since the compiled constitution is shared by the whole process
+    constitution = copy.deepcopy(get_constitution().raw if raw is None else raw)
     update = False
 
-    for file in patch:
-        if file.path in constitution:
-            locks = constitution[file.path]
-            if locks is None:
+    for diff_str in diff_strs:
+        for file in PatchSet(diff_str):
+            locks = constitution.get(file.path)
+            if not locks:
                 continue
-            for hunk in file:
-                for lock in locks:
-                    if hunk.source_start < lock[0]:
-                        update = True
-                        delta = hunk.added - hunk.removed
-                        lock[0] += delta
-                        lock[1] += delta
+            line_map = LineMap(file)
+            for lock in locks:
+                moved = [line_map[lock[0]], line_map[lock[1]]]
+                if moved != lock:
+                    update = True
+                    lock[:] = moved
 
     # If no changes were necessary, return empty string to prevent file update
     return json.dumps(constitution, sort_keys=True) if update else ""
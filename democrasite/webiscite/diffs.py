@@ -0,0 +1,216 @@
+"""Content-addressed store of pull request diffs
+
+Diffs are downloaded from GitHub once per head commit and kept gzip-compressed in the
+``"diffs"`` storage, named after the pull request's SHA, so every consumer of a diff
+(e.g. the constitution check when a bill is created and the constitution update when
+it is merged) shares one download. A :class:`~democrasite.webiscite.models.StoredDiff`
+row tracks the size and last use of each stored diff, and the least recently used are
+deleted once their total size exceeds ``WEBISCITE_DIFF_CACHE_SIZE``.
+"""
+
+import gzip
+from collections import deque
+from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import timedelta
+from logging import getLogger
+from tempfile import SpooledTemporaryFile
+from typing import IO
+from typing import TYPE_CHECKING
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.core.files.storage import storages
+from django.db.models import Sum
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from .models import PullRequest  # pragma: no cover
+    from .models import StoredDiff  # pragma: no cover
+
+logger = getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Compressed diffs larger than this are spooled to disk before they are stored
+SPOOL_SIZE = 8 * 1024 * 1024
+# How stale the last use of a diff may get before reading it updates it
+LAST_USED_INTERVAL = timedelta(hours=1)
+
+
+def _storage() -> Storage:
+    return storages["diffs"]
+
+
+def _stored_diffs() -> "type[StoredDiff]":
+    # Looked up lazily since the models module imports this one through the managers
+    return apps.get_model("webiscite", "StoredDiff")
+
+
+def _name(sha: str) -> str:
+    return f"{sha}.diff.gz"
+
+
+def get_diff(pull_request: "PullRequest", *, timeout: float = 60) -> str:
+    """Return the diff of a pull request at its head commit
+
+    Args:
+        pull_request: The pull request
+        timeout: Seconds to wait for GitHub if the diff has to be downloaded
+
+    Returns:
+        The diff, from the store if possible
+    """
+    return "".join(iter_diff(pull_request, timeout=timeout))
+
+
+def iter_diff(
+    pull_request: "PullRequest", *, timeout: float = 60
+) -> Generator[str, None, None]:
+    """Yield the lines of the diff of a pull request at its head commit
+
+    If the diff isn't stored, it is streamed from GitHub, so the whole diff is never in
+    memory at once, and stored once it has been read to the end. Close the generator
+    (e.g. with :func:`contextlib.closing`) to stop reading early.
+
+    Args:
+        pull_request: The pull request
+        timeout: Seconds to wait for GitHub if the diff has to be downloaded
+
+    Yields:
+        Each line of the diff, including its line ending, with any bytes that aren't
+        valid UTF-8 replaced
+    """
+    stored = _open(pull_request.sha)
+    if stored is not None:
+        with (
+            stored,
+            gzip.open(
+                stored, "rt", encoding="utf-8", errors="replace", newline=""
+            ) as lines,
+        ):
+            yield from lines
+        return
+
+    response = requests.get(pull_request.diff_url, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        with SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+            with gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6) as compressed:
+                for line in _split_lines(response.iter_content(CHUNK_SIZE)):
+                    compressed.write(line)
+                    yield line.decode(errors="replace")
+            _write(pull_request.sha, spool)
+    finally:
+        response.close()
+    pull_request.log("Diff stored")
+
+
+def stored_path(pull_request: "PullRequest", *, timeout: float = 60) -> str:
+    """Return the local path of the stored diff of a pull request, downloading and
+    storing it first if necessary
+
+    The file is gzip-compressed. Only storages on the local filesystem have paths.
+
+    Args:
+        pull_request: The pull request
+        timeout: Seconds to wait for GitHub if the diff has to be downloaded
+
+    Returns:
+        The path of the compressed diff
+    """
+    stored = _open(pull_request.sha)
+    if stored is None:
+        deque(iter_diff(pull_request, timeout=timeout), maxlen=0)
+    else:
+        stored.close()
+    return _storage().path(_name(pull_request.sha))
+
+
+def _split_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Split a stream of bytes into lines, keeping the newlines"""
+    partial = b""
+    for chunk in chunks:
+        *lines, partial = (partial + chunk).split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if partial:
+        yield partial
+
+
+def _open(sha: str) -> File | None:
+    """Open a stored diff and mark it as recently used
+
+    The last use is only written if it is older than :data:`LAST_USED_INTERVAL`, so
+    reading the same diff repeatedly doesn't write to the database each time.
+
+    Args:
+        sha: The head commit of the pull request
+
+    Returns:
+        The compressed diff, or None if it is not stored
+    """
+    try:
+        stored = _storage().open(_name(sha), "rb")
+    except FileNotFoundError:
+        return None
+
+    now = timezone.now()
+    _stored_diffs().objects.filter(
+        sha=sha, last_used__lt=now - LAST_USED_INTERVAL
+    ).update(last_used=now)
+    return stored
+
+
+def _write(sha: str, compressed: IO[bytes]) -> None:
+    """Store a compressed diff, then evict the least recently used diffs if over the
+    size cap
+
+    Args:
+        sha: The head commit of the pull request
+        compressed: The compressed diff
+    """
+    size = compressed.tell()
+    compressed.seek(0)
+    storage = _storage()
+    name = _name(sha)
+    if not storage.exists(name):
+        saved = storage.save(name, File(compressed))
+        if saved != name:  # Another process stored the same diff at the same time
+            storage.delete(saved)
+
+    _stored_diffs().objects.update_or_create(
+        sha=sha, defaults={"size": size, "last_used": timezone.now()}
+    )
+    evict()
+
+
+def evict(max_size: int | None = None) -> int:
+    """Delete the least recently used diffs until their total size is under the cap
+
+    Args:
+        max_size: The size cap in bytes; defaults to ``WEBISCITE_DIFF_CACHE_SIZE``
+
+    Returns:
+        The number of diffs deleted
+    """
+    if max_size is None:
+        max_size = settings.WEBISCITE_DIFF_CACHE_SIZE
+
+    stored_diffs = _stored_diffs().objects
+    total = stored_diffs.aggregate(total=Sum("size"))["total"] or 0
+    evicted = 0
+    for stored in stored_diffs.order_by("last_used").iterator():
+        if total <= max_size:
+            break
+        _storage().delete(_name(stored.sha))
+        stored.delete()
+        total -= stored.size
+        evicted += 1
+
+    if evicted:
+        logger.info("Evicted %s diffs from the store", evicted)
+    return evicted
@@ -0,0 +1,260 @@
+"""GitHub API client shared by the tasks of each worker process
+
+Each process keeps one authenticated :class:`~github.Github` client, so its connection
+pool is reused by every task the process runs, and a lazy handle on
+``WEBISCITE_REPO``, which doesn't cost an API call until the repository is used.
+
+Pull requests and files fetched through this module are cached, and fetching them
+again sends a conditional request with the ETag of the cached copy. GitHub answers
+with 304 Not Modified if nothing changed, which doesn't count against the rate limit.
+
+Tasks call :func:`wait_time` before using the API. A :class:`TokenBucket` spreads the
+requests remaining in the current rate limit window (from the ``X-RateLimit-Remaining``
+and ``X-RateLimit-Reset`` headers of the last response) over the rest of the window, so
+tasks can be deferred while the budget is low instead of failing once it runs out.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import cache
+from typing import Any
+
+from django.conf import settings
+from github import Auth
+from github import Github
+from github import RateLimitExceededException
+from github.ContentFile import ContentFile
+from github.GithubObject import CompletableGithubObject
+from github.PullRequest import PullRequest
+from github.Repository import Repository
+
+# Number of requests that can be made at once after the API has been idle
+BURST = 50
+# Number of pull requests and files kept for conditional requests
+CACHE_SIZE = 256
+# Number of items in each page of a list, the most GitHub allows
+PER_PAGE = 100
+# Seconds to wait after hitting a secondary rate limit that doesn't say how long to wait
+MIN_RETRY_AFTER = 60
+
+_client: Github | None = None
+_objects: OrderedDict[tuple[str, int | str], CompletableGithubObject] = OrderedDict()
+
+
+def blob_sha(content: str) -> str:
+    """Return the sha GitHub gives a file with the given contents
+
+    Args:
+        content: The contents of the file
+
+    Returns:
+        The git blob sha of the contents, as from ``git hash-object``
+    """
+    data = content.encode()
+    return hashlib.sha1(
+        b"blob %d\0%s" % (len(data), data), usedforsecurity=False
+    ).hexdigest()
+
+
+class TokenBucket:
+    """Rate limiter which refills at the rate that would use up the remaining requests
+    just as the rate limit resets
+
+    The bucket starts full, and only refills once :meth:`observe` is called with the
+    state of the rate limit. ``WEBISCITE_GITHUB_RATE_LIMIT_RESERVE`` requests are held
+    back for other clients of the same token. Each process has its own bucket, but
+    since they all observe the shared remaining count, a process slows down as the
+    others use up the budget.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        reserve: int,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.capacity = capacity
+        self.reserve = reserve
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.rate = 0.0
+        self.reset_at = 0.0
+
+    def observe(self, remaining: int, reset_at: float) -> None:
+        """Update the bucket from the state of the rate limit
+
+        Args:
+            remaining: The number of requests left in the window
+            reset_at: The Unix time at which the window resets
+        """
+        self._refill()
+        budget = max(remaining - self.reserve, 0)
+        self.rate = budget / max(reset_at - self.clock(), 1)
+        self.tokens = min(self.tokens, budget)
+        self.reset_at = reset_at
+
+    def take(self, cost: float = 1) -> float:
+        """Take tokens for requests about to be made, if there are enough
+
+        Args:
+            cost: The number of requests
+
+        Returns:
+            0 if the tokens were taken, otherwise the seconds to wait until there are
+            enough
+        """
+        self._refill()
+        # More than the capacity can be taken from a full bucket, leaving it in debt
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        if self.rate == 0:  # The budget is used up until the window resets
+            return max(self.reset_at - self.clock(), 1)
+        return (needed - self.tokens) / self.rate
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def get_client() -> Github:
+    """Return the GitHub client shared by this process"""
+    global _client  # noqa: PLW0603
+    if _client is None:
+        _client = Github(
+            auth=Auth.Token(settings.WEBISCITE_GITHUB_TOKEN),
+            base_url=settings.WEBISCITE_GITHUB_API_URL,
+            per_page=PER_PAGE,
+        )
+    return _client
+
+
+@cache
+def get_repo() -> Repository:
+    """Return the repository bills are made from, without fetching it"""
+    return get_client().get_repo(settings.WEBISCITE_REPO, lazy=True)
+
+
+@cache
+def _get_bucket() -> TokenBucket:
+    return TokenBucket(BURST, settings.WEBISCITE_GITHUB_RATE_LIMIT_RESERVE)
+
+
+def _get_cached[T: CompletableGithubObject](
+    key: tuple[str, int | str], fetch: Callable[[], T]
+) -> T:
+    cached = _objects.get(key)
+    if cached is None:
+        cached = fetch()
+    else:
+        cached.update()  # Conditional request, which leaves it unchanged on a 304
+    _objects[key] = cached
+    _objects.move_to_end(key)
+    while len(_objects) > CACHE_SIZE:
+        _objects.popitem(last=False)
+    return cached  # type: ignore[return-value]
+
+
+def get_pull(number: int) -> PullRequest:
+    """Return the current state of a pull request in the repository
+
+    Args:
+        number: The number of the pull request
+
+    Returns:
+        The pull request, refreshed with a conditional request if it was cached
+    """
+    return _get_cached(("pull", number), lambda: get_repo().get_pull(number))
+
+
+def get_contents(path: str) -> ContentFile:
+    """Return the current contents of a file in the repository
+
+    Args:
+        path: The path of the file in the repository
+
+    Returns:
+        The file, refreshed with a conditional request if it was cached
+    """
+    return _get_cached(
+        ("contents", path),
+        lambda: get_repo().get_contents(path),  # type: ignore[arg-type,return-value]
+    )
+
+
+def list_pulls(state: str = "all", page: int = 1) -> list[dict[str, Any]]:
+    """Return a page of the pull requests in the repository, oldest first
+
+    Unlike :meth:`~github.Repository.Repository.get_pulls`, the pull requests are
+    returned as JSON, so they can't fetch themselves again, and a page can be fetched
+    without the ones before it. Pages stay the same as pull requests are opened, since
+    new pull requests are added to the end.
+
+    Args:
+        state: "open", "closed" or "all"
+        page: The number of the page, starting from 1
+
+    Returns:
+        Up to :data:`PER_PAGE` pull requests, without the number of lines changed
+    """
+    __, pulls = get_client().requester.requestJsonAndCheck(
+        "GET",
+        f"{get_repo().url}/pulls",
+        parameters={
+            "state": state,
+            "sort": "created",
+            "direction": "asc",
+            "per_page": PER_PAGE,
+            "page": page,
+        },
+    )
+    return pulls
+
+
+def wait_time(cost: int = 1) -> float:
+    """Reserve requests to the GitHub API under the rate limit
+
+    Args:
+        cost: The number of requests about to be made
+
+    Returns:
+        0 if the requests can be made now, otherwise the seconds to wait before trying
+        again
+    """
+    bucket = _get_bucket()
+    # The rate limit is unknown until the client gets its first response
+    if _client is not None:
+        remaining, limit = _client.requester.rate_limiting
+        if limit >= 0:
+            bucket.observe(remaining, _client.requester.rate_limiting_resettime)
+    return bucket.take(cost)
+
+
+def retry_after(error: RateLimitExceededException) -> float:
+    """Return the seconds to wait after hitting a rate limit
+
+    Args:
+        error: The error raised for the rate limited request
+
+    Returns:
+        The wait GitHub asked for, or the time until the primary rate limit resets
+    """
+    headers = error.headers or {}
+    if "retry-after" in headers:
+        return float(headers["retry-after"])
+    reset_at = float(headers.get("x-ratelimit-reset", 0))
+    return max(reset_at - time.time(), MIN_RETRY_AFTER)
+
+
+def reset() -> None:
+    """Discard the client and everything cached by this module"""
+    global _client  # noqa: PLW0603
+    _client = None
+    get_repo.cache_clear()
+    _get_bucket.cache_clear()
+    _objects.clear()
@@ -0,0 +1,99 @@
+"""Management command to import the existing pull requests of the repository"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from democrasite.webiscite import github_api
+from democrasite.webiscite.backfill import Checkpoint
+from democrasite.webiscite.backfill import import_pulls
+
+
+class Command(BaseCommand):
+    help = (
+        "Import the pull requests of the repository which aren't stored yet and create "
+        "their bills, resuming from the last checkpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--state",
+            choices=["all", "open", "closed"],
+            default="all",
+            help="State of the pull requests to import (defaults to all)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of threads downloading and checking diffs (defaults to 8)",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            default=Path("backfill_pull_requests.json"),
+            help="File the progress is saved in (defaults to "
+            "backfill_pull_requests.json)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start from the first page, ignoring the checkpoint",
+        )
+
+    def handle(
+        self,
+        *args,
+        state: str,
+        workers: int,
+        checkpoint: Path,
+        restart: bool,
+        **options,
+    ):
+        progress = (
+            Checkpoint(checkpoint, state)
+            if restart
+            else Checkpoint.load(checkpoint, state)
+        )
+        if progress.page:
+            self.stdout.write(f"Resuming after page {progress.page}")
+
+        start = time.perf_counter()
+        imported = created = 0
+        page = progress.page + 1
+        # One thread lists the next page while the current one is imported, since
+        # the GitHub client can't be shared between threads
+        with (
+            ThreadPoolExecutor(max_workers=1) as lister,
+            ThreadPoolExecutor(max_workers=workers)
+            if workers > 1
+            else nullcontext() as pool,
+        ):
+            next_pulls = lister.submit(github_api.list_pulls, state, page)
+            while pulls := next_pulls.result():
+                if len(pulls) == github_api.PER_PAGE:
+                    next_pulls = lister.submit(github_api.list_pulls, state, page + 1)
+                else:
+                    next_pulls = lister.submit(list)  # The last page
+
+                pull_requests, bills = import_pulls(pulls, pool)
+                progress.save(page)
+                imported += len(pull_requests)
+                created += len(bills)
+                self.stdout.write(
+                    f"Page {page}: imported {len(pull_requests)} of {len(pulls)} pull "
+                    f"request(s) and created {len(bills)} bill(s)"
+                )
+                page += 1
+
+        progress.clear()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} pull request(s) and created {created} bill(s) "
+                f"in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,51 @@
+"""Management command to check bills against the current constitution again"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from democrasite.webiscite.models import Bill
+
+
+class Command(BaseCommand):
+    help = (
+        "Check bills against the current constitution again and update whether they "
+        "are constitutional"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "bill_ids",
+            nargs="*",
+            type=int,
+            help="IDs of the bills to check (defaults to all open and draft bills)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of worker processes (defaults to the number of CPUs)",
+        )
+
+    def handle(self, *args, bill_ids: list[int], workers: int | None, **options):
+        bills = Bill.objects.filter(pk__in=bill_ids) if bill_ids else None
+
+        start = time.perf_counter()
+        checks = Bill.objects.recheck_constitutional(bills, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        for check in checks:
+            result = (
+                "constitutional" if check.bill.constitutional else "not constitutional"
+            )
+            changed = " (changed)" if check.changed else ""
+            self.stdout.write(
+                f"Bill {check.bill.pk}: {result}{changed} in {check.seconds:.3f}s"
+            )
+
+        changed_count = sum(check.changed for check in checks)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {len(checks)} bill(s) in {elapsed:.2f}s, "
+                f"{changed_count} changed"
+            )
+        )
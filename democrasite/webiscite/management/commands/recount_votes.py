@@ -0,0 +1,27 @@
+"""Management command to repair the stored vote tallies of bills"""
+
+from django.core.management.base import BaseCommand
+
+from democrasite.webiscite.models import Bill
+
+
+class Command(BaseCommand):
+    help = "Recount the stored vote tallies of bills from their votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "bill_ids",
+            nargs="*",
+            type=int,
+            help="IDs of the bills to recount (defaults to all bills)",
+        )
+
+    def handle(self, *args, bill_ids: list[int], **options):
+        bills = Bill.objects.all()
+        if bill_ids:
+            bills = bills.filter(pk__in=bill_ids)
+
+        repaired = Bill.objects.recount_votes(bills)
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired vote tallies of {repaired} bill(s)")
+        )
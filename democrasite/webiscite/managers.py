@@ -1,22 +1,58 @@
 """Managers for the webiscite app models."""
 
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from logging import WARNING
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import NamedTuple
 
-import requests
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.db.models.query import ModelIterable
+from simple_history.utils import bulk_update_with_history
 
 from democrasite.users.models import User
 
-from .constitution import is_constitutional
+from . import constitution
+from . import diffs
+from . import tally
+from .constitution import protected_files
+from .signals import bills_changed
 
 if TYPE_CHECKING:
+    from .constitution import Locks  # pragma: no cover
     from .models import Bill  # pragma: no cover
     from .models import PullRequest  # pragma: no cover
 
 
 class PullRequestManager[T](models.Manager):
+    @staticmethod
+    def fields_from_github(pr: dict[str, Any]) -> dict[str, Any]:
+        """Return the field values of a
+        :class:`~democrasite.webiscite.models.PullRequest` from a GitHub pull request
+        payload
+
+        Args:
+            pr: The pull request data from the GitHub API
+
+        Returns:
+            The value of each field other than the number
+        """
+        return {
+            "title": pr["title"],
+            "additions": pr["additions"],
+            "deletions": pr["deletions"],
+            "diff_url": pr["diff_url"],
+            "author_name": pr["user"]["login"],
+            "status": pr["state"],
+            "sha": pr["head"]["sha"],
+            "draft": pr.get("draft", False),
+        }
+
     def create_from_github(self, pr: dict[str, Any]) -> T:
         """Create or update a :class:`~democrasite.webiscite.models.PullRequest` from
         a GitHub pull request payload
@@ -28,68 +64,155 @@ class PullRequestManager[T](models.Manager):
             The new or updated pull request instance
         """
         pull_request, created = self.update_or_create(
-            number=pr["number"],
-            defaults={
-                "title": pr["title"],
-                "additions": pr["additions"],
-                "deletions": pr["deletions"],
-                "diff_url": pr["diff_url"],
-                "author_name": pr["user"]["login"],
-                "status": pr["state"],
-                "sha": pr["head"]["sha"],
-                "draft": pr.get("draft", False),
-            },
+            number=pr["number"], defaults=self.fields_from_github(pr)
         )
 
         pull_request.log("%s", "Created" if created else "Updated")
         return pull_request
 
 
+class LiveTallyIterable(ModelIterable):
+    """Yield bills with their tallies replaced by the live counts in Redis"""
+
+    def __iter__(self):
+        bills = list(super().__iter__())
+        counts = tally.get_counts(bill.pk for bill in bills)
+        for bill in bills:
+            if bill.pk in counts:
+                bill.yes_count, bill.no_count = counts[bill.pk]
+        yield from bills
+
+
+class ConstitutionCheck[T](NamedTuple):
+    """The result of checking a bill against the constitution again"""
+
+    bill: T
+    #: Whether the bill's constitutional flag changed
+    changed: bool
+    #: Seconds spent checking the bill's diff
+    seconds: float
+
+
+def _check_stored_diff(
+    path: str, files: dict[str, "Locks | None"]
+) -> tuple[bool, float]:
+    """Check a stored diff against the constitution, timing the check (run in worker
+    processes by :meth:`BillManager.recheck_constitutional`)"""
+    start = time.perf_counter()
+    constitutional = constitution.is_stored_diff_constitutional(path, files)
+    return constitutional, time.perf_counter() - start
+
+
 class BillManager[T](models.Manager):
     def get_queryset(self):
-        """Return a queryset with related models pre-fetched and vote amounts added.
+        """Return a queryset with related models pre-fetched.
 
-        All Bill querysets include ``total_votes``, ``yes_count``, ``yes_percent``,
-        ``no_count`` and ``no_percent`` annotations, prefetch pull_request and author,
-        and are ordered by creation date.
+        All Bill querysets prefetch pull_request and author and are ordered by creation
+        date. Vote totals are read from the stored ``yes_count`` and ``no_count``
+        columns rather than aggregated from the votes, or from Redis if
+        ``WEBISCITE_TALLY_BACKEND`` is ``"redis"``, since the columns are only updated
+        when votes are flushed.
         """
-        return (
+        queryset = (
             super()
             .get_queryset()
             .select_related("pull_request", "author")
-            .annotate(
-                total_votes=models.Count("vote"),
-                yes_count=models.Count("vote", filter=models.Q(vote__support=True)),
-                yes_percent=models.Case(
-                    models.When(
-                        models.Q(total_votes__gt=0),
-                        100.0
-                        * models.Count("vote", filter=models.Q(vote__support=True))
-                        / models.F("total_votes"),
-                    ),
-                    default=models.Value(0),
-                    output_field=models.FloatField(),
-                ),
-                no_count=models.Count("vote", filter=models.Q(vote__support=False)),
-                no_percent=models.Case(
-                    models.When(
-                        models.Q(total_votes__gt=0),
-                        100.0
-                        * models.Count("vote", filter=models.Q(vote__support=False))
-                        / models.F("total_votes"),
-                    ),
-                    default=models.Value(0),
-                    output_field=models.FloatField(),
-                ),
-            )
             .order_by("created")
         )
+        if tally.is_enabled():
+            queryset._iterable_class = LiveTallyIterable  # noqa: SLF001
+        return queryset
+
+    def recount_votes(self, bills: models.QuerySet["Bill"] | None = None) -> int:
+        """Recount the stored vote tallies of bills from their votes.
+
+        Args:
+            bills: The bills to recount; defaults to all bills
+
+        Returns:
+            The number of bills whose tallies were out of date
+        """
+        votes = (
+            self.model.votes.through.objects.filter(bill=models.OuterRef("pk"))
+            .values("bill")
+            .annotate(count=models.Count("pk"))
+            .values("count")
+        )
+        yes_count = Coalesce(models.Subquery(votes.filter(support=True)), 0)
+        no_count = Coalesce(models.Subquery(votes.filter(support=False)), 0)
+
+        if bills is None:
+            bills = super().get_queryset()
+
+        stale = bills.annotate(actual_yes=yes_count, actual_no=no_count).exclude(
+            yes_count=models.F("actual_yes"), no_count=models.F("actual_no")
+        )
+        return (
+            super()
+            .get_queryset()
+            .filter(pk__in=stale.values("pk"))
+            .update(yes_count=yes_count, no_count=no_count)
+        )
+
+    def recheck_constitutional(
+        self,
+        bills: models.QuerySet["Bill"] | None = None,
+        *,
+        workers: int | None = None,
+    ) -> list[ConstitutionCheck[T]]:
+        """Check bills against the current constitution again and update their
+        ``constitutional`` flags, e.g. after the constitution is amended
+
+        Diffs are read from the store, downloading any that are missing, and checked in
+        a pool of worker processes. Changed flags are saved together with
+        :func:`~simple_history.utils.bulk_update_with_history`.
+
+        Args:
+            bills: The bills to check; defaults to all open and draft bills
+            workers: The number of worker processes; defaults to the number of CPUs.
+                The bills are checked in this process if it is 1 or if this process
+                can't start workers (e.g. in a Celery worker).
+
+        Returns:
+            The result of the check for each bill
+        """
+        if bills is None:
+            bills = self.filter(
+                status__in=[self.model.Status.OPEN, self.model.Status.DRAFT]
+            )
+        bills = list(bills.select_related("pull_request"))
+        files = constitution.get_constitution().files
+        paths = [diffs.stored_path(bill.pull_request) for bill in bills]
+
+        if workers == 1 or len(bills) <= 1 or multiprocessing.current_process().daemon:
+            results = list(map(_check_stored_diff, paths, repeat(files)))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_check_stored_diff, paths, repeat(files)))
+
+        checks = []
+        for bill, (constitutional, seconds) in zip(bills, results, strict=True):
+            changed = bill.constitutional != constitutional
+            bill.constitutional = constitutional
+            checks.append(ConstitutionCheck(bill, changed, seconds))
+
+        changed = [check.bill for check in checks if check.changed]
+        bulk_update_with_history(changed, self.model, ["constitutional"])
+        if changed:
+            bills_changed.send(
+                sender=self.model, bill_ids=[bill.pk for bill in changed]
+            )
+        return checks
 
     def annotate_user_vote(
         self, user: User, queryset: models.QuerySet["Bill"] | None = None
     ):
         """Annotate a queryset with the given user's vote on each bill.
 
+        The vote is joined with a :class:`~django.db.models.FilteredRelation`, so it is
+        looked up in the unique index on ``(bill, user)`` in the same query, and each
+        bill is joined to at most one vote.
+
         Args:
             user: The user whose vote to annotate
             queryset: The queryset to annotate; defaults to ``self.get_queryset()``
@@ -102,12 +225,10 @@ class BillManager[T](models.Manager):
             queryset = self.get_queryset()
 
         return queryset.annotate(
-            user_vote=models.Subquery(
-                queryset.filter(
-                    vote__bill=models.OuterRef("pk"),
-                    vote__user=user,
-                ).values("vote__support")
-            )
+            user_vote_row=models.FilteredRelation(
+                "vote", condition=models.Q(vote__user=user)
+            ),
+            user_vote=models.F("user_vote_row__support"),
         )
 
     def create_from_github(
@@ -134,8 +255,11 @@ class BillManager[T](models.Manager):
             pull_request.log("No bill created (user does not exist)", level=WARNING)
             return None
 
-        diff_text = requests.get(pull_request.diff_url, timeout=10).text
-        constitutional = bool(is_constitutional(diff_text))
+        # Stops checking the diff at the first protected change, but still reads the
+        # rest so the whole diff is stored for the later checks and the merge
+        lines = diffs.iter_diff(pull_request, timeout=10)
+        constitutional = bool(protected_files(lines, first_only=True))
+        deque(lines, maxlen=0)
 
         status = (
             self.model.Status.DRAFT if pull_request.draft else self.model.Status.OPEN
@@ -152,6 +276,7 @@ class BillManager[T](models.Manager):
 
         bill.full_clean()
         bill.save()
+        bills_changed.send(sender=self.model, bill_ids=[bill.pk])
         bill.log("Created")
 
         return bill
@@ -0,0 +1,15 @@
+"""Prometheus metrics for the webiscite app
+
+Exported alongside the metrics from django-prometheus.
+"""
+
+from prometheus_client import Counter
+
+#: GitHub webhook deliveries by what happened to them: ``"processed"``, ``"dropped"``
+#: because a delivery with the same id was already received, ``"coalesced"`` into a
+#: later delivery for the same pull request, or ``"failed"`` too many times
+WEBHOOK_DELIVERIES = Counter(
+    "webiscite_webhook_deliveries_total",
+    "GitHub webhook deliveries by outcome",
+    ["outcome"],
+)
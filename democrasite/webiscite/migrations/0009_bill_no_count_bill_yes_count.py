@@ -0,0 +1,41 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:23
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_votes(apps, schema_editor):
+    Bill = apps.get_model('webiscite', 'Bill')
+    Vote = apps.get_model('webiscite', 'Vote')
+
+    votes = (
+        Vote.objects.filter(bill=models.OuterRef('pk'))
+        .values('bill')
+        .annotate(count=models.Count('pk'))
+        .values('count')
+    )
+    Bill.objects.update(
+        yes_count=Coalesce(models.Subquery(votes.filter(support=True)), 0),
+        no_count=Coalesce(models.Subquery(votes.filter(support=False)), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0008_alter_bill_status_alter_historicalbill_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='no_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of votes against the bill'),
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='yes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of votes for the bill'),
+        ),
+        migrations.RunPython(count_votes, migrations.RunPython.noop),
+    ]
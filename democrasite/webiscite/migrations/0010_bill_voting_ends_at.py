@@ -0,0 +1,65 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:31
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def convert_submit_tasks(apps, schema_editor):
+    Bill = apps.get_model('webiscite', 'Bill')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+
+    bills = Bill.objects.filter(_submit_task__enabled=True).select_related(
+        '_submit_task__interval'
+    )
+    for bill in bills:
+        task = bill._submit_task
+        started = task.last_run_at or task.date_changed
+        period = timedelta(**{task.interval.period: task.interval.every})
+        bill.voting_ends_at = started + period
+        bill.save(update_fields=['voting_ends_at'])
+
+    Bill.objects.update(_submit_task=None)
+    PeriodicTask.objects.filter(name__startswith='bill_submit:').delete()
+    # Tell running beat schedulers to reload their schedule
+    PeriodicTasks.objects.update_or_create(
+        ident=1, defaults={'last_update': timezone.now()}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+        ('webiscite', '0009_bill_no_count_bill_yes_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='voting_ends_at',
+            field=models.DateTimeField(blank=True, help_text='When the voting period ends and the bill is submitted', null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalbill',
+            name='voting_ends_at',
+            field=models.DateTimeField(blank=True, help_text='When the voting period ends and the bill is submitted', null=True),
+        ),
+        migrations.RunPython(convert_submit_tasks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bill',
+            name='_submit_task',
+        ),
+        migrations.RemoveField(
+            model_name='historicalbill',
+            name='_submit_task',
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['status', 'voting_ends_at'], name='bill_status_voting_ends_idx'),
+        ),
+    ]
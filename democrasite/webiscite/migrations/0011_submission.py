@@ -0,0 +1,32 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:33
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0010_bill_voting_ends_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('bill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='webiscite.bill')),
+                ('action', models.CharField(choices=[('merge', 'Merge'), ('close', 'Close')], max_length=5)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times processing has been attempted')),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Time until which a worker has claimed this submission', null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['created'], name='submission_pending_idx')],
+            },
+        ),
+    ]
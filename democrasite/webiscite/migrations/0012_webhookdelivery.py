@@ -0,0 +1,32 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:35
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0011_submission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('delivery_id', models.CharField(help_text='Unique id of the delivery from the X-GitHub-Delivery header', max_length=64, primary_key=True, serialize=False)),
+                ('event', models.CharField(help_text='Event type from the X-GitHub-Event header', max_length=50)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed')], default='pending', max_length=9)),
+                ('result', models.JSONField(blank=True, help_text='Pull request and bill affected by processing the delivery', null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'webhook deliveries',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['created'], name='webhook_delivery_pending_idx')],
+            },
+        ),
+    ]
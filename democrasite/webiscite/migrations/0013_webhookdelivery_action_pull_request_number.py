@@ -0,0 +1,45 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:37
+
+from django.db import migrations, models
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast
+
+
+def fill_pull_request(apps, schema_editor):
+    WebhookDelivery = apps.get_model('webiscite', 'WebhookDelivery')
+    WebhookDelivery.objects.filter(event='pull_request').update(
+        action=KT('payload__action'),
+        pull_request_number=Cast(
+            KT('payload__pull_request__number'), models.IntegerField()
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0012_webhookdelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='action',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='pull_request_number',
+            field=models.IntegerField(blank=True, help_text='Number of the pull request the delivery is about, if any', null=True),
+        ),
+        migrations.RunPython(fill_pull_request, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='webhookdelivery',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('coalesced', 'Coalesced into a later delivery')], default='pending', max_length=9),
+        ),
+        migrations.AddIndex(
+            model_name='webhookdelivery',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['pull_request_number', 'created'], name='webhook_delivery_pr_idx'),
+        ),
+    ]
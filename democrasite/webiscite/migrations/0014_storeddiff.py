@@ -0,0 +1,21 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0013_webhookdelivery_action_pull_request_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredDiff',
+            fields=[
+                ('sha', models.CharField(help_text='Head commit of the pull request', max_length=40, primary_key=True, serialize=False)),
+                ('size', models.PositiveIntegerField(help_text='Compressed size in bytes')),
+                ('last_used', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
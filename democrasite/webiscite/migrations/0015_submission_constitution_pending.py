@@ -0,0 +1,22 @@
+# Generated by Django 5.2.12 on 2026-10-18 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0014_storeddiff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='constitution_pending',
+            field=models.BooleanField(default=False, help_text='Whether the constitution has to be updated for the merged changes'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('constitution_pending', True)), fields=['completed_at'], name='submission_constitution_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.12 on 2026-10-18 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0015_submission_constitution_pending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['created', 'id'], name='bill_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['status', 'created', 'id'], name='bill_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-18 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0016_bill_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='Time until which a worker has claimed this delivery', null=True),
+        ),
+    ]
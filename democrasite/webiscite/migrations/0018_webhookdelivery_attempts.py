@@ -0,0 +1,28 @@
+# Generated by Django 5.2.12 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0017_webhookdelivery_locked_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Number of times processing has been attempted'),
+        ),
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='webhookdelivery',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('coalesced', 'Coalesced into a later delivery'), ('failed', 'Failed too many times')], default='pending', max_length=9),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-18 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webiscite', '0018_webhookdelivery_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='constitution_sha',
+            field=models.CharField(blank=True, help_text='Blob sha of the constitution updated for the merged changes, recorded before it is committed', max_length=40),
+        ),
+    ]
@@ -1,22 +1,24 @@
 """Models for the webiscite app"""
 
-import json
 import logging
+from datetime import timedelta
 
 from django.conf import settings
+from django.db import connection
 from django.db import models
+from django.db import transaction
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django_celery_beat.models import IntervalSchedule
-from django_celery_beat.models import PeriodicTask
 from model_utils.models import TimeStampedModel
 from simple_history.models import HistoricalRecords
 
 from democrasite.users.models import User
 
+from . import tally
 from .managers import BillManager
 from .managers import PullRequestManager
+from .signals import bills_changed
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,58 @@ class ClosedBillVoteError(Exception):
     pass
 
 
+# Retracts, changes or adds a vote and updates the bill's tallies in one statement.
+# All of the CTEs see the same snapshot, so at most one of the vote statements
+# matches, and the tallies are adjusted by what actually happened to stay consistent
+# under concurrent requests. {tally} and {other} are the tally columns for the chosen
+# side and the opposing side, and {history_table} and {history_columns} are filled in
+# from the vote's history model by _history_table.
+_VOTE_SQL = """
+WITH retracted AS (
+    DELETE FROM webiscite_vote
+    WHERE bill_id = %(bill)s AND user_id = %(user)s AND support = %(support)s
+    RETURNING *
+), changed AS (
+    UPDATE webiscite_vote SET support = %(support)s, "when" = %(now)s
+    WHERE bill_id = %(bill)s AND user_id = %(user)s AND support <> %(support)s
+    RETURNING *
+), added AS (
+    INSERT INTO webiscite_vote (bill_id, user_id, support, "when")
+    SELECT %(bill)s, %(user)s, %(support)s, %(now)s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM webiscite_vote WHERE bill_id = %(bill)s AND user_id = %(user)s
+    )
+    ON CONFLICT (bill_id, user_id) DO NOTHING
+    RETURNING *
+), history AS (
+    INSERT INTO {history_table} ({history_columns}, history_date, history_type)
+    SELECT {history_columns}, %(now)s, '-' FROM retracted
+    UNION ALL
+    SELECT {history_columns}, %(now)s, '~' FROM changed
+    UNION ALL
+    SELECT {history_columns}, %(now)s, '+' FROM added
+), tally AS (
+    UPDATE webiscite_bill SET
+        {tally} = {tally}
+            + (SELECT count(*) FROM added)
+            + (SELECT count(*) FROM changed)
+            - (SELECT count(*) FROM retracted),
+        {other} = {other} - (SELECT count(*) FROM changed)
+    WHERE id = %(bill)s
+    RETURNING yes_count, no_count
+)
+SELECT
+    yes_count,
+    no_count,
+    CASE
+        WHEN EXISTS (SELECT 1 FROM retracted) THEN 'retracted'
+        WHEN EXISTS (SELECT 1 FROM changed) THEN 'changed'
+        WHEN EXISTS (SELECT 1 FROM added) THEN 'added'
+    END
+FROM tally
+"""
+
+
 class PullRequest(TimeStampedModel):
     """Local representation of a pull request on Github"""
 
@@ -150,22 +204,38 @@ class Bill(TimeStampedModel):
 
     # Automatic fields
     votes = models.ManyToManyField(User, through=Vote, related_name="votes", blank=True)
-    _submit_task = models.OneToOneField(
-        PeriodicTask, on_delete=models.PROTECT, null=True, blank=True
+    voting_ends_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("When the voting period ends and the bill is submitted"),
+    )
+    # Vote tallies, only ever changed atomically by vote() and recount_votes()
+    yes_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of votes for the bill")
+    )
+    no_count = models.PositiveIntegerField(
+        default=0, editable=False, help_text=_("Number of votes against the bill")
     )
 
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=["yes_count", "no_count"])
 
     objects = BillManager()
 
-    # Annotations from default manager query
-    total_votes = 0
-    yes_count = 0
-    yes_percent = 0
-    no_count = 0
-    no_percent = 0
+    TALLY_FIELDS = ("yes_count", "no_count")
 
     class Meta:
+        indexes = [
+            # Used by tasks.submit_due_bills to find bills whose voting period ended
+            models.Index(
+                fields=("status", "voting_ends_at"), name="bill_status_voting_ends_idx"
+            ),
+            # Used by the keyset pagination of bills in the API and list views
+            models.Index(fields=("created", "id"), name="bill_created_idx"),
+            # Used by views.BillListView, which only lists open bills
+            models.Index(
+                fields=("status", "created", "id"), name="bill_status_created_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=("pull_request",),
@@ -191,28 +261,39 @@ class Bill(TimeStampedModel):
         )
         # f-string necessary to let string interpolation work in msg
 
+    @property
+    def total_votes(self) -> int:
+        return self.yes_count + self.no_count
+
+    @property
+    def yes_percent(self) -> float:
+        return 100 * self.yes_count / self.total_votes if self.total_votes else 0
+
+    @property
+    def no_percent(self) -> float:
+        return 100 * self.no_count / self.total_votes if self.total_votes else 0
+
     def save(self, *args, **kwargs):
         created = self._state.adding
+        if created and self.status != self.Status.DRAFT and self.voting_ends_at is None:
+            self._start_voting_period()
+        elif not created and kwargs.get("update_fields") is None:
+            # The in-memory tallies may be stale, so never write them back
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TALLY_FIELDS
+            ]
         super().save(*args, **kwargs)
-        if created and self.status != self.Status.DRAFT:
-            self._schedule_submit_task()
-
-    def _schedule_submit_task(self) -> None:
-        """Create a periodic task to submit this bill after the voting period."""
-
-        voting_ends, __ = IntervalSchedule.objects.get_or_create(
-            every=settings.WEBISCITE_VOTING_PERIOD, period=IntervalSchedule.DAYS
-        )
-        self._submit_task = PeriodicTask.objects.create(
-            interval=voting_ends,
-            name=f"bill_submit:{self.id}",
-            task="democrasite.webiscite.tasks.submit_bill",
-            args=json.dumps([self.id]),
-            one_off=True,
-            last_run_at=timezone.now(),
+        if created and self.voting_ends_at is not None:
+            self.log("Voting ends at %s", self.voting_ends_at)
+
+    def _start_voting_period(self) -> None:
+        """Set the end of the voting period, after which the bill is submitted by
+        :func:`~democrasite.webiscite.tasks.submit_due_bills`"""
+        self.voting_ends_at = timezone.now() + timedelta(
+            days=settings.WEBISCITE_VOTING_PERIOD
         )
-        super().save()
-        self.log("Scheduled %s", self._submit_task.name)
 
     def get_absolute_url(self) -> str:
         """Returns URL to view this Bill instance"""
@@ -231,7 +312,10 @@ class Bill(TimeStampedModel):
 
         If the user already voted the way the method would set, their vote is
         removed from the bill (i.e. if the user previously voted yes and support is
-        ``True``, their vote is removed)
+        ``True``, their vote is removed). The vote and the bill's stored tallies are
+        updated in a single database round trip (or a single Redis script if
+        ``WEBISCITE_TALLY_BACKEND`` is ``"redis"``), after which ``yes_count`` and
+        ``no_count`` hold the new tallies.
 
         Args:
             user (User): The user voting on the bill
@@ -243,22 +327,38 @@ class Bill(TimeStampedModel):
         if self.status != self.Status.OPEN:
             raise ClosedBillVoteError("Bill is not open for voting")
 
-        supports = "yes" if support else "no"
-        try:
-            vote: Vote = self.vote_set.get(user=user)
-            if vote.support == support:
-                vote.delete()
-                self.log("%s retracted their %s vote", user.username, supports)
+        if tally.is_enabled():
+            result = tally.vote(self.pk, user.pk, support=support)
+            if result is None:  # First vote on this bill since it was loaded
+                tally.load(self.pk, self.vote_set.values_list("user_id", "support"))
+                result = tally.vote(self.pk, user.pk, support=support)
+        else:
+            result = self._vote_in_database(user, support=support)
 
-            else:
-                vote.support = support
-                vote.save(update_fields=["support", "when"])  # Ensure "when" is updated
-                self.log("%s changed their vote to %s", user.username, supports)
+        self.yes_count, self.no_count, action = result
+        bills_changed.send(sender=Bill, bill_ids=[self.pk], voter_ids=[user.pk])
 
-        except Vote.DoesNotExist:
-            self.votes.add(user, through_defaults={"support": support})
+        supports = "yes" if support else "no"
+        if action == "retracted":
+            self.log("%s retracted their %s vote", user.username, supports)
+        elif action == "changed":
+            self.log("%s changed their vote to %s", user.username, supports)
+        elif action == "added":
             self.log("%s voted %s", user.username, supports)
 
+    def _vote_in_database(self, user: User, *, support: bool) -> tuple[int, int, str]:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _VOTE_SQL_BY_SUPPORT[support],
+                {
+                    "bill": self.pk,
+                    "user": user.pk,
+                    "support": support,
+                    "now": timezone.now(),
+                },
+            )
+            return cursor.fetchone()
+
     def user_supports(self, user: User) -> bool | None:
         """
         Returns whether the given user supports, opposes, or has not voted on this bill
@@ -277,36 +377,71 @@ class Bill(TimeStampedModel):
         else:
             return vote.support
 
-    def close(self, status: "Bill.Status" = Status.CLOSED) -> None:
-        """Close the bill and disable its submit task"""
+    def recount_votes(self) -> None:
+        """Recount the stored vote tallies of this bill from its votes"""
+        Bill.objects.recount_votes(Bill.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=self.TALLY_FIELDS)
+
+    def close(self, status: "Bill.Status" = Status.CLOSED, *, commit=True) -> None:
+        """Close the bill, which also stops it from being submitted
+
+        Args:
+            status: The status to close the bill with
+            commit: Whether to save the bill; if not, the caller must save its
+                ``status``
+        """
         self.status = status
-        self.save()
+        if commit:
+            self.save()
+        bills_changed.send(sender=Bill, bill_ids=[self.pk])
         self.log(status)
 
-        if self._submit_task is not None:
-            self._submit_task.enabled = False
-            self._submit_task.save()
-            self.log("Submit task disabled")
+    def publish(self, *, commit=True) -> None:
+        """Transition a draft bill to open, enabling voting and scheduling submission
 
-    def publish(self) -> None:
-        """Transition a draft bill to open, enabling voting and scheduling submission"""
+        Args:
+            commit: Whether to save the bill; if not, the caller must save its
+                ``status`` and ``voting_ends_at``
+        """
         if self.status != self.Status.DRAFT:
             raise ValueError("Only draft bills can be published")
 
         self.status = self.Status.OPEN
-        self.save()
-        self._schedule_submit_task()
-        self.log("Published")
+        self._start_voting_period()
+        if commit:
+            self.save()
+        bills_changed.send(sender=Bill, bill_ids=[self.pk])
+        self.log("Published, voting ends at %s", self.voting_ends_at)
 
-    def submit(self) -> None:
-        """Check if the bill has enough votes to pass and update the status"""
+    def submit(self) -> "Submission | None":
+        """Check if the bill has enough votes to pass and update the status
+
+        The changes to make on GitHub are recorded in a :class:`Submission` in the same
+        transaction as the new status, and are made later by
+        :func:`~democrasite.webiscite.tasks.process_submission`.
+
+        Returns:
+            The submission, or None if the bill was not open
+        """
         # Bill was closed before voting period ended
         if self.status != Bill.Status.OPEN:
             self.log("Bill was not open when submitted")
-            return
+            return None
 
-        self.status = self._check_approval()
-        self.save()
+        with transaction.atomic():
+            # The final decision is made on the votes themselves, not the tallies
+            self.recount_votes()
+            self.status = self._check_approval()
+            self.save()
+            bills_changed.send(sender=Bill, bill_ids=[self.pk])
+            return Submission.objects.create(
+                bill=self,
+                action=(
+                    Submission.Action.MERGE
+                    if self.status == self.Status.APPROVED
+                    else Submission.Action.CLOSE
+                ),
+            )
 
     def _check_approval(self) -> "Bill.Status":
         if self.total_votes < settings.WEBISCITE_MINIMUM_QUORUM:
@@ -324,3 +459,212 @@ class Bill(TimeStampedModel):
 
         self.log("Approved with %s%% approval", self.yes_percent)
         return self.Status.APPROVED
+
+
+class Submission(TimeStampedModel):
+    """Outbox record of the changes to make on GitHub once a bill is submitted"""
+
+    class Action(models.TextChoices):
+        MERGE = "merge", _("Merge")
+        CLOSE = "close", _("Close")
+
+    bill = models.OneToOneField(Bill, on_delete=models.CASCADE, primary_key=True)
+    action = models.CharField(max_length=5, choices=Action.choices)
+    attempts = models.PositiveIntegerField(
+        default=0, help_text=_("Number of times processing has been attempted")
+    )
+    last_error = models.TextField(blank=True)
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("Time until which a worker has claimed this submission"),
+    )
+    completed_at = models.DateTimeField(null=True, blank=True)
+    constitution_pending = models.BooleanField(
+        default=False,
+        help_text=_(
+            "Whether the constitution has to be updated for the merged changes"
+        ),
+    )
+    constitution_sha = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text=_(
+            "Blob sha of the constitution updated for the merged changes, recorded "
+            "before it is committed"
+        ),
+    )
+
+    class Meta:
+        indexes = [
+            # Used by tasks.retry_submissions to find unfinished submissions
+            models.Index(
+                fields=("created",),
+                name="submission_pending_idx",
+                condition=models.Q(completed_at__isnull=True),
+            ),
+            # Used by tasks.update_constitution to apply merges in order
+            models.Index(
+                fields=("completed_at",),
+                name="submission_constitution_idx",
+                condition=models.Q(constitution_pending=True),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_action_display()} {self.bill}"
+
+    def claim(self, lease: timedelta) -> bool:
+        """Claim the submission for processing, unless it is finished or another worker
+        has already claimed it
+
+        Args:
+            lease: How long the claim lasts if it is never released
+
+        Returns:
+            Whether the submission was claimed
+        """
+        now = timezone.now()
+        claimed = (
+            Submission.objects.filter(pk=self.pk, completed_at__isnull=True)
+            .filter(
+                models.Q(locked_until__isnull=True) | models.Q(locked_until__lt=now)
+            )
+            .update(locked_until=now + lease, attempts=models.F("attempts") + 1)
+        )
+        return claimed == 1
+
+    def complete(self) -> None:
+        """Mark the submission finished"""
+        self.completed_at = timezone.now()
+        self.locked_until = None
+        self.last_error = ""
+        self.save(
+            update_fields=[
+                "completed_at",
+                "locked_until",
+                "last_error",
+                "constitution_pending",
+            ]
+        )
+
+    def release(self, error: Exception) -> None:
+        """Release the claim on the submission after a failed attempt
+
+        Args:
+            error: The error that stopped processing
+        """
+        self.locked_until = None
+        self.last_error = repr(error)
+        self.save(update_fields=["locked_until", "last_error"])
+
+
+class WebhookDelivery(TimeStampedModel):
+    """A webhook delivery from GitHub, stored until a worker processes it"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        PROCESSED = "processed", _("Processed")
+        COALESCED = "coalesced", _("Coalesced into a later delivery")
+        FAILED = "failed", _("Failed too many times")
+
+    delivery_id = models.CharField(
+        max_length=64,
+        primary_key=True,
+        help_text=_("Unique id of the delivery from the X-GitHub-Delivery header"),
+    )
+    event = models.CharField(
+        max_length=50, help_text=_("Event type from the X-GitHub-Event header")
+    )
+    action = models.CharField(max_length=50, blank=True)
+    pull_request_number = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text=_("Number of the pull request the delivery is about, if any"),
+    )
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=9, choices=Status.choices, default=Status.PENDING
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        help_text=_("Pull request and bill affected by processing the delivery"),
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(
+        default=0, help_text=_("Number of times processing has been attempted")
+    )
+    last_error = models.TextField(blank=True)
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("Time until which a worker has claimed this delivery"),
+    )
+
+    class Meta:
+        verbose_name_plural = "webhook deliveries"
+        indexes = [
+            # Used by tasks.retry_webhook_deliveries to find unprocessed deliveries
+            models.Index(
+                fields=("created",),
+                name="webhook_delivery_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+            # Used by tasks.process_webhook to coalesce deliveries for a pull request
+            models.Index(
+                fields=("pull_request_number", "created"),
+                name="webhook_delivery_pr_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event} delivery {self.delivery_id}"
+
+
+class StoredDiff(models.Model):
+    """Index entry for a pull request diff kept in the ``"diffs"`` storage
+
+    See :mod:`democrasite.webiscite.diffs`
+    """
+
+    sha = models.CharField(
+        max_length=40, primary_key=True, help_text=_("Head commit of the pull request")
+    )
+    size = models.PositiveIntegerField(help_text=_("Compressed size in bytes"))
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"Diff at {self.sha}"
+
+
+def _history_table(model: type[models.Model]) -> dict[str, str]:
+    """Get the history table and columns of a model, to fill in a SQL statement
+
+    The columns are read from the model simple_history created, so a statement records
+    the same history as the ORM even if the fields of the model change.
+
+    Args:
+        model: The model whose history is recorded
+
+    Returns:
+        The ``history_table`` and ``history_columns`` of the model
+    """
+    quote_name = connection.ops.quote_name
+    history_model = model.history.model  # type: ignore[attr-defined]
+    return {
+        "history_table": quote_name(history_model._meta.db_table),  # noqa: SLF001
+        "history_columns": ", ".join(
+            quote_name(field.column) for field in history_model.tracked_fields
+        ),
+    }
+
+
+# The statement voting for (True) or against (False) a bill
+_VOTE_SQL_BY_SUPPORT = {
+    True: _VOTE_SQL.format(tally="yes_count", other="no_count", **_history_table(Vote)),
+    False: _VOTE_SQL.format(
+        tally="no_count", other="yes_count", **_history_table(Vote)
+    ),
+}
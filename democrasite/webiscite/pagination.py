@@ -0,0 +1,111 @@
+"""Keyset pagination of bills
+
+Pages are found by the ``(created, id)`` of the last bill on the previous page rather
+than by an offset, so they are read from the index on those columns and each costs the
+same however many bills come before it. The position is passed between pages as an
+opaque cursor, which also keeps pages stable when bills are added, unlike page numbers.
+Used by the list views and by
+:class:`~democrasite.webiscite.api.pagination.BillCursorPagination`, and the cursors
+are shared with :mod:`democrasite.social.pagination`.
+"""
+
+import base64
+import binascii
+import struct
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+from django.db import models
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+# Microseconds since the epoch, then the id, as big-endian signed 64-bit integers
+_CURSOR = struct.Struct(">qq")
+#: The fields bills are ordered by, the last of which is unique
+ORDERING = ("created", "id")
+#: The number of bills on each page, a whole number of rows of the bill list
+PAGE_SIZE = 24
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor wasn't made by :func:`encode_cursor`"""
+
+
+def encode_cursor(created: datetime, pk: int) -> str:
+    """Encode the position of a bill as a cursor
+
+    Args:
+        created: When the bill was created
+        pk: The id of the bill
+
+    Returns:
+        A URL-safe cursor of 22 characters
+    """
+    micros = (created - _EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(_CURSOR.pack(micros, pk)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor made by :func:`encode_cursor`
+
+    Args:
+        cursor: The cursor
+
+    Returns:
+        The creation time and id of the bill
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        micros, pk = _CURSOR.unpack(base64.urlsafe_b64decode(cursor + "=="))
+        created = _EPOCH + timedelta(microseconds=micros)
+    except (binascii.Error, struct.error, ValueError, OverflowError) as e:
+        raise InvalidCursorError(cursor) from e
+    return created, pk
+
+
+@dataclass
+class KeysetPage[T: models.Model]:
+    """A page of objects and the cursor of the page after it"""
+
+    object_list: list[T]
+    #: The cursor of the next page, or None if this is the last page
+    next_cursor: str | None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def paginate[T: models.Model](
+    queryset: models.QuerySet[T], cursor: str | None, page_size: int
+) -> KeysetPage[T]:
+    """Return the page of a queryset after a cursor
+
+    Args:
+        queryset: The bills, in any order, which is replaced by :data:`ORDERING`
+        cursor: The cursor of the page, or None for the first page
+        page_size: The number of bills on each page
+
+    Returns:
+        The page
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    queryset = queryset.order_by(*ORDERING)
+    if cursor is not None:
+        created, pk = decode_cursor(cursor)
+        # The redundant created__gte bounds the index scan, which the OR alone can't
+        queryset = queryset.filter(
+            models.Q(created__gt=created) | models.Q(id__gt=pk), created__gte=created
+        )
+
+    # One more than a page is fetched to tell whether there is another page
+    bills = list(queryset[: page_size + 1])
+    if len(bills) <= page_size:
+        return KeysetPage(bills, None)
+    last = bills[page_size - 1]
+    return KeysetPage(bills[:page_size], encode_cursor(last.created, last.pk))
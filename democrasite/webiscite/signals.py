@@ -0,0 +1,11 @@
+"""Signals sent by the webiscite app"""
+
+from django.dispatch import Signal
+
+#: Sent with ``sender=Bill`` when bills change in a way their representation shows:
+#: when they are created, voted on, closed, published, submitted or edited. The
+#: ``bill_ids`` argument holds the ids of the bills, and ``voter_ids`` the ids of the
+#: users whose votes changed, if any. Sent before the change is committed, so
+#: receivers which read the database should wait for
+#: :func:`~django.db.transaction.on_commit`.
+bills_changed = Signal()
@@ -0,0 +1,222 @@
+"""Live vote tallies kept in Redis
+
+When ``WEBISCITE_TALLY_BACKEND`` is ``"redis"``,
+:meth:`~democrasite.webiscite.models.Bill.vote` records votes in Redis instead of the
+database, so bursts of votes on one bill don't all wait on the same row lock. Each bill
+has three hashes, all updated atomically by Lua scripts:
+
+* ``votes`` maps each voter to their current vote
+* ``tally`` holds the number of yes (``"1"``) and no (``"0"``) votes
+* ``pending`` holds the votes changed since the last flush, with retracted votes
+  stored as an empty string
+
+:func:`~democrasite.webiscite.tasks.flush_votes` periodically writes pending votes to
+the database in batches.
+"""
+
+from collections.abc import Iterable
+from functools import cache
+
+import redis
+from django.conf import settings
+
+DIRTY_BILLS_KEY = "webiscite:dirty_bills"
+
+# Returns nil if the bill's votes have not been loaded yet
+VOTE_SCRIPT = """
+if redis.call("EXISTS", KEYS[2]) == 0 then
+    return false
+end
+local current = redis.call("HGET", KEYS[1], ARGV[1])
+local action
+if current == ARGV[2] then
+    redis.call("HDEL", KEYS[1], ARGV[1])
+    redis.call("HINCRBY", KEYS[2], ARGV[2], -1)
+    redis.call("HSET", KEYS[3], ARGV[1], "")
+    action = "retracted"
+else
+    if current then
+        redis.call("HINCRBY", KEYS[2], current, -1)
+        action = "changed"
+    else
+        action = "added"
+    end
+    redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+    redis.call("HINCRBY", KEYS[2], ARGV[2], 1)
+    redis.call("HSET", KEYS[3], ARGV[1], ARGV[2])
+end
+redis.call("SADD", KEYS[4], ARGV[3])
+return {
+    tonumber(redis.call("HGET", KEYS[2], "1")),
+    tonumber(redis.call("HGET", KEYS[2], "0")),
+    action,
+}
+"""
+
+# Does nothing if another process already loaded the bill's votes
+LOAD_SCRIPT = """
+if redis.call("EXISTS", KEYS[2]) == 1 then
+    return 0
+end
+redis.call("HSET", KEYS[2], "1", ARGV[1], "0", ARGV[2])
+for i = 3, #ARGV, 2 do
+    redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# Moves pending votes into the "flushing" hash, which is only deleted once the votes
+# are written to the database, so a failed flush is retried by the next one
+TAKE_PENDING_SCRIPT = """
+local pending = redis.call("HGETALL", KEYS[1])
+for i = 1, #pending, 2 do
+    redis.call("HSET", KEYS[2], pending[i], pending[i + 1])
+end
+redis.call("DEL", KEYS[1])
+return redis.call("HGETALL", KEYS[2])
+"""
+
+# Keeps the bill dirty if votes came in since they were taken
+ACK_PENDING_SCRIPT = """
+redis.call("DEL", KEYS[2])
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    redis.call("SREM", KEYS[3], ARGV[1])
+end
+"""
+
+
+@cache
+def get_client() -> redis.Redis:
+    """Return the Redis client shared by this process"""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def is_enabled() -> bool:
+    """Return whether votes are recorded in Redis"""
+    return settings.WEBISCITE_TALLY_BACKEND == "redis"
+
+
+def _key(bill_id: int, name: str) -> str:
+    return f"webiscite:bill:{bill_id}:{name}"
+
+
+def vote(bill_id: int, user_id: int, *, support: bool) -> tuple[int, int, str] | None:
+    """Toggle a user's vote on a bill, as in
+    :meth:`~democrasite.webiscite.models.Bill.vote`
+
+    Args:
+        bill_id: The id of the bill being voted on
+        user_id: The id of the user voting
+        support: Whether the user supports the bill
+
+    Returns:
+        The new yes and no counts and whether the vote was ``"added"``,
+        ``"changed"`` or ``"retracted"``, or None if the bill's votes have not been
+        loaded with :func:`load`
+    """
+    client = get_client()
+    result = client.register_script(VOTE_SCRIPT)(
+        keys=[
+            _key(bill_id, "votes"),
+            _key(bill_id, "tally"),
+            _key(bill_id, "pending"),
+            DIRTY_BILLS_KEY,
+        ],
+        args=[user_id, int(support), bill_id],
+    )
+    if result is None:
+        return None
+
+    yes_count, no_count, action = result
+    return int(yes_count), int(no_count), action
+
+
+def load(bill_id: int, votes: Iterable[tuple[int, bool]]) -> None:
+    """Load the votes already in the database for a bill
+
+    Args:
+        bill_id: The id of the bill
+        votes: Pairs of user id and support for each vote on the bill
+    """
+    args: list[int] = []
+    counts = [0, 0]
+    for user_id, support in votes:
+        args += [user_id, int(support)]
+        counts[int(support)] += 1
+
+    get_client().register_script(LOAD_SCRIPT)(
+        keys=[_key(bill_id, "votes"), _key(bill_id, "tally")],
+        args=[counts[1], counts[0], *args],
+    )
+
+
+def get_counts(bill_ids: Iterable[int]) -> dict[int, tuple[int, int]]:
+    """Return the live yes and no counts of bills
+
+    Args:
+        bill_ids: The ids of the bills
+
+    Returns:
+        The yes and no counts of each bill whose votes are loaded in Redis
+    """
+    bill_ids = list(bill_ids)
+    pipeline = get_client().pipeline(transaction=False)
+    for bill_id in bill_ids:
+        pipeline.hmget(_key(bill_id, "tally"), "1", "0")
+
+    return {
+        bill_id: (int(yes_count), int(no_count))
+        for bill_id, (yes_count, no_count) in zip(
+            bill_ids, pipeline.execute(), strict=True
+        )
+        if yes_count is not None
+    }
+
+
+def dirty_bills() -> list[int]:
+    """Return the ids of bills with votes that have not been flushed"""
+    return [int(bill_id) for bill_id in get_client().smembers(DIRTY_BILLS_KEY)]
+
+
+def take_pending(bill_id: int) -> dict[int, bool | None]:
+    """Take the votes on a bill that have not been written to the database
+
+    The votes are kept until :func:`ack_pending` is called, and are returned again
+    (merged with any newer votes) if it never is.
+
+    Args:
+        bill_id: The id of the bill
+
+    Returns:
+        Each changed voter's vote, or None if they retracted it
+    """
+    pending = get_client().register_script(TAKE_PENDING_SCRIPT)(
+        keys=[_key(bill_id, "pending"), _key(bill_id, "flushing")]
+    )
+    return {
+        int(user_id): bool(int(support)) if support else None
+        for user_id, support in zip(pending[::2], pending[1::2], strict=True)
+    }
+
+
+def ack_pending(bill_id: int) -> None:
+    """Mark the votes returned by :func:`take_pending` as written to the database
+
+    The bill stays in :func:`dirty_bills` until then, or if there are newer votes.
+    """
+    get_client().register_script(ACK_PENDING_SCRIPT)(
+        keys=[
+            _key(bill_id, "pending"),
+            _key(bill_id, "flushing"),
+            DIRTY_BILLS_KEY,
+        ],
+        args=[bill_id],
+    )
+
+
+def forget(bill_id: int) -> None:
+    """Remove all of a bill's votes from Redis once voting on it has ended"""
+    get_client().delete(
+        *(_key(bill_id, name) for name in ("votes", "tally", "pending", "flushing"))
+    )
+    get_client().srem(DIRTY_BILLS_KEY, bill_id)
@@ -1,82 +1,889 @@
 """All celery tasks should be defined in this module
 
-This module contains all of the celery tasks used by the webiscite app.
-Currently, the defined tasks are all related to processing pull requests
-from :func:`democrasite.webiscite.webhooks`.
+This module contains all of the celery tasks used by the webiscite app, which submit
+bills once their voting period ends, process pull request webhooks stored by
+:mod:`democrasite.webiscite.webhooks` and write votes recorded in Redis to the
+database.
 """
 
+import json
+from collections import Counter
+from datetime import timedelta
 from logging import WARNING
+from typing import TYPE_CHECKING
+from typing import Any
 
 import requests
 from celery import shared_task
 from celery.utils.log import get_task_logger
-from django.conf import settings
 from django.db import transaction
-from github import Auth
-from github import Github
-from github.Repository import Repository
+from django.db.models import Q
+from django.utils import timezone
+from github import GithubException
+from github import RateLimitExceededException
+from simple_history.utils import bulk_create_with_history
+from simple_history.utils import bulk_update_with_history
 
 from . import constitution
+from . import diffs
+from . import github_api
+from . import tally
+from .metrics import WEBHOOK_DELIVERIES
 from .models import Bill
+from .models import PullRequest
+from .models import Submission
+from .models import Vote
+from .models import WebhookDelivery
+from .signals import bills_changed
+
+if TYPE_CHECKING:
+    from collections.abc import Callable  # pragma: no cover
+    from collections.abc import Iterable  # pragma: no cover
+
+    from celery import Task  # pragma: no cover
+    from github.PullRequest import PullRequest as GithubPullRequest  # pragma: no cover
 
 logger = get_task_logger(__name__)
 
+CONSTITUTION_PATH = "democrasite/webiscite/constitution.json"
+# The pull request fields updated from GitHub by PullRequestHandler.reconcile
+RECONCILED_FIELDS = [
+    "title",
+    "additions",
+    "deletions",
+    "diff_url",
+    "author_name",
+    "status",
+    "sha",
+    "draft",
+]
+FLUSH_BATCH_SIZE = 500
+SUBMIT_BATCH_SIZE = 100
+# How long a worker may hold a submission before others may process it again
+SUBMISSION_LEASE = timedelta(minutes=10)
+SUBMISSION_MAX_RETRIES = 8
+SUBMISSION_RETRY_BACKOFF_MAX = 60 * 60
+WEBHOOK_MAX_RETRIES = 5
+# How long a worker may hold webhook deliveries before others may process them again
+WEBHOOK_LEASE = timedelta(minutes=10)
+# How many times a webhook delivery is attempted before it is marked failed
+WEBHOOK_MAX_ATTEMPTS = 10
+# How long a webhook delivery may stay pending before it is queued again
+WEBHOOK_RETRY_AFTER = timedelta(minutes=10)
+
+
+class MergeFailedError(Exception):
+    """Raised when GitHub doesn't merge the pull request of an approved bill"""
+
 
 @shared_task
-@transaction.atomic
 def submit_bill(bill_id: int) -> None:
     """Handles the final processing and closing of a bill
 
     When the voting period of a bill ends, this method is called with the id of that
-    bill. It verifies that the bill is still active and counts the votes. If the bill
-    has enough votes to pass (which varies depending on whether or not it's
-    constitutional), it is merged into the main branch of the repository.
-    Finally, no regardless of the status of the bill, the pull request is closed.
+    bill. It verifies that the bill is still active and counts the votes, then commits
+    the bill's new status along with a :class:`~democrasite.webiscite.models.Submission`
+    recording whether to merge or close its pull request. The changes on GitHub are
+    made afterwards by :func:`process_submission`, so no database transaction is held
+    open during network calls.
 
     Args:
         bill_id: The id of the bill to submit
     """
-    bill = Bill.objects.get(pk=bill_id)
-    bill.submit()
+    flush_votes(bill_id)  # Count every vote cast before the voting period ended
+    with transaction.atomic():
+        # Locked so concurrent runs can't both submit the bill
+        bill = Bill.objects.select_for_update(of=("self",)).get(pk=bill_id)
+        submission = bill.submit()
+        if submission is not None:
+            transaction.on_commit(lambda: process_submission.delay(bill_id))
 
-    github_auth = Auth.Token(settings.WEBISCITE_GITHUB_TOKEN)
-    repo = Github(auth=github_auth).get_repo(settings.WEBISCITE_REPO)
-    pull = repo.get_pull(bill.pull_request.number)
+    if tally.is_enabled():
+        tally.forget(bill_id)
+
+
+@shared_task(
+    autoretry_for=(GithubException, requests.RequestException, MergeFailedError),
+    max_retries=SUBMISSION_MAX_RETRIES,
+    retry_backoff=True,
+    retry_backoff_max=SUBMISSION_RETRY_BACKOFF_MAX,
+)
+def process_submission(bill_id: int) -> None:
+    """Merge or close the pull request of a submitted bill
+
+    If the bill was approved, its pull request is merged into the main branch of the
+    repository and :func:`update_constitution` is queued if necessary; otherwise the
+    pull request is closed. Each step checks the state on GitHub first, so a submission
+    that failed partway through can safely be processed again. Failed attempts are
+    retried with exponential backoff, and :func:`retry_submissions` picks up any that
+    run out of retries.
+
+    Args:
+        bill_id: The id of the submitted bill
+    """
+    if _defer_for_rate_limit(process_submission, bill_id, cost=3):
+        return
 
-    if bill.status != Bill.Status.APPROVED:
-        pull.edit(state="closed")  # Close failed pull request
+    submission = Submission.objects.select_related("bill__pull_request").get(
+        bill_id=bill_id
+    )
+    if not submission.claim(SUBMISSION_LEASE):
+        logger.info("Submission of bill %s is finished or being processed", bill_id)
         return
 
-    merged = pull.merge(merge_method="squash", sha=bill.pull_request.sha)
-    if merged:
-        bill.log("Merged")
-    else:
-        bill.log("Failed to merge", level=WARNING)
+    try:
+        _apply_submission(submission)
+    except RateLimitExceededException as e:
+        submission.release(e)
+        _defer_for_rate_limit(process_submission, bill_id, error=e)
         return
+    except Exception as e:
+        submission.release(e)
+        raise
+    submission.complete()
+
+    if submission.constitution_pending:
+        update_constitution.delay()
+
+
+def _defer_for_rate_limit(
+    task: "Task",
+    *args: Any,
+    cost: int = 1,
+    error: RateLimitExceededException | None = None,
+) -> bool:
+    """Queue a task to run again later if it can't use the GitHub API now
+
+    Args:
+        task: The task
+        args: The arguments of the task
+        cost: The number of API requests the task makes
+        error: The rate limit error the task ran into, if any
+
+    Returns:
+        Whether the task was deferred
+    """
+    if error is not None:
+        delay = github_api.retry_after(error)
+    elif (delay := github_api.wait_time(cost)) <= 0:
+        return False
 
-    # Automatically update constitution line numbers if necessary
-    _update_constitution(bill, repo)
+    logger.info(
+        "Deferring %s%s by %.0fs for the GitHub rate limit", task.name, args, delay
+    )
+    task.apply_async(args, countdown=delay)
+    return True
 
 
-def _update_constitution(bill: Bill, repo: Repository) -> None:
-    """Updates the constitution if necessary
+def _apply_submission(submission: Submission) -> None:
+    """Make the changes on GitHub recorded in a submission
 
     Args:
-        bill: The bill to update the constitution for
-        repo: The repository to update the constitution in
+        submission: The submission to apply
+
+    Raises:
+        MergeFailedError: If GitHub didn't merge the pull request, so the submission
+            is released to be tried again rather than completed
+    """
+    bill = submission.bill
+    pull = github_api.get_pull(bill.pull_request.number)
+
+    if submission.action == Submission.Action.CLOSE:
+        if pull.state != "closed":
+            pull.edit(state="closed")  # Close failed pull request
+        return
+
+    if not pull.merged:
+        status = pull.merge(merge_method="squash", sha=bill.pull_request.sha)
+        if not status.merged:
+            bill.log("Failed to merge: %s", status.message, level=WARNING)
+            raise MergeFailedError(status.message)
+        bill.log("Merged")
+
+    # Can't automatically update the constitution if it was changed manually
+    submission.constitution_pending = not bill.constitutional
+
+
+@shared_task
+def retry_submissions() -> None:
+    """Process every unfinished submission that isn't currently claimed, and any
+    pending constitution update
+
+    Runs periodically from ``CELERY_BEAT_SCHEDULE``, so submissions are processed even
+    if the task queued when the bill was submitted was lost or ran out of retries.
+    """
+    stale = timezone.now() - SUBMISSION_LEASE
+    pending = Submission.objects.filter(
+        completed_at__isnull=True, created__lt=stale
+    ).filter(Q(locked_until__isnull=True) | Q(locked_until__lt=timezone.now()))
+    for bill_id in pending.values_list("bill_id", flat=True):
+        process_submission.delay(bill_id)
+
+    if Submission.objects.filter(constitution_pending=True).exists():
+        update_constitution.delay()
+
+
+@shared_task
+def submit_due_bills() -> None:
+    """Submit every open bill whose voting period has ended
+
+    Runs periodically from ``CELERY_BEAT_SCHEDULE``. Due bills are found with the index
+    on ``(status, voting_ends_at)`` and fetched in batches by id, so a large backlog
+    never loads every bill at once. A bill that fails to submit stays open and is
+    retried by the next run without holding up the others.
+    """
+    now = timezone.now()
+    due = Bill.objects.filter(
+        status=Bill.Status.OPEN, voting_ends_at__lte=now
+    ).order_by("pk")
+    last_id = 0
+    while batch := list(
+        due.filter(pk__gt=last_id).values_list("pk", flat=True)[:SUBMIT_BATCH_SIZE]
+    ):
+        for bill_id in batch:
+            try:
+                submit_bill(bill_id)
+            except Exception:
+                logger.exception("Failed to submit bill %s", bill_id)
+        last_id = batch[-1]
+
+
+@shared_task(
+    autoretry_for=(GithubException, requests.RequestException),
+    max_retries=SUBMISSION_MAX_RETRIES,
+    retry_backoff=True,
+    retry_backoff_max=SUBMISSION_RETRY_BACKOFF_MAX,
+)
+def update_constitution() -> None:
+    """Update the constitution on GitHub for every merged bill that needs it
+
+    Protected line numbers are moved for the diffs of all the pending bills at once, in
+    the order they were merged, starting from the constitution on GitHub so earlier
+    updates are included. The result is written in a single commit, so bills merged in
+    quick succession don't each rewrite the constitution. The pending bills are claimed
+    before anything is fetched from GitHub, and released to be tried again if the
+    update fails.
+
+    The sha of the updated constitution is recorded before it is committed. If the
+    constitution on GitHub already has that sha, e.g. because the worker died after
+    committing it, the bills' diffs were already applied and aren't applied again.
     """
-    if bill.constitutional:
-        return  # Can't automatically update the constitution if it was changed manually
+    if _defer_for_rate_limit(update_constitution, cost=2):
+        return
+
+    pending = _claim_constitution_update()
+    if not pending:
+        return
 
-    diff = requests.get(bill.pull_request.diff_url, timeout=60).text
-    con_update = constitution.update_constitution(diff)
+    try:
+        contents = github_api.get_contents(CONSTITUTION_PATH)
+        unapplied = [s for s in pending if s.constitution_sha != contents.sha]
+        con_update = constitution.update_constitution(
+            *(diffs.get_diff(s.bill.pull_request) for s in unapplied),
+            raw=json.loads(contents.decoded_content),
+        )
+        if con_update:
+            Submission.objects.filter(pk__in=[s.pk for s in unapplied]).update(
+                constitution_sha=github_api.blob_sha(con_update)
+            )
+            numbers = ", ".join(f"#{s.bill.pull_request.number}" for s in unapplied)
+            github_api.get_repo().update_file(
+                CONSTITUTION_PATH,
+                message=f"Update Constitution for PR {numbers}",
+                content=con_update,
+                sha=contents.sha,
+            )
+    except Exception:
+        Submission.objects.filter(pk__in=[s.pk for s in pending]).update(
+            locked_until=None
+        )
+        raise
+
+    Submission.objects.filter(pk__in=[s.pk for s in pending]).update(
+        constitution_pending=False, locked_until=None
+    )
 
     if con_update:
-        con_sha = repo.get_contents("democrasite/webiscite/constitution.json").sha  # type: ignore[union-attr]
-        repo.update_file(
-            "democrasite/webiscite/constitution.json",
-            message=f"Update Constitution for PR #{bill.pull_request.number}",
-            content=con_update,
-            sha=con_sha,
+        for submission in unapplied:
+            submission.bill.log("Constitution updated")
+
+
+@transaction.atomic
+def _claim_constitution_update() -> list[Submission]:
+    """Claim every submission waiting for the constitution to be updated for
+    :data:`SUBMISSION_LEASE`
+
+    The claim is taken in a short transaction, so no row locks are held while the diffs
+    are downloaded and the update is committed on GitHub. Nothing is claimed while
+    another worker's claim is live, so concurrent runs can't apply the same diffs twice
+    or update the constitution out of order.
+
+    Returns:
+        The claimed submissions in the order they were merged, or an empty list
+    """
+    now = timezone.now()
+    pending = list(
+        Submission.objects.select_for_update(of=("self",))
+        .filter(constitution_pending=True)
+        .select_related("bill__pull_request")
+        .order_by("completed_at", "bill_id")
+    )
+    if any(s.locked_until is not None and s.locked_until > now for s in pending):
+        logger.info("The constitution is already being updated")
+        return []
+
+    Submission.objects.filter(pk__in=[s.pk for s in pending]).update(
+        locked_until=now + SUBMISSION_LEASE
+    )
+    return pending
+
+
+@shared_task(autoretry_for=(requests.RequestException,), max_retries=3)
+def recheck_constitutional() -> None:
+    """Check every open and draft bill against the current constitution again
+
+    Queue this after the constitution is amended, since bills are otherwise only
+    checked when they are created. See
+    :meth:`~democrasite.webiscite.managers.BillManager.recheck_constitutional`.
+    """
+    checks = Bill.objects.recheck_constitutional()
+    for check in checks:
+        logger.debug("Checked bill %s in %.3fs", check.bill.pk, check.seconds)
+        if check.changed:
+            check.bill.log(
+                "Now constitutional"
+                if check.bill.constitutional
+                else "No longer constitutional"
+            )
+    logger.info(
+        "Checked %s bills against the constitution, %s changed",
+        len(checks),
+        sum(check.changed for check in checks),
+    )
+
+
+@shared_task
+def flush_votes(bill_id: int | None = None) -> None:
+    """Write votes recorded in Redis to the database
+
+    Does nothing unless ``WEBISCITE_TALLY_BACKEND`` is ``"redis"``. Votes are taken
+    from Redis and only acknowledged once they are committed, so a bill that fails to
+    flush is retried by the next run without holding up the others.
+
+    Args:
+        bill_id: The id of the bill to flush; defaults to all bills with pending votes
+    """
+    if not tally.is_enabled():
+        return
+
+    bill_ids = tally.dirty_bills() if bill_id is None else [bill_id]
+    for pending_bill_id in bill_ids:
+        try:
+            pending = tally.take_pending(pending_bill_id)
+            if pending:
+                _write_votes(pending_bill_id, pending)
+                logger.info(
+                    "Flushed %s votes on bill %s", len(pending), pending_bill_id
+                )
+            tally.ack_pending(pending_bill_id)
+        except Exception:
+            logger.exception("Failed to flush votes on bill %s", pending_bill_id)
+
+
+@transaction.atomic
+def _write_votes(bill_id: int, pending: dict[int, bool | None]) -> None:
+    """Write the pending votes on a bill to the database and recount its tallies
+
+    Args:
+        bill_id: The id of the bill
+        pending: Each changed voter's vote, or None if they retracted it
+    """
+    retracted = [user_id for user_id, support in pending.items() if support is None]
+    # QuerySet.delete sends post_delete for each vote, so deletions stay in history
+    Vote.objects.filter(bill_id=bill_id, user_id__in=retracted).delete()
+
+    cast = {
+        user_id: support for user_id, support in pending.items() if support is not None
+    }
+    changed = []
+    for vote in Vote.objects.filter(bill_id=bill_id, user_id__in=list(cast)):
+        support = cast.pop(vote.user_id)
+        if vote.support != support:
+            vote.support = support
+            vote.when = timezone.now()
+            changed.append(vote)
+
+    bulk_update_with_history(
+        changed, Vote, ["support", "when"], batch_size=FLUSH_BATCH_SIZE
+    )
+    bulk_create_with_history(
+        [
+            Vote(bill_id=bill_id, user_id=user_id, support=support)
+            for user_id, support in cast.items()
+        ],
+        Vote,
+        batch_size=FLUSH_BATCH_SIZE,
+    )
+
+    Bill.objects.recount_votes(Bill.objects.filter(pk=bill_id))
+    bills_changed.send(sender=Bill, bill_ids=[bill_id], voter_ids=list(pending))
+
+
+@shared_task(
+    autoretry_for=(requests.RequestException,),
+    max_retries=WEBHOOK_MAX_RETRIES,
+    retry_backoff=True,
+)
+def process_webhook(delivery_id: str) -> None:
+    """Process a webhook delivery stored by
+    :class:`~democrasite.webiscite.webhooks.GithubWebhookView`
+
+    The pending deliveries for the same pull request are processed in the order they
+    arrived, whichever of them the task was queued for, so an older payload is never
+    applied after a newer one. Each is claimed for :data:`WEBHOOK_LEASE` in a short
+    transaction and handled outside it, so it is processed exactly once even if the
+    task is queued more than once, without holding row locks while the diff is
+    downloaded. A burst of ``synchronize`` deliveries, e.g. from repeated force pushes,
+    is coalesced: only the latest one is handled, since each only records the new head
+    of the pull request, and the earlier ones are marked
+    :attr:`~democrasite.webiscite.models.WebhookDelivery.Status.COALESCED`. A delivery
+    that fails :data:`WEBHOOK_MAX_ATTEMPTS` times is marked
+    :attr:`~democrasite.webiscite.models.WebhookDelivery.Status.FAILED` instead of
+    being retried forever.
+
+    Args:
+        delivery_id: The id of the delivery from the X-GitHub-Delivery header
+    """
+    while (claimed := _claim_deliveries(delivery_id)) is not None:
+        delivery, coalesced = claimed
+        try:
+            result = PullRequestHandler()(delivery.payload)
+        except Exception as e:
+            _release_deliveries([*coalesced, delivery], e)
+            raise
+
+        now = timezone.now()
+        with transaction.atomic():
+            delivery.result = result
+            delivery.status = WebhookDelivery.Status.PROCESSED
+            delivery.processed_at = now
+            delivery.locked_until = None
+            delivery.save()
+
+            for earlier in coalesced:
+                earlier.result = {"coalesced_into": delivery.delivery_id}
+                earlier.status = WebhookDelivery.Status.COALESCED
+                earlier.processed_at = now
+                earlier.locked_until = None
+            WebhookDelivery.objects.bulk_update(
+                coalesced, ["result", "status", "processed_at", "locked_until"]
+            )
+
+        if coalesced:
+            logger.info(
+                "Coalesced %s deliveries into delivery %s",
+                len(coalesced),
+                delivery.delivery_id,
+            )
+        WEBHOOK_DELIVERIES.labels(outcome="coalesced").inc(len(coalesced))
+        WEBHOOK_DELIVERIES.labels(outcome="processed").inc()
+
+
+@transaction.atomic
+def _claim_deliveries(
+    delivery_id: str,
+) -> tuple[WebhookDelivery, list[WebhookDelivery]] | None:
+    """Claim the oldest pending delivery for the same pull request as a delivery,
+    along with the run of ``synchronize`` deliveries that immediately follow it
+
+    Args:
+        delivery_id: The id of the delivery
+
+    Returns:
+        The delivery to handle and the earlier deliveries coalesced into it, or None if
+        there are no pending deliveries or another worker has claimed the oldest one
+    """
+    pending = _lock_pending_deliveries(delivery_id)
+    if not pending:
+        logger.info("No deliveries are pending with delivery %s", delivery_id)
+        return None
+
+    now = timezone.now()
+    if pending[0].locked_until is not None and pending[0].locked_until > now:
+        logger.info("Deliveries like delivery %s are being processed", delivery_id)
+        return None
+
+    end = 0
+    while (
+        pending[end].action == "synchronize"
+        and end + 1 < len(pending)
+        and pending[end + 1].action == "synchronize"
+    ):
+        end += 1
+    claimed = pending[: end + 1]
+    for delivery in claimed:
+        delivery.locked_until = now + WEBHOOK_LEASE
+        delivery.attempts += 1
+    WebhookDelivery.objects.bulk_update(claimed, ["locked_until", "attempts"])
+    return claimed[-1], claimed[:-1]
+
+
+def _release_deliveries(deliveries: list[WebhookDelivery], error: Exception) -> None:
+    """Release the claim on deliveries after a failed attempt
+
+    Once the delivery that was handled has been attempted :data:`WEBHOOK_MAX_ATTEMPTS`
+    times, they are all marked
+    :attr:`~democrasite.webiscite.models.WebhookDelivery.Status.FAILED` so
+    :func:`retry_webhook_deliveries` stops queueing them.
+
+    Args:
+        deliveries: The claimed deliveries, ending with the one that was handled
+        error: The error that stopped processing
+    """
+    failed = deliveries[-1].attempts >= WEBHOOK_MAX_ATTEMPTS
+    for delivery in deliveries:
+        delivery.locked_until = None
+        delivery.last_error = repr(error)
+        if failed:
+            delivery.status = WebhookDelivery.Status.FAILED
+    WebhookDelivery.objects.bulk_update(
+        deliveries, ["locked_until", "last_error", "status"]
+    )
+
+    if failed:
+        logger.error(
+            "Delivery %s failed %s times: %r",
+            deliveries[-1].delivery_id,
+            deliveries[-1].attempts,
+            error,
         )
-        bill.log("Constitution updated")
+        WEBHOOK_DELIVERIES.labels(outcome="failed").inc(len(deliveries))
+
+
+def _lock_pending_deliveries(delivery_id: str) -> list[WebhookDelivery]:
+    """Lock the pending deliveries for the same pull request as a delivery
+
+    All of them are locked in one query, in the order they arrived, so concurrent
+    tasks for the same pull request can't deadlock.
+
+    Args:
+        delivery_id: The id of the delivery
+
+    Returns:
+        The pending deliveries in the order they arrived, or an empty list if none
+        are pending
+    """
+    pull_request_number = (
+        WebhookDelivery.objects.filter(pk=delivery_id)
+        .values_list("pull_request_number", flat=True)
+        .first()
+    )
+    if pull_request_number is None:
+        deliveries = WebhookDelivery.objects.filter(pk=delivery_id)
+    else:
+        deliveries = WebhookDelivery.objects.filter(
+            pull_request_number=pull_request_number
+        )
+    return list(
+        deliveries.filter(status=WebhookDelivery.Status.PENDING)
+        .select_for_update()
+        .order_by("created", "delivery_id")
+    )
+
+
+@shared_task
+def retry_webhook_deliveries() -> None:
+    """Process webhook deliveries that are still pending long after they arrived
+
+    Runs periodically from ``CELERY_BEAT_SCHEDULE``, so deliveries are processed even
+    if the task queued when they arrived was lost or ran out of retries.
+    """
+    now = timezone.now()
+    pending = WebhookDelivery.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        status=WebhookDelivery.Status.PENDING,
+        created__lt=now - WEBHOOK_RETRY_AFTER,
+    )
+    for delivery_id in pending.values_list("delivery_id", flat=True):
+        process_webhook.delay(delivery_id)
+
+
+@shared_task(
+    autoretry_for=(GithubException, requests.RequestException),
+    max_retries=WEBHOOK_MAX_RETRIES,
+    retry_backoff=True,
+)
+def reconcile_pull_requests() -> None:
+    """Bring the stored pull requests up to date with the open pull requests on GitHub
+
+    Runs periodically from ``CELERY_BEAT_SCHEDULE``, so pull requests and their bills
+    are updated even if webhooks were missed, e.g. during a deploy or an outage. The
+    open pull requests are listed a page of :data:`~.github_api.PER_PAGE` at a time,
+    and only those that changed are fetched in full. See
+    :meth:`PullRequestHandler.reconcile`.
+    """
+    pages = 1 + PullRequest.objects.filter(status="open").count() // github_api.PER_PAGE
+    if _defer_for_rate_limit(reconcile_pull_requests, cost=pages):
+        return
+
+    pulls = github_api.get_repo().get_pulls(state="open")
+    actions = PullRequestHandler().reconcile(pulls)
+    logger.info(
+        "Reconciled pull requests with GitHub: %s",
+        ", ".join(f"{count} {action}" for action, count in actions.items()) or "none",
+    )
+
+
+class PullRequestHandler:
+    """Handle pull requests from GitHub webhooks"""
+
+    #: The pull request actions that are handled, each by the method of the same name
+    ACTIONS = ("opened", "reopened", "ready_for_review", "synchronize", "closed")
+
+    def __call__(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Handle a pull request from a GitHub webhook
+
+        Args:
+            payload: The parsed JSON object representing the pull request
+
+        Returns:
+            An object containing the primary keys of the pull request and bill affected,
+            if applicable
+
+        Raises:
+            ValueError: If the action is not in :attr:`ACTIONS`
+        """
+        action = payload["action"]
+        if action not in self.ACTIONS:
+            raise ValueError(f"Unsupported action: {action}")
+
+        handler: Callable[[dict[str, Any]], tuple[PullRequest | None, Bill | None]]
+        handler = getattr(self, action)
+        pull_request, bill = handler(payload["pull_request"])
+
+        result = {"action": action}
+        if pull_request is not None:
+            result["pull_request"] = pull_request.number
+        if bill is not None:
+            result["bill"] = bill.id
+
+        return result
+
+    def reopened(self, pr: dict[str, Any]) -> tuple[PullRequest, Bill | None]:
+        return self.opened(pr)
+
+    def opened(self, pr: dict[str, Any]) -> tuple[PullRequest, Bill | None]:
+        """Create a :class:`~democrasite.webiscite.models.PullRequest` and, if the
+        creator has an account, :class:`~democrasite.webiscite.models.Bill` instance
+        from a pull request
+
+        Args:
+            pr: The parsed JSON object representing the pull request
+
+        Returns:
+            A tuple containing the pull request and bill, if applicable
+        """
+        pull_request: PullRequest = PullRequest.objects.create_from_github(pr)
+
+        # pr["body"] is None if the body is empty
+        bill_desc = pr["body"] or ""
+        user_id = pr["user"]["id"]
+        bill = Bill.objects.create_from_github(pull_request, bill_desc, user_id)
+
+        return pull_request, bill
+
+    def ready_for_review(
+        self, pr: dict[str, Any]
+    ) -> tuple[PullRequest | None, Bill | None]:
+        """Publish the draft bill associated with the pull request
+
+        Args:
+            pr: The parsed JSON object representing the pull request
+        """
+        try:
+            pull_request = PullRequest.objects.get(number=pr["number"])
+        except PullRequest.DoesNotExist:
+            logger.warning(
+                "PR #%s: Nothing changed (no pull request found)", pr["number"]
+            )
+            return (None, None)
+
+        pull_request.draft = False
+        pull_request.save()
+
+        try:
+            bill: Bill = pull_request.bill_set.get(status=Bill.Status.DRAFT)
+        except Bill.DoesNotExist:
+            pull_request.log("No draft bill found")
+            return (pull_request, None)
+
+        bill.publish()
+        return (pull_request, bill)
+
+    def synchronize(self, pr: dict[str, Any]) -> tuple[PullRequest, Bill | None]:
+        """Handle new commits pushed to an open pull request.
+
+        Updates the pull request with the new SHA and closes any active bill
+        as amended, since votes on the old version no longer apply.
+
+        Args:
+            pr: The parsed JSON object representing the pull request
+
+        Returns:
+            A tuple containing the updated pull request and the closed bill, if any
+        """
+        pull_request = PullRequest.objects.create_from_github(pr)
+
+        try:
+            bill: Bill = pull_request.bill_set.get(status=Bill.Status.OPEN)
+        except Bill.DoesNotExist:
+            pull_request.log("No open bill found")
+            return (pull_request, None)
+
+        bill.close(status=Bill.Status.AMENDED)
+        return (pull_request, bill)
+
+    def closed(self, pr: dict[str, Any]) -> tuple[PullRequest | None, Bill | None]:
+        """Disables the open bill associated with the pull request
+
+        Args:
+            pr: The parsed JSON object representing the pull request
+        """
+        try:
+            pull_request = PullRequest.objects.get(number=pr["number"])
+        except PullRequest.DoesNotExist:
+            logger.warning(
+                "PR #%s: Nothing changed (no pull request found)", pr["number"]
+            )
+            return (None, None)
+
+        bill = pull_request.close()
+        return (pull_request, bill)
+
+    def reconcile(self, pulls: "Iterable[GithubPullRequest]") -> Counter[str]:
+        """Apply the actions for any webhooks that were missed, given the open pull
+        requests on GitHub
+
+        Each stored pull request is compared to its state on GitHub, and the action it
+        missed is applied as if its webhook had been received: ``closed`` if it is no
+        longer open, ``synchronize`` if its head changed and ``ready_for_review`` if it
+        is no longer a draft. These are saved together with
+        :func:`~simple_history.utils.bulk_update_with_history`. Pull requests opened or
+        reopened since are handled one at a time by :meth:`opened`, since they create
+        bills.
+
+        Only the pull requests that were opened or whose head changed are fetched in
+        full, since the list of pull requests doesn't include the number of lines
+        changed.
+
+        Args:
+            pulls: The open pull requests on GitHub
+
+        Returns:
+            The number of pull requests handled for each action
+        """
+        pulls_by_number = {pull.number: pull for pull in pulls}
+        known = dict(
+            PullRequest.objects.filter(number__in=pulls_by_number).values_list(
+                "number", "sha"
+            )
+        )
+        # Fetched before the transaction, so it isn't held open during network calls
+        payloads = {
+            number: pull.raw_data
+            for number, pull in pulls_by_number.items()
+            if known.get(number) != pull.head.sha
+        }
+
+        actions: dict[int, str] = {}
+        with transaction.atomic():
+            stored = (
+                PullRequest.objects.select_for_update()
+                .filter(Q(number__in=pulls_by_number) | Q(status="open"))
+                .in_bulk()
+            )
+            updated = []
+            for number, pull_request in stored.items():
+                action = self._reconcile_pull_request(
+                    pull_request, pulls_by_number.get(number), payloads.get(number)
+                )
+                if action is not None:
+                    updated.append(pull_request)
+                    if action != "edited":
+                        actions[number] = action
+            bulk_update_with_history(updated, PullRequest, RECONCILED_FIELDS)
+            self._reconcile_bills(actions)
+
+        for number, pull in pulls_by_number.items():
+            pull_request = stored.get(number)
+            if pull_request is None or pull_request.status == "closed":
+                self.opened(payloads.get(number) or pull.raw_data)
+                actions[number] = "opened" if pull_request is None else "reopened"
+
+        return Counter(actions.values())
+
+    @staticmethod
+    def _reconcile_pull_request(
+        pull_request: PullRequest,
+        pull: "GithubPullRequest | None",
+        payload: dict[str, Any] | None,
+    ) -> str | None:
+        """Update a stored pull request in memory from its state on GitHub
+
+        Args:
+            pull_request: The stored pull request
+            pull: The pull request on GitHub, or None if it is closed
+            payload: The full pull request from GitHub, if it was fetched
+
+        Returns:
+            The missed action, ``"edited"`` if only its title or draft status changed,
+            or None if it is up to date or is handled by :meth:`opened`
+        """
+        if pull is None:
+            pull_request.status = "closed"
+            pull_request.log("Closed on GitHub")
+            return "closed"
+        if pull_request.status == "closed":
+            return None
+
+        if pull.head.sha != pull_request.sha:
+            if payload is None:  # Pushed to since the payloads were fetched
+                return None
+            for field, value in PullRequest.objects.fields_from_github(payload).items():
+                setattr(pull_request, field, value)
+            pull_request.log("Pushed to on GitHub")
+            return "synchronize"
+
+        action = None
+        if pull_request.draft and not pull.draft:
+            pull_request.log("Ready for review on GitHub")
+            action = "ready_for_review"
+        elif pull_request.title != pull.title or pull_request.draft != pull.draft:
+            action = "edited"
+        pull_request.title = pull.title
+        pull_request.draft = pull.draft
+        return action
+
+    @staticmethod
+    def _reconcile_bills(actions: dict[int, str]) -> None:
+        """Close, amend or publish the bills of reconciled pull requests
+
+        Args:
+            actions: The action missed by each pull request, by number
+        """
+        bills = []
+        for bill in Bill.objects.select_for_update(of=("self",)).filter(
+            pull_request__in=actions, status__in=[Bill.Status.OPEN, Bill.Status.DRAFT]
+        ):
+            action = actions[bill.pull_request_id]
+            if action == "closed":
+                bill.close(commit=False)
+            elif action == "synchronize" and bill.status == Bill.Status.OPEN:
+                bill.close(status=Bill.Status.AMENDED, commit=False)
+            elif action == "ready_for_review" and bill.status == Bill.Status.DRAFT:
+                bill.publish(commit=False)
+            else:
+                continue
+            bills.append(bill)
+
+        bulk_update_with_history(bills, Bill, ["status", "voting_ends_at"])
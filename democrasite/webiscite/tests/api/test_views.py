@@ -1,4 +1,5 @@
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 from django.urls import reverse
@@ -6,6 +7,8 @@ from django.utils.timezone import get_current_timezone
 from rest_framework.test import APIClient
 from rest_framework.test import APIRequestFactory
 
+from democrasite.webiscite.api import cache
+from democrasite.webiscite.api.pagination import BillCursorPagination
 from democrasite.webiscite.api.views import BillViewSet
 from democrasite.webiscite.models import Bill
 from democrasite.webiscite.models import User
@@ -89,10 +92,146 @@ class TestBillViewSet:
 
         response = view(request)
 
-        assert len(response.data) == batch_size
-        assert response.data[0]["name"] == bills[0].name
-        assert response.data[0].get("user_supports") is False
-        assert response.data[1].get("user_supports") is None
+        results = response.data["results"]
+        assert len(results) == batch_size
+        assert results[0]["name"] == bills[0].name
+        assert results[0].get("user_supports") is False
+        assert results[1].get("user_supports") is None
+        assert response.data["next"] is None
+
+    @pytest.mark.parametrize("batch_size", [1, 10])
+    def test_list_queries(
+        self,
+        batch_size: int,
+        user: User,
+        api_rf: APIRequestFactory,
+        django_assert_num_queries,
+    ):
+        for bill in BillFactory.create_batch(batch_size):
+            bill.vote(user, support=True)
+        view = BillViewSet.as_view(actions={"get": "list"})
+        request = api_rf.get("/fake-url/")
+        request.user = user
+
+        # The bills with their authors and pull requests, then the user's votes
+        with django_assert_num_queries(2):
+            response = view(request)
+            response.render()
+        # Both are cached
+        with django_assert_num_queries(0):
+            cached = view(request)
+            cached.render()
+
+        assert [bill["user_supports"] for bill in response.data["results"]] == [
+            True
+        ] * batch_size
+        assert cached.data == response.data
+
+    def test_list_vote_counts(self, bill: Bill, user: User, api_client: APIClient):
+        bill.vote(user, support=False)
+
+        response = api_client.get(reverse("bill-list"))
+
+        assert response.data["results"][0]["yes_votes"] == 0
+        assert response.data["results"][0]["no_votes"] == 1
+        assert response.data["results"][0]["user_supports"] is None
+
+    def test_list_cached_per_user(self, bill: Bill, user: User, api_client: APIClient):
+        bill.vote(user, support=True)
+        api_client.force_login(user)
+        response = api_client.get(reverse("bill-list"))
+        api_client.logout()
+
+        anonymous = api_client.get(reverse("bill-list"))
+
+        assert response.data["results"][0]["user_supports"] is True
+        assert anonymous.data["results"][0]["user_supports"] is None
+
+    def test_list_invalidated_by_vote(
+        self,
+        bill: Bill,
+        user: User,
+        api_client: APIClient,
+        django_capture_on_commit_callbacks,
+    ):
+        api_client.force_login(user)
+        api_client.get(reverse("bill-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            bill.vote(user, support=False)
+        response = api_client.get(reverse("bill-list"))
+
+        assert response.data["results"][0]["no_votes"] == 1
+        assert response.data["results"][0]["user_supports"] is False
+
+    def test_list_invalidated_by_close(
+        self, bill: Bill, api_client: APIClient, django_capture_on_commit_callbacks
+    ):
+        api_client.get(reverse("bill-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            bill.close()
+        response = api_client.get(reverse("bill-list"))
+
+        assert response.data["results"][0]["status"] == "PR Closed"
+
+    def test_retrieve_invalidated_by_update(
+        self, bill: Bill, api_client: APIClient, django_capture_on_commit_callbacks
+    ):
+        url = reverse("bill-detail", args=[bill.id])
+        api_client.get(url)
+        api_client.force_login(bill.author)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.patch(url, {"description": "new description"})
+        response = api_client.get(url)
+
+        assert response.data["description"] == "new description"
+
+    def test_update_user_supports(self, bill: Bill, api_client: APIClient):
+        bill.vote(bill.author, support=True)
+        api_client.force_login(bill.author)
+        url = reverse("bill-detail", args=[bill.id])
+
+        response = api_client.patch(url, {"description": "new description"})
+
+        assert response.data["user_supports"] is True
+
+    def test_votes_cached_per_bill(self, user: User, django_assert_num_queries):
+        bill, other_bill, unvoted = BillFactory.create_batch(3)
+        bill.vote(user, support=True)
+        other_bill.vote(user, support=False)
+        assert cache.user_votes(user, [bill.pk]) == {bill.pk: True}
+
+        # Only the votes on the bills that aren't cached are read
+        with django_assert_num_queries(1):
+            votes = cache.user_votes(user, [bill.pk, other_bill.pk, unvoted.pk])
+        with django_assert_num_queries(0):
+            cache.user_votes(user, [unvoted.pk])
+
+        assert votes == {bill.pk: True, other_bill.pk: False, unvoted.pk: None}
+
+    @patch.object(BillCursorPagination, "page_size", 2)
+    def test_list_pages(self, api_client: APIClient):
+        bills = BillFactory.create_batch(5)
+        # Bills created at the same time are ordered by id
+        Bill.objects.filter(pk__in=[bill.pk for bill in bills[1:4]]).update(
+            created=bills[1].created
+        )
+
+        names = []
+        url = reverse("bill-list")
+        while url is not None:
+            response = api_client.get(url)
+            names += [bill["name"] for bill in response.data["results"]]
+            url = response.data["next"]
+
+        assert names == [bill.name for bill in bills]
+
+    def test_list_invalid_cursor(self, api_client: APIClient):
+        response = api_client.get(reverse("bill-list"), {"cursor": "invalid"})
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
 
     def test_update(self, bill: Bill, api_client: APIClient):
         api_client.force_login(bill.author)
@@ -102,6 +241,7 @@ class TestBillViewSet:
         response = api_client.patch(url, {"description": new_description})
 
         assert response.data["name"] == bill.name
+        assert response.data["user_supports"] is None
 
         bill.refresh_from_db()
         assert bill.description == new_description
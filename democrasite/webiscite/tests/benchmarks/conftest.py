@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+import pytest
+
+from democrasite.webiscite import constitution
+from democrasite.webiscite.constitution import CompiledConstitution
+
+from .synthetic import SyntheticDiff
+from .synthetic import generate_constitution
+from .synthetic import generate_diff
+
+
+@pytest.fixture(scope="session")
+def large_diff() -> SyntheticDiff:
+    """A diff of 2000 files with about 20000 hunks"""
+    return generate_diff()
+
+
+@pytest.fixture(params=["protected", "unprotected"])
+def compiled_constitution(request, large_diff: SyntheticDiff) -> CompiledConstitution:
+    """Use a constitution which protects some of the files in the large diff, or none
+    of them so that every check has to read the whole diff"""
+    protected = 0.2 if request.param == "protected" else 0
+    compiled = CompiledConstitution.compile(
+        generate_constitution(large_diff.paths, protected=protected)
+    )
+    with patch.object(constitution, "get_constitution", return_value=compiled):
+        yield compiled
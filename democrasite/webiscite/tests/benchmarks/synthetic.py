@@ -0,0 +1,164 @@
+"""Generators of large, realistic diffs and constitutions for the benchmarks"""
+
+import random
+from dataclasses import dataclass
+from dataclasses import field
+
+
+@dataclass
+class SyntheticDiff:
+    """A generated diff and the paths of the files it touches"""
+
+    text: str
+    #: The source path of every file in the diff, including renamed and deleted files
+    paths: list[str] = field(default_factory=list)
+    hunks: int = 0
+
+
+def _path(rng: random.Random, i: int) -> str:
+    package = rng.choice(("users", "webiscite", "activitypub", "utils", "config"))
+    return f"democrasite/{package}/module_{i // 20}/file_{i}.py"
+
+
+def _hunk(rng: random.Random, source_start: int, offset: int) -> tuple[list[str], int]:
+    """Return the lines of a hunk with 3 lines of context on either side, and how much
+    it shifts the rest of the file"""
+    removed = rng.randint(0, 6)
+    added = rng.randint(0 if removed else 1, 6)
+    context = [f" context line {source_start + i}\n" for i in range(3)]
+    body = [f"-removed line {source_start + 3 + i}\n" for i in range(removed)]
+    body += [f"+added line {i}\n" for i in range(added)]
+    trailer = [f" context line {source_start + 3 + removed + i}\n" for i in range(3)]
+    source_length = 6 + removed
+    target_length = 6 + added
+    header = (
+        f"@@ -{source_start},{source_length} "
+        f"+{source_start + offset},{target_length} @@ def function_{source_start}():\n"
+    )
+    return [header, *context, *body, *trailer], added - removed
+
+
+def generate_diff(  # noqa: PLR0913
+    files: int = 2000,
+    hunks_per_file: int = 10,
+    *,
+    renames: float = 0.05,
+    deletions: float = 0.05,
+    additions: float = 0.05,
+    seed: int = 0,
+) -> SyntheticDiff:
+    """Generate a git diff in the format GitHub serves pull request diffs in
+
+    Args:
+        files: The number of files in the diff
+        hunks_per_file: The average number of hunks in each modified file
+        renames: The fraction of files which are renamed (and slightly modified)
+        deletions: The fraction of files which are deleted
+        additions: The fraction of files which are added
+        seed: The seed of the random number generator, so diffs are reproducible
+
+    Returns:
+        The diff, with the paths of its files
+    """
+    rng = random.Random(seed)  # noqa: S311
+    lines: list[str] = []
+    diff = SyntheticDiff("")
+
+    for i in range(files):
+        path = _path(rng, i)
+        kind = rng.random()
+        if kind < deletions:
+            length = rng.randint(10, 500)
+            lines += [
+                f"diff --git a/{path} b/{path}\n",
+                "deleted file mode 100644\n",
+                "index 1f38447..0000000\n",
+                f"--- a/{path}\n",
+                "+++ /dev/null\n",
+                f"@@ -1,{length} +0,0 @@\n",
+                *(f"-deleted line {n}\n" for n in range(length)),
+            ]
+            diff.hunks += 1
+        elif kind < deletions + additions:
+            length = rng.randint(10, 500)
+            lines += [
+                f"diff --git a/{path} b/{path}\n",
+                "new file mode 100644\n",
+                "index 0000000..1f38447\n",
+                "--- /dev/null\n",
+                f"+++ b/{path}\n",
+                f"@@ -0,0 +1,{length} @@\n",
+                *(f"+added line {n}\n" for n in range(length)),
+            ]
+            diff.hunks += 1
+        else:
+            target = path
+            lines.append(f"diff --git a/{path} b/{path}\n")
+            if kind < deletions + additions + renames:
+                target = path.replace("file_", "renamed_")
+                lines[-1] = f"diff --git a/{path} b/{target}\n"
+                lines += [
+                    "similarity index 95%\n",
+                    f"rename from {path}\n",
+                    f"rename to {target}\n",
+                ]
+            lines += ["index c7921f5..8946660 100644\n", f"--- a/{path}\n"]
+            lines.append(f"+++ b/{target}\n")
+
+            source_start = 1
+            offset = 0
+            for _ in range(rng.randint(1, 2 * hunks_per_file - 1)):
+                source_start += rng.randint(10, 80)
+                hunk, shift = _hunk(rng, source_start, offset)
+                lines += hunk
+                offset += shift
+                source_start += len(hunk)
+                diff.hunks += 1
+
+        diff.paths.append(path)
+
+    diff.text = "".join(lines)
+    return diff
+
+
+def generate_constitution(
+    paths: list[str],
+    *,
+    protected: float = 0.2,
+    locks_per_file: int = 50,
+    whole_files: float = 0.1,
+    seed: int = 0,
+) -> dict[str, list[list[int]] | None]:
+    """Generate a constitution protecting some of the given files
+
+    Args:
+        paths: The paths of the files which could be protected
+        protected: The fraction of files which are protected
+        locks_per_file: The number of protected ranges in each partly protected file
+        whole_files: The fraction of protected files which are protected entirely
+        seed: The seed of the random number generator
+
+    Returns:
+        The constitution in the format of constitution.json
+    """
+    rng = random.Random(seed)  # noqa: S311
+    constitution: dict[str, list[list[int]] | None] = {}
+    for path in rng.sample(paths, int(len(paths) * protected)):
+        if rng.random() < whole_files:
+            constitution[path] = None
+            continue
+
+        locks = []
+        start = 0
+        for _ in range(locks_per_file):
+            start += rng.randint(5, 100)
+            end = start + rng.randint(0, 20)
+            locks.append([start, end])
+            start = end
+        constitution[path] = locks
+
+    # Also protect files outside the diff, as in a real constitution
+    for i in range(len(paths) // 10):
+        constitution[f"docs/unchanged_{i}.rst"] = [[1, 10]]
+
+    return constitution
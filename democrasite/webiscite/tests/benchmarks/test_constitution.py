@@ -0,0 +1,101 @@
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from unidiff import PatchSet
+
+from democrasite.webiscite import constitution
+from democrasite.webiscite.constitution import CompiledConstitution
+from democrasite.webiscite.constitution import is_constitutional
+from democrasite.webiscite.constitution import protected_files
+from democrasite.webiscite.constitution import update_constitution
+
+from .synthetic import SyntheticDiff
+from .synthetic import generate_diff
+
+ROUNDS = 5
+MIB = 1024 * 1024
+
+
+def peak_memory(func: Callable[..., Any], *args: Any, **kwargs: Any) -> int:
+    """Return the peak memory allocated by a call, in bytes"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def record(benchmark, diff: SyntheticDiff, peak: int) -> None:
+    benchmark.extra_info["files"] = len(diff.paths)
+    benchmark.extra_info["hunks"] = diff.hunks
+    benchmark.extra_info["diff_bytes"] = len(diff.text)
+    benchmark.extra_info["peak_memory"] = peak
+
+
+@pytest.mark.usefixtures("compiled_constitution")
+class TestIsConstitutional:
+    def test_is_constitutional(self, benchmark, large_diff: SyntheticDiff):
+        benchmark.pedantic(is_constitutional, args=(large_diff.text,), rounds=ROUNDS)
+
+        peak = peak_memory(is_constitutional, large_diff.text)
+        record(benchmark, large_diff, peak)
+        # The diff is copied into a StringIO, which stores 4 bytes per character, but
+        # never parsed into objects
+        assert peak < 4 * len(large_diff.text) + MIB
+
+    def test_protected_files_first_only(self, benchmark, large_diff: SyntheticDiff):
+        lines = large_diff.text.splitlines(keepends=True)
+
+        benchmark.pedantic(
+            lambda: protected_files(iter(lines), first_only=True), rounds=ROUNDS
+        )
+
+        peak = peak_memory(protected_files, iter(lines), first_only=True)
+        record(benchmark, large_diff, peak)
+        # Streaming needs memory for the current line only
+        assert peak < MIB
+
+
+class TestCheckHunks:
+    @pytest.fixture(scope="class")
+    def long_file(self) -> SyntheticDiff:
+        """A single file with about 10000 hunks"""
+        return generate_diff(files=1, hunks_per_file=5000, deletions=0, additions=0)
+
+    def test_check_hunks(self, benchmark, long_file: SyntheticDiff):
+        patched_file = PatchSet(long_file.text)[0]
+        last_line = patched_file[-1].source_start + patched_file[-1].source_length
+        # Many locks past the end of the file, so every hunk has to be checked
+        compiled = CompiledConstitution.compile(
+            {
+                patched_file.path: [
+                    [line, line + 5]
+                    for line in range(last_line, last_line + 100_000, 10)
+                ]
+            }
+        )
+
+        with patch.object(constitution, "get_constitution", return_value=compiled):
+            assert not benchmark(is_constitutional, long_file.text)
+
+            peak = peak_memory(is_constitutional, long_file.text)
+        record(benchmark, long_file, peak)
+
+
+class TestUpdateConstitution:
+    def test_update_constitution(
+        self,
+        benchmark,
+        large_diff: SyntheticDiff,
+        compiled_constitution: CompiledConstitution,
+    ):
+        benchmark.pedantic(update_constitution, args=(large_diff.text,), rounds=ROUNDS)
+
+        peak = peak_memory(update_constitution, large_diff.text)
+        record(benchmark, large_diff, peak)
+        # The whole diff is parsed into objects
+        assert peak < 20 * len(large_diff.text) + MIB
@@ -0,0 +1,131 @@
+import random
+
+import pytest
+from django.db import connection
+from django.db import models
+from django.db import transaction
+
+from democrasite.users.models import User
+from democrasite.webiscite.models import Bill
+from democrasite.webiscite.models import PullRequest
+from democrasite.webiscite.models import Vote
+from democrasite.webiscite.pagination import PAGE_SIZE
+from democrasite.webiscite.pagination import paginate
+
+BILLS = 10_000
+VOTES = 100_000
+USERS = 1_000
+BATCH_SIZE = 5_000
+
+
+def subquery_user_vote(user: User, queryset: models.QuerySet[Bill]):
+    """The previous implementation of ``BillManager.annotate_user_vote``, for
+    comparison, which correlates a copy of the whole queryset for each bill"""
+    return queryset.annotate(
+        user_vote=models.Subquery(
+            queryset.filter(vote__bill=models.OuterRef("pk"), vote__user=user).values(
+                "vote__support"
+            )
+        )
+    )
+
+
+def filtered_relation_user_vote(user: User, queryset: models.QuerySet[Bill]):
+    return Bill.objects.annotate_user_vote(user, queryset)
+
+
+@pytest.fixture(scope="module")
+def voter(django_db_setup, django_db_blocker):
+    """A user who voted on 100 of 10000 bills, among 100000 votes by 1000 users
+
+    The data is created once for the module and rolled back afterwards.
+    """
+    rng = random.Random(0)  # noqa: S311
+    with django_db_blocker.unblock(), transaction.atomic():
+        users = User.objects.bulk_create(
+            User(username=f"voter{i}", email=f"voter{i}@example.com")
+            for i in range(USERS)
+        )
+        pull_requests = PullRequest.objects.bulk_create(
+            (
+                PullRequest(
+                    number=-i - 1,
+                    title=f"Pull request {i}",
+                    additions=1,
+                    deletions=1,
+                    diff_url="",
+                    author_name="author",
+                    status="open",
+                    sha=f"{i:040x}",
+                )
+                for i in range(BILLS)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        bills = Bill.objects.bulk_create(
+            (
+                Bill(
+                    name=pull_request.title,
+                    author=rng.choice(users),
+                    pull_request=pull_request,
+                )
+                for pull_request in pull_requests
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        Vote.objects.bulk_create(
+            (
+                Vote(bill=bill, user=user, support=rng.random() < 0.5)  # noqa: PLR2004
+                for user in users
+                for bill in rng.sample(bills, VOTES // USERS)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        yield users[0]
+        transaction.set_rollback(True)
+
+
+def record_plan(benchmark, queryset: models.QuerySet) -> str:
+    plan = queryset.explain()
+    benchmark.extra_info["plan"] = plan
+    return plan
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "annotate",
+    [filtered_relation_user_vote, subquery_user_vote],
+    ids=["filtered_relation", "subquery"],
+)
+class TestAnnotateUserVote:
+    def test_page(self, benchmark, voter: User, annotate):
+        """The first page of the bill list"""
+        queryset = annotate(voter, Bill.objects.all())
+
+        page = benchmark(paginate, queryset, None, PAGE_SIZE)
+
+        assert len(page.object_list) == PAGE_SIZE
+        record_plan(benchmark, queryset.order_by("created", "id")[: PAGE_SIZE + 1])
+
+    def test_all(self, benchmark, voter: User, annotate):
+        """Every bill, as when the votes are counted across the whole list"""
+        queryset = annotate(voter, Bill.objects.all()).values_list("pk", "user_vote")
+
+        rows = benchmark(lambda: list(queryset.all()))  # A new query each round
+
+        assert sum(vote is not None for __, vote in rows) == VOTES // USERS
+        plan = record_plan(benchmark, queryset)
+        if annotate is filtered_relation_user_vote:
+            assert "SubPlan" not in plan
+
+    def test_voted(self, benchmark, voter: User, annotate):
+        """The bills the user voted on, as in the "My Votes" list"""
+        queryset = annotate(voter, voter.votes.all()).values_list("pk", "user_vote")
+
+        rows = benchmark(lambda: list(queryset.all()))  # A new query each round
+
+        assert len(rows) == VOTES // USERS
+        record_plan(benchmark, queryset)
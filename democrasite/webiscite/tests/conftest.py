@@ -1,11 +1,63 @@
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import fakeredis
 import pytest
+from django.core.cache import cache
 
+from democrasite.webiscite import github_api
+from democrasite.webiscite import tally
 from democrasite.webiscite.models import Bill
 
 from .factories import BillFactory
+from .fake_github import FakeGithub
 
 
 @pytest.fixture
 def bill() -> Bill:
     """Create a Bill instance with status 'open'"""
     return BillFactory.create()
+
+
+@pytest.fixture
+def redis_tally(settings):
+    """Record votes in a fake Redis server instead of the database"""
+    settings.WEBISCITE_TALLY_BACKEND = "redis"
+    client = fakeredis.FakeRedis(decode_responses=True)
+    with patch.object(tally, "get_client", return_value=client):
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def _diff_storage(settings, tmp_path):
+    """Store diffs in a temporary directory"""
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "diffs": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": str(tmp_path / "diffs")},
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def _cache():
+    """Start each test with an empty cache, which isn't reset between tests"""
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _github_api():
+    """Start each test without a cached GitHub client or objects"""
+    github_api.reset()
+    yield
+    github_api.reset()
+
+
+@pytest.fixture
+def fake_github(settings) -> Iterator[FakeGithub]:
+    """Send requests to the GitHub API to a local fake server"""
+    with FakeGithub(settings.WEBISCITE_REPO) as server:
+        settings.WEBISCITE_GITHUB_API_URL = server.url
+        settings.WEBISCITE_GITHUB_TOKEN = "token"  # noqa: S105
+        yield server
@@ -5,6 +5,8 @@ import factory
 from democrasite.users.tests.factories import UserFactory
 from democrasite.webiscite.models import Bill
 from democrasite.webiscite.models import PullRequest
+from democrasite.webiscite.models import Submission
+from democrasite.webiscite.models import WebhookDelivery
 
 
 class PullRequestFactory(factory.django.DjangoModelFactory[PullRequest]):
@@ -31,21 +33,48 @@ class BillFactory(factory.django.DjangoModelFactory[Bill]):
     # Fields with defaults
     status = Bill.Status.OPEN
     constitutional = False
-    # _submit_task is created by Bill.save() for non-draft bills
+    # voting_ends_at is set by Bill.save() for non-draft bills
 
     class Meta:
         model = Bill
 
 
+class SubmissionFactory(factory.django.DjangoModelFactory[Submission]):
+    # constitutional so merging doesn't update the constitution
+    bill = factory.SubFactory(
+        BillFactory, status=Bill.Status.APPROVED, constitutional=True
+    )
+    action = Submission.Action.MERGE
+
+    class Meta:
+        model = Submission
+
+
+class WebhookDeliveryFactory(factory.django.DjangoModelFactory[WebhookDelivery]):
+    delivery_id = factory.Faker("uuid4")
+    event = "pull_request"
+    action = "opened"
+    pull_request_number = -1
+    payload = factory.LazyAttribute(
+        lambda o: {
+            "action": o.action,
+            "pull_request": {"number": o.pull_request_number},
+        }
+    )
+
+    class Meta:
+        model = WebhookDelivery
+
+
 class GithubPullRequestFactory(factory.Factory[dict[str, Any]]):
     """Generate a dict representing a pull request from the GitHub API"""
 
     bill = factory.SubFactory(BillFactory, status=Bill.Status.CLOSED)
 
-    user = factory.DictFactory(
-        id=factory.Faker("random_int"), login=factory.Faker("user_name")
+    user = factory.Dict(
+        {"id": factory.Faker("random_int"), "login": factory.Faker("user_name")}
     )
-    head = factory.DictFactory(sha=factory.Faker("pystr", min_chars=40, max_chars=40))
+    head = factory.Dict({"sha": factory.Faker("pystr", min_chars=40, max_chars=40)})
     title = factory.SelfAttribute("bill.name")
     body = factory.SelfAttribute("bill.description")
     number = factory.SelfAttribute("bill.pull_request.number")
@@ -0,0 +1,149 @@
+"""A local server imitating the parts of the GitHub REST API used by the tasks"""
+
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Self
+from urllib.parse import parse_qs
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+# Fields of a pull request which GitHub only includes when it is fetched on its own
+DETAIL_FIELDS = ("additions", "deletions", "changed_files", "commits", "mergeable")
+
+
+class FakeGithub:
+    """Serve pull requests from memory, recording every request made
+
+    Use it as a context manager to run the server in a background thread.
+    """
+
+    def __init__(self, repo: str, rate_limit: int = 5000):
+        self.repo = repo
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        #: The pull requests in the repository, by number
+        self.pulls: dict[int, dict[str, Any]] = {}
+        #: The diff of each pull request, by number
+        self.diffs: dict[int, str] = {}
+        #: The path and query of each request received
+        self.requests: list[str] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self  # type: ignore[attr-defined]
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_pull(self, pr: dict[str, Any], diff: str = "") -> dict[str, Any]:
+        """Add a pull request, pointing its URLs at this server
+
+        Args:
+            pr: The pull request, e.g. from ``GithubPullRequestFactory``
+            diff: The diff of the pull request
+
+        Returns:
+            The pull request as it is served
+        """
+        number = pr["number"]
+        pr = {
+            **pr,
+            "url": f"{self.url}/repos/{self.repo}/pulls/{number}",
+            "diff_url": f"{self.url}/diffs/{number}",
+        }
+        self.pulls[number] = pr
+        self.diffs[number] = diff
+        return pr
+
+    def __enter__(self) -> Self:
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: ThreadingHTTPServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:
+        fake: FakeGithub = self.server.fake  # type: ignore[attr-defined]
+        fake.requests.append(self.path)
+        fake.remaining -= 1
+
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        pulls_path = f"/repos/{fake.repo}/pulls"
+        if url.path == pulls_path:
+            self._list_pulls(fake, query)
+        elif url.path.startswith(f"{pulls_path}/"):
+            number = int(url.path.rsplit("/", 1)[1])
+            if number in fake.pulls:
+                self._send(fake, fake.pulls[number])
+            else:
+                self._send(fake, {"message": "Not Found"}, HTTPStatus.NOT_FOUND)
+        elif (
+            url.path.startswith("/diffs/")
+            and (diff := fake.diffs.get(int(url.path.rsplit("/", 1)[1]))) is not None
+        ):
+            body = diff.encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send(fake, {"message": "Not Found"}, HTTPStatus.NOT_FOUND)
+
+    def _list_pulls(self, fake: FakeGithub, query: dict[str, str]) -> None:
+        """Serve a page of pull requests, newest first by default, without their
+        details"""
+        state = query.get("state", "open")
+        per_page = int(query.get("per_page", 30))
+        page = int(query.get("page", 1))
+        pulls = [
+            {key: value for key, value in pr.items() if key not in DETAIL_FIELDS}
+            for number, pr in sorted(
+                fake.pulls.items(), reverse=query.get("direction") != "asc"
+            )
+            if state in ("all", pr["state"])
+        ]
+
+        headers = {}
+        if page * per_page < len(pulls):
+            next_query = urlencode({**query, "page": page + 1})
+            next_url = f"{fake.url}/repos/{fake.repo}/pulls?{next_query}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        self._send(
+            fake, pulls[(page - 1) * per_page : page * per_page], headers=headers
+        )
+
+    def _send(
+        self,
+        fake: FakeGithub,
+        data: Any,
+        status: HTTPStatus = HTTPStatus.OK,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-RateLimit-Limit", str(fake.rate_limit))
+        self.send_header("X-RateLimit-Remaining", str(fake.remaining))
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,135 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from allauth.socialaccount.models import SocialAccount
+
+from democrasite.users.models import User
+from democrasite.webiscite import constitution
+from democrasite.webiscite.backfill import Checkpoint
+from democrasite.webiscite.backfill import import_pulls
+from democrasite.webiscite.constitution import CompiledConstitution
+from democrasite.webiscite.models import Bill
+from democrasite.webiscite.models import PullRequest
+
+from .factories import GithubPullRequestFactory
+from .fake_github import FakeGithub
+
+DIFF = """\
+diff --git a/README.md b/README.md
+index 1f38447..8946660 100644
+--- a/README.md
++++ b/README.md
+@@ -1,3 +1,4 @@
+ # Title
+--- not a header
++++ not a header
++Added
+ Text
+"""
+
+
+class TestCheckpoint:
+    def test_new(self, tmp_path: Path):
+        checkpoint = Checkpoint.load(tmp_path / "checkpoint.json", "all")
+
+        assert checkpoint.page == 0
+
+    def test_resumed(self, tmp_path: Path):
+        Checkpoint(tmp_path / "checkpoint.json", "all").save(3)
+
+        assert Checkpoint.load(tmp_path / "checkpoint.json", "all").page == 3  # noqa: PLR2004
+
+    def test_other_state(self, tmp_path: Path):
+        Checkpoint(tmp_path / "checkpoint.json", "all").save(3)
+
+        assert Checkpoint.load(tmp_path / "checkpoint.json", "open").page == 0
+
+    def test_clear(self, tmp_path: Path):
+        checkpoint = Checkpoint(tmp_path / "checkpoint.json", "all")
+        checkpoint.save(1)
+
+        checkpoint.clear()
+
+        assert not checkpoint.path.exists()
+
+
+class TestImportPulls:
+    @pytest.fixture
+    def author(self, user: User) -> SocialAccount:
+        return SocialAccount.objects.create(user=user, provider="github", uid="1234")
+
+    def _pull(self, fake_github: FakeGithub, number: int, **kwargs) -> dict:
+        pr = GithubPullRequestFactory.build(number=number, **kwargs)
+        pr["user"]["id"] = 1234
+        return fake_github.add_pull(pr, diff=DIFF)
+
+    def test_counts_lines(self, fake_github: FakeGithub, author: SocialAccount):
+        pr = self._pull(fake_github, 1)
+
+        pull_requests, bills = import_pulls([pr])
+
+        pull_request = PullRequest.objects.get(number=1)
+        assert pull_requests == [pull_request]
+        assert (pull_request.additions, pull_request.deletions) == (2, 1)
+        assert pull_request.history.count() == 1
+        assert bills[0].author == author.user
+
+    def test_bill_statuses(self, fake_github: FakeGithub, author: SocialAccount):
+        pulls = [
+            self._pull(fake_github, 1),
+            self._pull(fake_github, 2, draft=True),
+            self._pull(fake_github, 3, state="closed"),
+        ]
+
+        import_pulls(pulls)
+
+        bills = Bill.objects.order_by("pull_request")
+        assert [bill.status for bill in bills] == [
+            Bill.Status.OPEN,
+            Bill.Status.DRAFT,
+            Bill.Status.CLOSED,
+        ]
+        assert bills[0].voting_ends_at is not None
+        assert bills[1].voting_ends_at is None
+
+    def test_constitutional(self, fake_github: FakeGithub, author: SocialAccount):
+        pr = self._pull(fake_github, 1)
+        compiled = CompiledConstitution.compile({"README.md": None})
+
+        with patch.object(constitution, "get_constitution", return_value=compiled):
+            __, bills = import_pulls([pr])
+
+        assert bills[0].constitutional
+
+    def test_no_account(self, fake_github: FakeGithub):
+        pr = self._pull(fake_github, 1)
+
+        pull_requests, bills = import_pulls([pr])
+
+        assert len(pull_requests) == 1
+        assert bills == []
+
+    def test_already_stored(self, fake_github: FakeGithub, author: SocialAccount):
+        pr = self._pull(fake_github, 1)
+        import_pulls([pr])
+
+        pull_requests, bills = import_pulls([pr])
+
+        assert pull_requests == []
+        assert bills == []
+        assert len(fake_github.requests) == 1  # The diff was only downloaded once
+
+    def test_same_head(self, fake_github: FakeGithub, author: SocialAccount, caplog):
+        stored = self._pull(fake_github, 1)
+        import_pulls([stored])
+        first = self._pull(fake_github, 2, head={"sha": "a" * 40})
+        duplicate = self._pull(fake_github, 3, head={"sha": "a" * 40})
+        reopened = self._pull(fake_github, 4, head=stored["head"])
+
+        pull_requests, bills = import_pulls([first, duplicate, reopened])
+
+        assert [pull_request.number for pull_request in pull_requests] == [2]
+        assert len(bills) == 1
+        assert "Skipped pull request #3" in caplog.text
+        assert "Skipped pull request #4" in caplog.text
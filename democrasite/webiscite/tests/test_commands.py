@@ -0,0 +1,126 @@
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import requests
+from django.core.management import call_command
+
+from democrasite.users.models import User
+from democrasite.webiscite import github_api
+from democrasite.webiscite.managers import ConstitutionCheck
+from democrasite.webiscite.models import Bill
+from democrasite.webiscite.models import PullRequest
+from democrasite.webiscite.models import Vote
+
+from .factories import BillFactory
+from .factories import GithubPullRequestFactory
+from .fake_github import FakeGithub
+
+
+class TestRecountVotes:
+    def test_recount_all(self, bill: Bill, user: User):
+        Vote.objects.create(bill=bill, user=user, support=False)
+        out = StringIO()
+
+        call_command("recount_votes", stdout=out)
+
+        bill.refresh_from_db()
+        assert bill.no_count == 1
+        assert "Repaired vote tallies of 1 bill(s)" in out.getvalue()
+
+    def test_recount_selected(self, bill: Bill, user: User):
+        other_bill = BillFactory.create()
+        Vote.objects.create(bill=bill, user=user, support=True)
+        Vote.objects.create(bill=other_bill, user=user, support=True)
+
+        call_command("recount_votes", str(other_bill.pk), stdout=StringIO())
+
+        bill.refresh_from_db()
+        other_bill.refresh_from_db()
+        assert bill.yes_count == 0
+        assert other_bill.yes_count == 1
+
+
+class TestRecheckConstitutional:
+    @patch.object(Bill.objects, "recheck_constitutional")
+    def test_recheck_selected(self, mock_recheck, bill: Bill):
+        bill.constitutional = True
+        mock_recheck.return_value = [ConstitutionCheck(bill, changed=True, seconds=0.5)]
+        out = StringIO()
+
+        call_command("recheck_constitutional", str(bill.pk), workers=2, stdout=out)
+
+        bills = mock_recheck.call_args.args[0]
+        assert list(bills) == [bill]
+        assert mock_recheck.call_args.kwargs == {"workers": 2}
+        assert f"Bill {bill.pk}: constitutional (changed) in 0.500s" in out.getvalue()
+        assert "Checked 1 bill(s)" in out.getvalue()
+
+
+class TestBackfillPullRequests:
+    @pytest.fixture
+    def checkpoint(self, tmp_path: Path) -> Path:
+        return tmp_path / "checkpoint.json"
+
+    @pytest.fixture
+    def pulls(self, fake_github: FakeGithub) -> list[dict]:
+        return [
+            fake_github.add_pull(GithubPullRequestFactory.build(number=number))
+            for number in range(1, 6)
+        ]
+
+    @patch.object(github_api, "PER_PAGE", 2)
+    @pytest.mark.usefixtures("pulls")
+    def test_backfill(self, checkpoint: Path):
+        out = StringIO()
+
+        call_command(
+            "backfill_pull_requests", workers=1, checkpoint=checkpoint, stdout=out
+        )
+
+        assert PullRequest.objects.count() == 5  # noqa: PLR2004
+        assert "Page 3: imported 1 of 1 pull request(s)" in out.getvalue()
+        assert "Imported 5 pull request(s) and created 0 bill(s)" in out.getvalue()
+        assert not checkpoint.exists()
+
+    @patch.object(github_api, "PER_PAGE", 2)
+    @pytest.mark.usefixtures("pulls")
+    def test_resumed(self, fake_github: FakeGithub, checkpoint: Path):
+        checkpoint.write_text('{"state": "all", "page": 2}')
+        out = StringIO()
+
+        call_command(
+            "backfill_pull_requests", workers=1, checkpoint=checkpoint, stdout=out
+        )
+
+        assert list(PullRequest.objects.values_list("number", flat=True)) == [5]
+        assert "Resuming after page 2" in out.getvalue()
+        assert "page=3" in fake_github.requests[0]
+
+    @patch.object(github_api, "PER_PAGE", 2)
+    def test_interrupted(self, fake_github: FakeGithub, pulls, checkpoint: Path):
+        fake_github.diffs.pop(pulls[-1]["number"])  # The download of a diff fails
+
+        with pytest.raises(requests.HTTPError):
+            call_command(
+                "backfill_pull_requests",
+                workers=1,
+                checkpoint=checkpoint,
+                stdout=StringIO(),
+            )
+
+        assert PullRequest.objects.count() == 4  # noqa: PLR2004
+        assert checkpoint.read_text() == '{"state": "all", "page": 2}'
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.usefixtures("pulls")
+    def test_threads(self, checkpoint: Path):
+        call_command(
+            "backfill_pull_requests",
+            workers=4,
+            checkpoint=checkpoint,
+            stdout=StringIO(),
+        )
+
+        assert PullRequest.objects.count() == 5  # noqa: PLR2004
@@ -1,12 +1,18 @@
+import os
 from typing import TYPE_CHECKING
 from unittest.mock import patch
 
+import pytest
 from django.conf import settings
 from unidiff import PatchSet
 
 from democrasite.webiscite import constitution
-from democrasite.webiscite.constitution import _check_hunks
+from democrasite.webiscite.constitution import CompiledConstitution
+from democrasite.webiscite.constitution import LineMap
+from democrasite.webiscite.constitution import Locks
+from democrasite.webiscite.constitution import get_constitution
 from democrasite.webiscite.constitution import is_constitutional
+from democrasite.webiscite.constitution import protected_files
 from democrasite.webiscite.constitution import read_constitution
 from democrasite.webiscite.constitution import update_constitution
 
@@ -14,6 +20,13 @@ if TYPE_CHECKING:
     from pathlib import Path
 
 
+def _hunks_protected(diff: str, pairs: list[list[int]]) -> bool:
+    """Return whether a diff of modified_file edits any of the given line ranges"""
+    compiled = CompiledConstitution.compile({"modified_file": pairs})
+    with patch.object(constitution, "get_constitution", return_value=compiled):
+        return bool(is_constitutional(diff))
+
+
 class TestCheckHunks:
     def test_short_file_start(self):
         diff = """diff --git a/modified_file b/modified_file
@@ -26,18 +39,17 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        file = PatchSet(diff)[0]
         start_lock = [[1, 1]]
 
-        assert _check_hunks(file, start_lock)
+        assert _hunks_protected(diff, start_lock)
 
         end_lock = [[5, 5]]
 
-        assert _check_hunks(file, end_lock)
+        assert _hunks_protected(diff, end_lock)
 
         bad_lock = [[6, 6]]
 
-        assert not _check_hunks(file, bad_lock)
+        assert not _hunks_protected(diff, bad_lock)
 
     def test_long_file_start(self):
         # Long refers to being long enough to include the full 6 lines of context
@@ -53,19 +65,18 @@ index c7921f5..8946660 100644
 
  This will stay.
  This will also stay."""
-        file = PatchSet(diff)[0]
         start_lock = [[1, 1]]
 
-        assert _check_hunks(file, start_lock)
+        assert _hunks_protected(diff, start_lock)
 
         edit_lock = [[4, 4]]  # The actual altered line
 
-        assert _check_hunks(file, edit_lock)
+        assert _hunks_protected(diff, edit_lock)
 
         end_lock = [[5, 5]]
 
         # Since the diff is >=7 lines, the ending context should be ignored
-        assert not _check_hunks(file, end_lock)
+        assert not _hunks_protected(diff, end_lock)
 
     def test_short_file(self):
         diff = """diff --git a/modified_file b/modified_file
@@ -79,19 +90,18 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        file = PatchSet(diff)[0]
         start_lock = [[5, 5]]
 
         # Since the diff start != 1, the beginning context should be ignored
-        assert not _check_hunks(file, start_lock)
+        assert not _hunks_protected(diff, start_lock)
 
         edit_lock = [[6, 6]]
 
-        assert _check_hunks(file, edit_lock)
+        assert _hunks_protected(diff, edit_lock)
 
         end_lock = [[8, 8]]
 
-        assert _check_hunks(file, end_lock)
+        assert _hunks_protected(diff, end_lock)
 
     def test_long_file(self):
         diff = """diff --git a/modified_file b/modified_file
@@ -106,19 +116,18 @@ index c7921f5..8946660 100644
 
  This will stay.
  This will also stay."""
-        file = PatchSet(diff)[0]
         start_lock = [[5, 5]]
         # All context should be ignored in this diff
 
-        assert not _check_hunks(file, start_lock)
+        assert not _hunks_protected(diff, start_lock)
 
         edit_lock = [[6, 6]]
 
-        assert _check_hunks(file, edit_lock)
+        assert _hunks_protected(diff, edit_lock)
 
         end_lock = [[7, 7]]
 
-        assert not _check_hunks(file, end_lock)
+        assert not _hunks_protected(diff, end_lock)
 
     def test_long_diff(self):
         diff = """diff --git a/modified_file b/modified_file
@@ -135,27 +144,95 @@ index c7921f5..8946660 100644
 
  This will stay.
  This will also stay."""
-        file = PatchSet(diff)[0]
         start_lock = [[5, 5]]
         # All context should be ignored in this diff
 
-        assert not _check_hunks(file, start_lock)
+        assert not _hunks_protected(diff, start_lock)
 
         within_edit_lock = [[7, 7]]
 
-        assert _check_hunks(file, within_edit_lock)
+        assert _hunks_protected(diff, within_edit_lock)
 
         around_edit_lock = [[5, 9]]
 
-        assert _check_hunks(file, around_edit_lock)
+        assert _hunks_protected(diff, around_edit_lock)
 
         end_lock = [[9, 9]]
 
-        assert not _check_hunks(file, end_lock)
+        assert not _hunks_protected(diff, end_lock)
+
+
+class TestLocks:
+    def test_from_pairs_merged(self):
+        locks = Locks.from_pairs([[20, 25], [1, 5], [4, 8], [9, 10], [30, 30]])
+
+        assert locks == Locks(starts=(1, 20, 30), ends=(10, 25, 30))
+
+    def test_contains(self):
+        locks = Locks.from_pairs([[5, 10], [20, 20]])
+
+        protected = [line for line in range(25) if locks.contains(line)]
+
+        assert protected == [*range(5, 11), 20]
+
+    def test_overlaps(self):
+        locks = Locks.from_pairs([[5, 10], [20, 20]])
+
+        assert locks.overlaps(1, 5)
+        assert locks.overlaps(10, 15)
+        assert locks.overlaps(1, 30)
+        assert locks.overlaps(6, 7)
+        assert not locks.overlaps(11, 19)
+        assert not locks.overlaps(1, 4)
+
+    def test_overlaps_reversed(self):
+        # Short hunks can end before they start once context is removed
+        locks = Locks.from_pairs([[5, 10]])
+
+        assert locks.overlaps(12, 9)
+        assert not locks.overlaps(15, 4)
+
+
+class TestGetConstitution:
+    @pytest.fixture
+    def constitution_file(self, settings, tmp_path, monkeypatch):
+        monkeypatch.setattr(constitution, "_compiled", None)
+        settings.BASE_DIR = tmp_path
+        path = tmp_path / "constitution.json"
+        path.write_text('{"file": [[1, 2]]}')
+        return path
+
+    def test_compiled(self, constitution_file):
+        compiled = get_constitution()
+
+        assert compiled.raw == {"file": [[1, 2]]}
+        assert compiled.files == {"file": Locks(starts=(1,), ends=(2,))}
+
+    def test_cached(self, constitution_file):
+        compiled = get_constitution()
+
+        with patch.object(CompiledConstitution, "compile") as mock_compile:
+            assert get_constitution() is compiled
+            # Touching the file without changing it doesn't recompile it
+            os.utime(constitution_file, ns=(0, 0))
+            assert get_constitution() is compiled
+
+        mock_compile.assert_not_called()
+
+    def test_recompiled_when_changed(self, constitution_file):
+        get_constitution()
+
+        constitution_file.write_text('{"file": null, "other_file": [[3, 4]]}')
+        os.utime(constitution_file, ns=(0, 0))
+
+        assert get_constitution().files == {
+            "file": None,
+            "other_file": Locks(starts=(3,), ends=(4,)),
+        }
 
 
 class TestIsConstitutional:
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_file_lock_removed(self, mock_constitution):
         diff = """diff --git a/removed_file b/removed_file
 deleted file mode 100644
@@ -166,11 +243,13 @@ index 1f38447..0000000
 -This content shouldn't be here.
 -
 -This file will be removed."""
-        mock_constitution.return_value = {"removed_file": [[15, 15]]}
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"removed_file": [[15, 15]]}
+        )
 
         assert is_constitutional(diff) == ["removed_file"]
 
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_file_lock_renamed(self, mock_constitution):
         diff = """diff --git a/added_file b/moved_file
 similarity index 85%
@@ -185,11 +264,13 @@ index a071991..4dbab21 100644
  Some content
 -Some content
 +Some modified content"""
-        mock_constitution.return_value = {"added_file": [[15, 15]]}
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"added_file": [[15, 15]]}
+        )
 
         assert is_constitutional(diff) == ["added_file"]
 
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_whole_file_locked(self, mock_constitution):
         diff = """diff --git a/modified_file b/modified_file
 index c7921f5..8946660 100644
@@ -201,11 +282,13 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        mock_constitution.return_value = {"modified_file": None}
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"modified_file": None}
+        )
 
         assert is_constitutional(diff) == ["modified_file"]
 
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_hunk_locked(self, mock_constitution):
         # This is basically an integration test, mainly for 100% coverage
         diff = """diff --git a/modified_file b/modified_file
@@ -218,11 +301,13 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        mock_constitution.return_value = {"modified_file": [[3, 3]]}
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"modified_file": [[3, 3]]}
+        )
 
         assert is_constitutional(diff) == ["modified_file"]
 
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_file_not_locked(self, mock_constitution):
         diff = """diff --git a/removed_file b/removed_file
 deleted file mode 100644
@@ -233,13 +318,73 @@ index 1f38447..0000000
 -This content shouldn't be here.
 -
 -This file will be removed."""
-        mock_constitution.return_value = {}
+        mock_constitution.return_value = CompiledConstitution.compile({})
 
         assert not is_constitutional(diff)
 
 
+class TestProtectedFiles:
+    DIFF = """diff --git a/first_file b/first_file
+index c7921f5..8946660 100644
+--- a/first_file
++++ b/first_file
+@@ -1,3 +1,3 @@
+ Some content
+--- a/second_file
++++ b/second_file
+ Some content
+diff --git a/second_file b/second_file
+index c7921f5..8946660 100644
+--- a/second_file
++++ b/second_file
+@@ -1,2 +1,2 @@
+-Some content
++Some modified content
+ Some content
+diff --git a/third_file b/third_file
+deleted file mode 100644
+index 1f38447..0000000
+--- a/third_file
++++ /dev/null
+@@ -1 +0,0 @@
+-This file will be removed.
+"""
+
+    @pytest.fixture(autouse=True)
+    def _constitution(self):
+        compiled = CompiledConstitution.compile(
+            {"first_file": [[20, 20]], "second_file": [[1, 1]], "third_file": [[9, 9]]}
+        )
+        with patch.object(constitution, "get_constitution", return_value=compiled):
+            yield
+
+    def test_full_report(self):
+        lines = self.DIFF.splitlines(keepends=True)
+
+        # The body of the first hunk is skipped, so it doesn't start a new file
+        assert protected_files(lines) == ["second_file", "third_file"]
+        assert protected_files(lines) == is_constitutional(self.DIFF)
+
+    def test_first_only(self):
+        lines = iter(self.DIFF.splitlines(keepends=True))
+
+        assert protected_files(lines, first_only=True) == ["second_file"]
+        # Reading stopped at the protected hunk
+        assert next(lines) == "-Some content\n"
+
+    def test_unified_diff(self):
+        diff = """--- first_file
++++ first_file
+@@ -20 +20 @@
+-Some content
++Some modified content
+"""
+
+        assert protected_files(diff.splitlines(keepends=True)) == ["first_file"]
+
+
 class TestUpdateConstitution:
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_whole_file_locked(self, mock_constitution):
         diff = """diff --git a/modified_file b/modified_file
 index c7921f5..8946660 100644
@@ -251,11 +396,13 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        mock_constitution.return_value = {"modified_file": None}
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"modified_file": None}
+        )
 
         assert update_constitution(diff) == ""
 
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_file_updated(self, mock_constitution):
         diff = """diff --git a/modified_file b/modified_file
 index c7921f5..8946660 100644
@@ -267,11 +414,13 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        mock_constitution.return_value = {"modified_file": [[15, 15]]}
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"modified_file": [[15, 15]]}
+        )
 
         assert update_constitution(diff) == '{"modified_file": [[14, 14]]}'
 
-    @patch.object(constitution, "read_constitution")
+    @patch.object(constitution, "get_constitution")
     def test_file_not_locked(self, mock_constitution):
         diff = """diff --git a/modified_file b/modified_file
 index c7921f5..8946660 100644
@@ -283,10 +432,67 @@ index c7921f5..8946660 100644
 -This should be updated.
 
  This will stay."""
-        mock_constitution.return_value = {}
+        mock_constitution.return_value = CompiledConstitution.compile({})
 
         assert update_constitution(diff) == ""
 
+    def test_multiple_diffs(self):
+        first = """diff --git a/modified_file b/modified_file
+--- a/modified_file
++++ b/modified_file
+@@ -1,2 +1,3 @@
+ Line 1
++Added line
+ Line 2
+"""
+        second = """diff --git a/modified_file b/modified_file
+--- a/modified_file
++++ b/modified_file
+@@ -1,4 +1,2 @@
+-Line 1
+-Added line
+ Line 2
+ Line 3
+"""
+
+        # Each diff is applied to the result of the one before
+        result = update_constitution(
+            first, second, raw={"modified_file": [[3, 4]], "other_file": [[1, 1]]}
+        )
+
+        assert result == '{"modified_file": [[2, 3]], "other_file": [[1, 1]]}'
+
+
+class TestLineMap:
+    DIFF = """diff --git a/modified_file b/modified_file
+--- a/modified_file
++++ b/modified_file
+@@ -2,4 +2,4 @@
+ Line 2
+ Line 3
+-Line 4
++Changed line 4
+ Line 5
+@@ -10,0 +11,2 @@
++Added line
++Added line
+"""
+
+    @pytest.fixture
+    def line_map(self) -> LineMap:
+        return LineMap(PatchSet(self.DIFF)[0])
+
+    def test_before_hunks(self, line_map: LineMap):
+        assert line_map[1] == 1
+
+    def test_within_hunk(self, line_map: LineMap):
+        # Context lines keep their place and removed lines map to their replacement
+        assert [line_map[line] for line in range(2, 6)] == [2, 3, 4, 5]
+
+    def test_after_hunks(self, line_map: LineMap):
+        assert line_map[10] == 10  # noqa: PLR2004
+        assert line_map[11] == 13  # noqa: PLR2004
+
 
 class TestConstitutionFiles:
     def test_constitution_files(self):
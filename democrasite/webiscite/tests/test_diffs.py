@@ -0,0 +1,123 @@
+from contextlib import closing
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.files.storage import storages
+from django.utils import timezone
+
+from democrasite.webiscite import diffs
+from democrasite.webiscite.models import StoredDiff
+
+from .factories import PullRequestFactory
+
+DIFF = "diff --git a/README.md b/README.md\n"
+
+
+class TestGetDiff:
+    @patch("requests.get")
+    def test_downloaded_once(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode()]
+        pull_request = PullRequestFactory.create()
+
+        assert diffs.get_diff(pull_request) == DIFF
+        assert diffs.get_diff(pull_request) == DIFF
+
+        mock_get.assert_called_once_with(pull_request.diff_url, timeout=60, stream=True)
+        assert storages["diffs"].exists(f"{pull_request.sha}.diff.gz")
+        stored = StoredDiff.objects.get(sha=pull_request.sha)
+        assert 0 < stored.size < len(DIFF) + 100
+
+    @patch("requests.get")
+    def test_keyed_by_sha(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode()]
+        pull_request = PullRequestFactory.create()
+        diffs.get_diff(pull_request)
+
+        pull_request.sha = "0" * 40
+        diffs.get_diff(pull_request)
+
+        assert mock_get.call_count == 2  # noqa: PLR2004
+
+    @patch("requests.get")
+    def test_marks_used(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode()]
+        pull_request = PullRequestFactory.create()
+        diffs.get_diff(pull_request)
+        StoredDiff.objects.update(last_used=timezone.now() - timedelta(days=1))
+
+        diffs.get_diff(pull_request)
+
+        stored = StoredDiff.objects.get()
+        assert stored.last_used > timezone.now() - timedelta(minutes=1)
+
+    @patch("requests.get")
+    def test_marks_used_once_per_interval(self, mock_get, django_assert_num_queries):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode()]
+        pull_request = PullRequestFactory.create()
+        diffs.get_diff(pull_request)
+        last_used = StoredDiff.objects.get().last_used
+
+        # Only the update, which matches no rows
+        with django_assert_num_queries(1):
+            diffs.get_diff(pull_request)
+
+        assert StoredDiff.objects.get().last_used == last_used
+
+
+class TestIterDiff:
+    @patch("requests.get")
+    def test_split_across_chunks(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [b"a\nb", b"c\n", b"d"]
+        pull_request = PullRequestFactory.create()
+
+        assert list(diffs.iter_diff(pull_request)) == ["a\n", "bc\n", "d"]
+        assert list(diffs.iter_diff(pull_request)) == ["a\n", "bc\n", "d"]
+        mock_get.assert_called_once()
+        mock_get.return_value.close.assert_called_once()
+
+    @patch("requests.get")
+    def test_not_utf8(self, mock_get):
+        mock_get.return_value.iter_content.return_value = ["+café\n".encode("latin-1")]
+        pull_request = PullRequestFactory.create()
+
+        assert list(diffs.iter_diff(pull_request)) == ["+caf\ufffd\n"]
+        assert list(diffs.iter_diff(pull_request)) == ["+caf\ufffd\n"]
+
+    @patch("requests.get")
+    def test_not_stored_if_closed_early(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode() * 2]
+        pull_request = PullRequestFactory.create()
+
+        with closing(diffs.iter_diff(pull_request)) as lines:
+            assert next(lines) == DIFF
+
+        mock_get.return_value.close.assert_called_once()
+        assert not storages["diffs"].exists(f"{pull_request.sha}.diff.gz")
+        assert not StoredDiff.objects.exists()
+
+
+class TestEvict:
+    @patch("requests.get")
+    def test_least_recently_used_evicted(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode()]
+        old, recent = PullRequestFactory.create_batch(2)
+        diffs.get_diff(old)
+        diffs.get_diff(recent)
+        StoredDiff.objects.filter(sha=old.sha).update(
+            last_used=timezone.now() - timedelta(days=1)
+        )
+
+        evicted = diffs.evict(max_size=StoredDiff.objects.get(sha=recent.sha).size)
+
+        assert evicted == 1
+        assert list(StoredDiff.objects.values_list("sha", flat=True)) == [recent.sha]
+        assert not storages["diffs"].exists(f"{old.sha}.diff.gz")
+        assert storages["diffs"].exists(f"{recent.sha}.diff.gz")
+
+    @patch("requests.get")
+    def test_under_cap(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [DIFF.encode()]
+        diffs.get_diff(PullRequestFactory.create())
+
+        assert diffs.evict() == 0
+        assert StoredDiff.objects.count() == 1
@@ -0,0 +1,110 @@
+from unittest.mock import patch
+
+import pytest
+from github import RateLimitExceededException
+
+from democrasite.webiscite import github_api
+from democrasite.webiscite.github_api import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    def test_burst(self, clock: FakeClock):
+        bucket = TokenBucket(3, reserve=0, clock=clock)
+
+        assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+        assert bucket.take() > 0
+
+    def test_refills_to_use_remaining_budget(self, clock: FakeClock):
+        bucket = TokenBucket(10, reserve=100, clock=clock)
+        # 100 requests left after the reserve, spread over 50 seconds
+        bucket.observe(remaining=200, reset_at=clock.now + 50)
+        bucket.tokens = 0
+
+        assert bucket.take() == pytest.approx(0.5)
+
+        clock.now += 1
+        assert bucket.take(2) == 0
+
+    def test_budget_used_up(self, clock: FakeClock):
+        bucket = TokenBucket(10, reserve=100, clock=clock)
+
+        bucket.observe(remaining=100, reset_at=clock.now + 600)
+
+        assert bucket.take() == 600  # noqa: PLR2004
+
+    def test_cost_over_capacity(self, clock: FakeClock):
+        bucket = TokenBucket(10, reserve=0, clock=clock)
+
+        assert bucket.take(15) == 0
+        assert bucket.tokens == -5  # noqa: PLR2004
+
+
+@patch("github.Github.get_repo")
+@patch("github.Auth.Token", spec=True)
+class TestCachedObjects:
+    def test_get_pull_conditional(self, mock_token, mock_repo):
+        first = github_api.get_pull(1)
+        second = github_api.get_pull(1)
+
+        assert first is second
+        mock_repo().get_pull.assert_called_once_with(1)
+        first.update.assert_called_once_with()
+
+    def test_get_contents(self, mock_token, mock_repo):
+        github_api.get_contents("file")
+
+        mock_repo().get_contents.assert_called_once_with("file")
+
+    @patch.object(github_api, "CACHE_SIZE", 1)
+    def test_evicted(self, mock_token, mock_repo):
+        github_api.get_pull(1)
+        github_api.get_pull(2)
+        github_api.get_pull(1)
+
+        assert mock_repo().get_pull.call_count == 3  # noqa: PLR2004
+
+    def test_client_shared(self, mock_token, mock_repo):
+        github_api.get_pull(1)
+        github_api.get_contents("file")
+
+        mock_token.assert_called_once()
+        mock_repo.assert_called_once()
+
+
+class TestWaitTime:
+    def test_unknown_rate_limit(self):
+        assert github_api.wait_time() == 0
+
+    @patch("github.Auth.Token", spec=True)
+    def test_observes_rate_limit(self, mock_token, settings):
+        settings.WEBISCITE_GITHUB_RATE_LIMIT_RESERVE = 100
+        requester = github_api.get_client().requester
+        with (
+            patch.object(requester, "rate_limiting", (100, 5000)),
+            patch.object(requester, "rate_limiting_resettime", 2**40),
+        ):
+            assert github_api.wait_time() > 0
+
+
+class TestRetryAfter:
+    def test_retry_after_header(self):
+        error = RateLimitExceededException(403, headers={"retry-after": "30"})
+
+        assert github_api.retry_after(error) == 30  # noqa: PLR2004
+
+    def test_reset_passed(self):
+        error = RateLimitExceededException(403, headers={"x-ratelimit-reset": "0"})
+
+        assert github_api.retry_after(error) == github_api.MIN_RETRY_AFTER
@@ -1,16 +1,22 @@
+from datetime import timedelta
 from unittest.mock import patch
 
 import pytest
 from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
 from django.db import IntegrityError
+from django.utils import timezone
 from factory.faker import faker
 
 from democrasite.users.models import User
 from democrasite.users.tests.factories import UserFactory
+from democrasite.webiscite import constitution
+from democrasite.webiscite import diffs
+from democrasite.webiscite.constitution import CompiledConstitution
 from democrasite.webiscite.models import Bill
 from democrasite.webiscite.models import ClosedBillVoteError
 from democrasite.webiscite.models import PullRequest
+from democrasite.webiscite.models import Submission
 from democrasite.webiscite.models import Vote
 
 from .factories import BillFactory
@@ -118,6 +124,32 @@ class TestBillManager:
 
         assert bill_queryset.ordered
 
+    def test_recount_votes(self, bill: Bill, user: User):
+        other_bill = BillFactory.create()
+        Vote.objects.create(bill=bill, user=user, support=True)
+        Vote.objects.create(bill=bill, user=UserFactory.create(), support=False)
+
+        repaired = Bill.objects.recount_votes()
+
+        assert repaired == 1
+        bill.refresh_from_db()
+        assert (bill.yes_count, bill.no_count) == (1, 1)
+        other_bill.refresh_from_db()
+        assert (other_bill.yes_count, other_bill.no_count) == (0, 0)
+        assert Bill.objects.recount_votes() == 0
+
+    def test_recount_votes_queryset(self, bill: Bill, user: User):
+        other_bill = BillFactory.create()
+        Vote.objects.create(bill=bill, user=user, support=True)
+        Vote.objects.create(bill=other_bill, user=user, support=True)
+
+        Bill.objects.recount_votes(Bill.objects.filter(pk=bill.pk))
+
+        bill.refresh_from_db()
+        assert bill.yes_count == 1
+        other_bill.refresh_from_db()
+        assert other_bill.yes_count == 0
+
     def test_annotate_user_vote(self, bill: Bill, user: User):
         bill.vote(user, support=True)
         assert Bill.objects.annotate_user_vote(user).first().user_vote is True
@@ -130,7 +162,7 @@ class TestBillManager:
 
     @patch("requests.get")
     def test_create_from_github(self, mock_get, user: User):
-        mock_get.return_value.text = ""
+        mock_get.return_value.iter_content.return_value = []
         pr = PullRequestFactory.create()
         uid = SocialAccount.objects.create(
             user=user, provider="github", uid=FAKE.random_int()
@@ -141,12 +173,11 @@ class TestBillManager:
         assert bill is not None
         assert bill.pk is not None
         bill.refresh_from_db()
-        assert bill._submit_task is not None  # noqa: SLF001
-        assert bill._submit_task.enabled is True  # noqa: SLF001
+        assert bill.voting_ends_at is not None
 
     @patch("requests.get")
     def test_create_from_github_draft(self, mock_get, user: User):
-        mock_get.return_value.text = ""
+        mock_get.return_value.iter_content.return_value = []
         pr = PullRequestFactory.create(draft=True)
         uid = SocialAccount.objects.create(
             user=user, provider="github", uid=FAKE.random_int()
@@ -157,7 +188,37 @@ class TestBillManager:
         assert bill is not None
         assert bill.pk is not None
         assert bill.status == Bill.Status.DRAFT
-        assert bill._submit_task is None  # noqa: SLF001
+        assert bill.voting_ends_at is None
+
+    @patch.object(constitution, "get_constitution")
+    @patch("requests.get")
+    def test_create_from_github_constitutional(
+        self, mock_get, mock_constitution, user: User
+    ):
+        diff = (
+            "diff --git a/README.md b/README.md\n"
+            "deleted file mode 100644\n"
+            "--- a/README.md\n"
+            "+++ /dev/null\n"
+            "@@ -1 +0,0 @@\n"
+            "-Readme\n"
+            "diff --git a/other.md b/other.md\n"
+        )
+        mock_get.return_value.iter_content.return_value = [diff.encode()]
+        mock_constitution.return_value = CompiledConstitution.compile(
+            {"README.md": None}
+        )
+        pr = PullRequestFactory.create()
+        uid = SocialAccount.objects.create(
+            user=user, provider="github", uid=FAKE.random_int()
+        ).uid
+
+        bill = Bill.objects.create_from_github(pr, FAKE.text(), uid)
+
+        assert bill.constitutional
+        # The rest of the diff was read, so later checks don't download it again
+        assert diffs.get_diff(pr) == diff
+        mock_get.assert_called_once()
 
     def test_create_from_github_no_user(self):
         pr = PullRequestFactory.create()
@@ -166,6 +227,45 @@ class TestBillManager:
 
         assert result is None
 
+    @pytest.mark.parametrize("workers", [1, 2])
+    @patch("requests.get")
+    def test_recheck_constitutional(self, mock_get, workers):
+        mock_get.return_value.iter_content.return_value = [
+            b"--- a/protected_file\n+++ b/protected_file\n@@ -1 +1 @@\n-a\n+b\n"
+        ]
+        amended = BillFactory.create(constitutional=False)
+        unchanged = BillFactory.create(constitutional=True)
+        closed = BillFactory.create(constitutional=False, status=Bill.Status.CLOSED)
+        compiled = CompiledConstitution.compile({"protected_file": None})
+
+        with patch.object(constitution, "get_constitution", return_value=compiled):
+            checks = Bill.objects.recheck_constitutional(workers=workers)
+
+        assert [(check.bill, check.changed) for check in checks] == [
+            (amended, True),
+            (unchanged, False),
+        ]
+        amended.refresh_from_db()
+        closed.refresh_from_db()
+        assert amended.constitutional
+        assert amended.history.first().constitutional
+        assert not closed.constitutional
+
+    @patch("requests.get")
+    def test_recheck_constitutional_not_utf8(self, mock_get):
+        mock_get.return_value.iter_content.return_value = [
+            "--- a/protected_file\n+++ b/protected_file\n@@ -1 +1 @@\n-a\n+é\n".encode(
+                "latin-1"
+            )
+        ]
+        bill = BillFactory.create(constitutional=False)
+        compiled = CompiledConstitution.compile({"protected_file": None})
+
+        with patch.object(constitution, "get_constitution", return_value=compiled):
+            checks = Bill.objects.recheck_constitutional(workers=1)
+
+        assert [(check.bill, check.changed) for check in checks] == [(bill, True)]
+
 
 class TestBill:
     def test_unique_active_pull_request(self, bill: Bill):
@@ -196,41 +296,55 @@ class TestBill:
     def test_get_vote_url(self, bill: Bill):
         assert bill.get_vote_url() == f"/bills/{bill.id}/vote/"
 
-    def test_close(self, bill: Bill):
-        assert bill._submit_task is not None  # noqa: SLF001
-        assert bill._submit_task.enabled is True  # noqa: SLF001
+    def test_save_keeps_tallies(self, bill: Bill, user: User):
+        stale_bill = Bill.objects.get(pk=bill.pk)
+        bill.vote(user, support=True)
 
+        stale_bill.name = "New Name"
+        stale_bill.save()
+
+        bill.refresh_from_db()
+        assert bill.name == "New Name"
+        assert bill.yes_count == 1
+
+    def test_voting_period(self, bill: Bill):
+        assert bill.voting_ends_at is not None
+        voting_period = timedelta(days=settings.WEBISCITE_VOTING_PERIOD)
+        assert abs(bill.voting_ends_at - bill.created - voting_period) < timedelta(
+            seconds=1
+        )
+
+    def test_voting_period_not_overwritten(self):
+        voting_ends_at = timezone.now()
+
+        bill = BillFactory.create(voting_ends_at=voting_ends_at)
+
+        assert bill.voting_ends_at == voting_ends_at
+
+    def test_close(self, bill: Bill):
         bill.close()
 
         bill.refresh_from_db()
         assert bill.status == Bill.Status.CLOSED
-        assert bill._submit_task is not None  # noqa: SLF001
-        assert bill._submit_task.enabled is False  # noqa: SLF001
 
     def test_close_amended(self, bill: Bill):
-        assert bill._submit_task is not None  # noqa: SLF001
-        assert bill._submit_task.enabled is True  # noqa: SLF001
-
         bill.close(status=Bill.Status.AMENDED)
 
         bill.refresh_from_db()
         assert bill.status == Bill.Status.AMENDED
-        assert bill._submit_task is not None  # noqa: SLF001
-        assert bill._submit_task.enabled is False  # noqa: SLF001
 
 
 class TestBillPublish:
     def test_publish(self):
         bill = BillFactory.create(status=Bill.Status.DRAFT)
-        assert bill._submit_task is None  # noqa: SLF001
+        assert bill.voting_ends_at is None
 
         bill.publish()
 
         bill.refresh_from_db()
         assert bill.status == Bill.Status.OPEN
-        assert bill._submit_task is not None  # noqa: SLF001
-        assert bill._submit_task.enabled is True  # noqa: SLF001
-        assert bill._submit_task.last_run_at is not None  # noqa: SLF001
+        assert bill.voting_ends_at is not None
+        assert bill.voting_ends_at > timezone.now()
 
     def test_publish_not_draft(self, bill: Bill):
         with pytest.raises(ValueError, match="Only draft bills can be published"):
@@ -262,6 +376,52 @@ class TestBillVote:
         assert not bill.votes.filter(pk=user.id, vote__support=False).exists()
         assert bill.votes.filter(pk=user.id, vote__support=True).exists()
 
+    def test_bill_vote_tallies(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        assert (bill.yes_count, bill.no_count) == (1, 0)
+
+        bill.vote(user, support=False)
+        assert (bill.yes_count, bill.no_count) == (0, 1)
+
+        bill.vote(user, support=False)
+        assert (bill.yes_count, bill.no_count) == (0, 0)
+
+        bill.refresh_from_db()
+        assert (bill.yes_count, bill.no_count) == (0, 0)
+
+    def test_bill_vote_single_query(
+        self, bill: Bill, user: User, django_assert_num_queries
+    ):
+        with django_assert_num_queries(1):
+            bill.vote(user, support=True)
+        with django_assert_num_queries(1):
+            bill.vote(user, support=False)
+        with django_assert_num_queries(1):
+            bill.vote(user, support=False)
+
+    def test_bill_vote_history(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        bill.vote(user, support=False)
+        bill.vote(user, support=False)
+
+        history_types = Vote.history.filter(bill=bill, user=user).values_list(
+            "history_type", flat=True
+        )
+        assert sorted(history_types) == sorted(["+", "~", "-"])
+
+    def test_bill_vote_history_matches_orm(self, bill: Bill, user: User):
+        def latest_history() -> dict:
+            ignored = {"history_id", "history_date", "id", "when"}
+            row = Vote.history.filter(bill=bill, user=user).values().latest("pk")
+            return {key: value for key, value in row.items() if key not in ignored}
+
+        bill.vote(user, support=True)
+        voted = latest_history()
+        Vote.objects.filter(bill=bill, user=user).delete()
+        Vote.objects.create(bill=bill, user=user, support=True)
+
+        assert latest_history() == voted
+
     def test_bill_not_open(self, user: User):
         bill = BillFactory.create(status=Bill.Status.CLOSED)
 
@@ -286,14 +446,16 @@ class TestBillSubmit:
     def test_bill_not_open(self):
         bill: Bill = BillFactory.create(status=Bill.Status.CLOSED)
 
-        bill.submit()
+        assert bill.submit() is None
 
         assert bill.status == Bill.Status.CLOSED
 
     def test_insufficient_votes(self, bill: Bill):
-        bill.submit()
+        submission = bill.submit()
 
         assert bill.status == Bill.Status.FAILED
+        assert submission is not None
+        assert submission.action == Submission.Action.CLOSE
 
     def test_bill_rejected(self, bill: Bill):
         voters = UserFactory.create_batch(settings.WEBISCITE_MINIMUM_QUORUM)
@@ -325,6 +487,8 @@ class TestBillSubmit:
         )
         bill = Bill.objects.get(id=bill.id)  # set annotations
 
-        bill.submit()
+        submission = bill.submit()
 
         assert bill.status == Bill.Status.APPROVED
+        assert submission is not None
+        assert submission.action == Submission.Action.MERGE
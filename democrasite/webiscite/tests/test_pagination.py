@@ -0,0 +1,75 @@
+from datetime import UTC
+from datetime import datetime
+
+import pytest
+
+from democrasite.webiscite.models import Bill
+from democrasite.webiscite.pagination import InvalidCursorError
+from democrasite.webiscite.pagination import decode_cursor
+from democrasite.webiscite.pagination import encode_cursor
+from democrasite.webiscite.pagination import paginate
+
+from .factories import BillFactory
+
+
+class TestCursor:
+    def test_round_trip(self):
+        created = datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=UTC)
+
+        cursor = encode_cursor(created, 1234)
+
+        assert len(cursor) == 22  # noqa: PLR2004
+        assert decode_cursor(cursor) == (created, 1234)
+
+    # The last is well-formed, but out of the range of datetime
+    @pytest.mark.parametrize(
+        "cursor", ["", "invalid", "!!!!", "AAAA", "QAAAAAAAAAAAAAAAAAAAAQ"]
+    )
+    def test_invalid(self, cursor: str):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+
+
+class TestPaginate:
+    def test_first_page(self):
+        bills = BillFactory.create_batch(3)
+
+        page = paginate(Bill.objects.all(), None, 2)
+
+        assert page.object_list == bills[:2]
+        assert page.has_next
+
+    def test_last_page(self):
+        bills = BillFactory.create_batch(2)
+
+        page = paginate(Bill.objects.all(), None, 2)
+
+        assert page.object_list == bills
+        assert not page.has_next
+
+    def test_same_created(self):
+        bills = BillFactory.create_batch(5)
+        Bill.objects.update(created=bills[0].created)
+
+        first = paginate(Bill.objects.all(), None, 2)
+        second = paginate(Bill.objects.all(), first.next_cursor, 2)
+        third = paginate(Bill.objects.all(), second.next_cursor, 2)
+
+        assert first.object_list + second.object_list + third.object_list == bills
+        assert not third.has_next
+
+    def test_stable_when_bills_added(self):
+        bills = BillFactory.create_batch(3)
+        first = paginate(Bill.objects.all(), None, 2)
+        new_bill = BillFactory.create()
+
+        second = paginate(Bill.objects.all(), first.next_cursor, 2)
+
+        assert second.object_list == [bills[2], new_bill]
+
+    def test_ordering_replaced(self):
+        bills = BillFactory.create_batch(2)
+
+        page = paginate(Bill.objects.order_by("-id"), None, 2)
+
+        assert page.object_list == bills
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import pytest
+from django.db import DatabaseError
+
+from democrasite.users.models import User
+from democrasite.users.tests.factories import UserFactory
+from democrasite.webiscite import tally
+from democrasite.webiscite import tasks
+from democrasite.webiscite.models import Bill
+from democrasite.webiscite.models import Vote
+from democrasite.webiscite.tasks import flush_votes
+
+from .factories import BillFactory
+
+pytestmark = pytest.mark.usefixtures("redis_tally")
+
+
+class TestVote:
+    def test_vote_toggle(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        assert (bill.yes_count, bill.no_count) == (1, 0)
+
+        bill.vote(user, support=False)
+        assert (bill.yes_count, bill.no_count) == (0, 1)
+
+        bill.vote(user, support=False)
+        assert (bill.yes_count, bill.no_count) == (0, 0)
+
+        assert not Vote.objects.exists(), "Votes are only written when flushed"
+
+    def test_vote_loads_existing_votes(self, bill: Bill, user: User):
+        Vote.objects.create(bill=bill, user=UserFactory.create(), support=False)
+        Vote.objects.create(bill=bill, user=user, support=True)
+
+        bill.vote(user, support=True)
+
+        assert (bill.yes_count, bill.no_count) == (0, 1)
+        assert tally.take_pending(bill.id) == {user.id: None}
+
+    def test_counts_served_from_redis(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+
+        assert Bill.objects.get(pk=bill.pk).yes_count == 1
+        bill.refresh_from_db()
+        assert bill.yes_count == 0, "The stored tally is only updated when flushed"
+
+    def test_get_counts_not_loaded(self, bill: Bill):
+        assert tally.get_counts([bill.id]) == {}
+
+
+class TestFlushVotes:
+    def test_flush_votes(self, bill: Bill, user: User):
+        other_user = UserFactory.create()
+        bill.vote(user, support=True)
+        bill.vote(other_user, support=False)
+
+        flush_votes()
+
+        assert Vote.objects.get(bill=bill, user=user).support is True
+        assert Vote.objects.get(bill=bill, user=other_user).support is False
+        assert Vote.history.filter(bill=bill, history_type="+").count() == 2  # noqa: PLR2004
+        bill.refresh_from_db()
+        assert (bill.yes_count, bill.no_count) == (1, 1)
+        assert tally.dirty_bills() == []
+
+    def test_flush_changed_and_retracted(self, bill: Bill, user: User):
+        other_user = UserFactory.create()
+        Vote.objects.create(bill=bill, user=user, support=True)
+        Vote.objects.create(bill=bill, user=other_user, support=True)
+        bill.vote(user, support=False)
+        bill.vote(other_user, support=True)
+
+        flush_votes(bill.id)
+
+        assert Vote.objects.get(bill=bill, user=user).support is False
+        assert not Vote.objects.filter(bill=bill, user=other_user).exists()
+        bill.refresh_from_db()
+        assert (bill.yes_count, bill.no_count) == (0, 1)
+
+    def test_failed_flush_retried(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        assert tally.take_pending(bill.id) == {user.id: True}
+        # The flush failed before acknowledging the votes, and a new vote came in
+        bill.vote(UserFactory.create(), support=False)
+
+        flush_votes()
+
+        assert Vote.objects.filter(bill=bill).count() == 2  # noqa: PLR2004
+
+    def test_failed_flush_retried_without_new_votes(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        with patch.object(tasks, "_write_votes", side_effect=DatabaseError):
+            flush_votes()
+        assert tally.dirty_bills() == [bill.id]
+
+        flush_votes()
+
+        assert Vote.objects.get(bill=bill).user == user
+        assert tally.dirty_bills() == []
+
+    def test_failed_flush_skipped(self, user: User):
+        bills = BillFactory.create_batch(2)
+        for bill in bills:
+            bill.vote(user, support=True)
+        failing = bills[0].id
+        write_votes = tasks._write_votes  # noqa: SLF001
+
+        def fail_first(bill_id, pending):
+            if bill_id == failing:
+                raise DatabaseError
+            write_votes(bill_id, pending)
+
+        with patch.object(tasks, "_write_votes", side_effect=fail_first):
+            flush_votes()
+
+        assert list(Vote.objects.values_list("bill_id", flat=True)) == [bills[1].id]
+        assert tally.dirty_bills() == [failing]
+
+    def test_vote_during_flush(self, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        tally.take_pending(bill.id)
+        bill.vote(UserFactory.create(), support=False)
+
+        tally.ack_pending(bill.id)
+
+        assert tally.dirty_bills() == [bill.id]
+
+    def test_database_backend(self, settings, bill: Bill, user: User):
+        bill.vote(user, support=True)
+        settings.WEBISCITE_TALLY_BACKEND = "database"
+
+        flush_votes()
+
+        assert not Vote.objects.exists()
@@ -1,73 +1,893 @@
+from datetime import timedelta
+from unittest.mock import call
 from unittest.mock import patch
 
+import pytest
+import requests
+from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
+from django.utils import timezone
+from factory.faker import faker
+from github import GithubException
+from github import RateLimitExceededException
+from prometheus_client import REGISTRY
 
+from democrasite.users.models import User
 from democrasite.users.tests.factories import UserFactory
 from democrasite.webiscite import constitution
+from democrasite.webiscite import diffs
+from democrasite.webiscite import github_api
+from democrasite.webiscite import tally
+from democrasite.webiscite import tasks
+from democrasite.webiscite.managers import ConstitutionCheck
 from democrasite.webiscite.models import Bill
+from democrasite.webiscite.models import PullRequest
+from democrasite.webiscite.models import Submission
 from democrasite.webiscite.models import Vote
-from democrasite.webiscite.tasks import _update_constitution
+from democrasite.webiscite.models import WebhookDelivery
+from democrasite.webiscite.tasks import PullRequestHandler
+from democrasite.webiscite.tasks import process_submission
+from democrasite.webiscite.tasks import process_webhook
+from democrasite.webiscite.tasks import recheck_constitutional
+from democrasite.webiscite.tasks import reconcile_pull_requests
+from democrasite.webiscite.tasks import retry_submissions
+from democrasite.webiscite.tasks import retry_webhook_deliveries
 from democrasite.webiscite.tasks import submit_bill
+from democrasite.webiscite.tasks import submit_due_bills
+from democrasite.webiscite.tasks import update_constitution
 
 from .factories import BillFactory
+from .factories import GithubPullRequestFactory
+from .factories import SubmissionFactory
+from .factories import WebhookDeliveryFactory
+from .fake_github import FakeGithub
 
 
 class TestSubmitBill:
-    @patch("github.Github.get_repo")
-    @patch("github.Auth.Token", spec=True)
-    def test_bill_failed(self, mock_token, mock_repo):
+    @patch("democrasite.webiscite.tasks.process_submission")
+    def test_bill_not_open(self, mock_process, django_capture_on_commit_callbacks):
         bill = BillFactory.create(status=Bill.Status.CLOSED)
 
+        with django_capture_on_commit_callbacks(execute=True):
+            submit_bill(bill.id)
+
+        assert not Submission.objects.exists()
+        mock_process.delay.assert_not_called()
+
+    @patch("democrasite.webiscite.tasks.process_submission")
+    def test_bill_failed(self, mock_process, django_capture_on_commit_callbacks):
+        bill = BillFactory.create()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            submit_bill(bill.id)
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.FAILED
+        assert bill.submission.action == Submission.Action.CLOSE
+        mock_process.delay.assert_called_once_with(bill.id)
+
+    @patch("democrasite.webiscite.tasks.process_submission")
+    def test_bill_passed(self, mock_process, django_capture_on_commit_callbacks):
+        bill = BillFactory.create()
+        voters = UserFactory.create_batch(settings.WEBISCITE_MINIMUM_QUORUM)
+        Vote.objects.bulk_create(
+            [Vote(bill=bill, user=voter, support=True) for voter in voters]
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            submit_bill(bill.id)
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.APPROVED
+        assert bill.submission.action == Submission.Action.MERGE
+        mock_process.delay.assert_called_once_with(bill.id)
+
+    @patch("github.Github.get_repo")
+    def test_no_github_calls(self, mock_repo):
+        submit_bill(BillFactory.create().id)
+
+        mock_repo.assert_not_called()
+
+    @pytest.mark.usefixtures("redis_tally")
+    def test_votes_flushed(self):
+        bill = BillFactory.create(constitutional=True)
+        for voter in UserFactory.create_batch(settings.WEBISCITE_MINIMUM_QUORUM):
+            bill.vote(voter, support=True)
+
         submit_bill(bill.id)
 
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.APPROVED
+        assert bill.yes_count == settings.WEBISCITE_MINIMUM_QUORUM
+        assert tally.get_counts([bill.id]) == {}
+
+
+class TestProcessSubmission:
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_close(self, mock_token, mock_repo):
+        submission = SubmissionFactory.create(
+            bill__status=Bill.Status.FAILED, action=Submission.Action.CLOSE
+        )
+        mock_repo().get_pull().state = "open"
+
+        process_submission(submission.bill_id)
+
         mock_token.assert_called_once_with(settings.WEBISCITE_GITHUB_TOKEN)
-        mock_repo.assert_called_once_with(settings.WEBISCITE_REPO)
+        mock_repo.assert_called_with(settings.WEBISCITE_REPO, lazy=True)
         mock_repo().get_pull().edit.assert_called_once_with(state="closed")
+        submission.refresh_from_db()
+        assert submission.completed_at is not None
+        assert submission.attempts == 1
 
     @patch("github.Github.get_repo")
     @patch("github.Auth.Token", spec=True)
-    def test_bill_passed(self, mock_token, mock_repo):
-        bill = BillFactory.create(constitutional=True)
-        # constitutional so _update_constitution isn't called
-        voters = UserFactory.create_batch(settings.WEBISCITE_MINIMUM_QUORUM)
-        Vote.objects.bulk_create(
-            [Vote(bill=bill, user=voter, support=True) for voter in voters]
+    def test_close_already_closed(self, mock_token, mock_repo):
+        submission = SubmissionFactory.create(
+            bill__status=Bill.Status.FAILED, action=Submission.Action.CLOSE
         )
+        mock_repo().get_pull().state = "closed"
 
-        submit_bill(bill.id)
+        process_submission(submission.bill_id)
+
+        mock_repo().get_pull().edit.assert_not_called()
+
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_merge(self, mock_token, mock_repo):
+        submission = SubmissionFactory.create()
+        mock_repo().get_pull().merged = False
+
+        process_submission(submission.bill_id)
 
         mock_repo().get_pull().merge.assert_called_once_with(
-            merge_method="squash", sha=bill.pull_request.sha
+            merge_method="squash", sha=submission.bill.pull_request.sha
         )
+        submission.refresh_from_db()
+        assert submission.completed_at is not None
 
     @patch("github.Github.get_repo")
     @patch("github.Auth.Token", spec=True)
-    def test_bill_merge_failed(self, mock_token, mock_repo):
-        bill = BillFactory.create(constitutional=True)
-        # constitutional so _update_constitution isn't called
-        voters = UserFactory.create_batch(settings.WEBISCITE_MINIMUM_QUORUM)
-        Vote.objects.bulk_create(
-            [Vote(bill=bill, user=voter, support=True) for voter in voters]
-        )
-        mock_repo().get_pull().merge.return_value = None
+    def test_merge_failed(self, mock_token, mock_repo):
+        submission = SubmissionFactory.create()
+        mock_repo().get_pull().merged = False
+        mock_repo().get_pull().merge.return_value.merged = False
+        mock_repo().get_pull().merge.return_value.message = "Head branch was modified"
 
-        submit_bill(bill.id)
+        with pytest.raises(tasks.MergeFailedError):
+            process_submission(submission.bill_id)
 
         mock_repo().get_pull().merge.assert_called_once_with(
-            merge_method="squash", sha=bill.pull_request.sha
+            merge_method="squash", sha=submission.bill.pull_request.sha
         )
+        submission.refresh_from_db()
+        assert submission.completed_at is None
+        assert submission.locked_until is None
+        assert "Head branch was modified" in submission.last_error
 
-    @patch.object(constitution, "update_constitution")
-    @patch("requests.get")
-    @patch("github.Repository.Repository")
-    def test_update_constitution(
-        self, mock_repo, mock_get, mock_constitution, bill: Bill
+    @patch.object(tasks, "update_constitution")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_already_merged(self, mock_token, mock_repo, mock_update):
+        submission = SubmissionFactory.create(bill__constitutional=False)
+        mock_repo().get_pull().merged = True
+
+        process_submission(submission.bill_id)
+
+        mock_repo().get_pull().merge.assert_not_called()
+        submission.refresh_from_db()
+        assert submission.constitution_pending
+        mock_update.delay.assert_called_once_with()
+
+    @patch.object(tasks, "update_constitution")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_constitutional_not_updated(self, mock_token, mock_repo, mock_update):
+        submission = SubmissionFactory.create()
+        mock_repo().get_pull().merged = False
+
+        process_submission(submission.bill_id)
+
+        submission.refresh_from_db()
+        assert not submission.constitution_pending
+        mock_update.delay.assert_not_called()
+
+    @patch("github.Github.get_repo")
+    def test_already_completed(self, mock_repo):
+        submission = SubmissionFactory.create(completed_at=timezone.now())
+
+        process_submission(submission.bill_id)
+
+        mock_repo.assert_not_called()
+
+    @patch("github.Github.get_repo")
+    def test_claimed_elsewhere(self, mock_repo):
+        submission = SubmissionFactory.create(
+            locked_until=timezone.now() + timedelta(minutes=1)
+        )
+
+        process_submission(submission.bill_id)
+
+        mock_repo.assert_not_called()
+
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_error_released(self, mock_token, mock_repo):
+        submission = SubmissionFactory.create()
+        mock_repo.side_effect = GithubException(502)
+
+        with pytest.raises(GithubException):
+            process_submission(submission.bill_id)
+
+        submission.refresh_from_db()
+        assert submission.completed_at is None
+        assert submission.locked_until is None
+        assert submission.attempts == 1
+        assert "502" in submission.last_error
+
+    @patch.object(process_submission, "apply_async")
+    @patch.object(github_api, "wait_time", return_value=30)
+    def test_deferred_for_rate_limit(self, mock_wait, mock_apply):
+        submission = SubmissionFactory.create()
+
+        process_submission(submission.bill_id)
+
+        mock_wait.assert_called_once_with(3)
+        mock_apply.assert_called_once_with((submission.bill_id,), countdown=30)
+        submission.refresh_from_db()
+        assert submission.attempts == 0
+
+    @patch.object(process_submission, "apply_async")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_rate_limit_exceeded(self, mock_token, mock_repo, mock_apply):
+        submission = SubmissionFactory.create()
+        mock_repo().get_pull().merged = False
+        mock_repo().get_pull().merge.side_effect = RateLimitExceededException(
+            403, headers={"retry-after": "5"}
+        )
+
+        process_submission(submission.bill_id)
+
+        mock_apply.assert_called_once_with((submission.bill_id,), countdown=5)
+        submission.refresh_from_db()
+        assert submission.completed_at is None
+        assert submission.locked_until is None
+        assert "403" in submission.last_error
+
+
+class TestUpdateConstitution:
+    @pytest.fixture
+    def pending(self) -> list[Submission]:
+        """Two merged bills which need the constitution updated, in merge order"""
+        now = timezone.now()
+        return [
+            SubmissionFactory.create(
+                bill__constitutional=False,
+                completed_at=now - timedelta(minutes=minutes),
+                constitution_pending=True,
+            )
+            for minutes in (2, 1)
+        ]
+
+    @patch.object(constitution, "update_constitution", return_value='{"file": null}')
+    @patch.object(diffs, "get_diff", side_effect=lambda pr: f"diff {pr.number}")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_batched(
+        self, mock_token, mock_repo, mock_get_diff, mock_constitution, pending
     ):
-        _update_constitution(bill, mock_repo)
+        mock_repo().get_contents.return_value.decoded_content = b'{"file": [[1, 2]]}'
+        first, second = (submission.bill.pull_request.number for submission in pending)
+
+        update_constitution()
 
-        mock_get.assert_called_once_with(bill.pull_request.diff_url, timeout=60)
-        mock_constitution.assert_called_once()
-        mock_repo.get_contents.assert_called_once_with(
+        mock_constitution.assert_called_once_with(
+            f"diff {first}", f"diff {second}", raw={"file": [[1, 2]]}
+        )
+        mock_repo().get_contents.assert_called_once_with(
             "democrasite/webiscite/constitution.json"
         )
-        mock_repo.update_file.assert_called_once()
+        mock_repo().update_file.assert_called_once_with(
+            "democrasite/webiscite/constitution.json",
+            message=f"Update Constitution for PR #{first}, #{second}",
+            content='{"file": null}',
+            sha=mock_repo().get_contents.return_value.sha,
+        )
+        assert not Submission.objects.filter(constitution_pending=True).exists()
+        assert set(Submission.objects.values_list("constitution_sha", flat=True)) == {
+            "4cea52a41cfb811adc41b6711e08c4912b75273a"  # git hash-object
+        }
+
+    @patch.object(constitution, "update_constitution", return_value='{"file": null}')
+    @patch.object(diffs, "get_diff", side_effect=lambda pr: f"diff {pr.number}")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_retried_after_commit(
+        self, mock_token, mock_repo, mock_get_diff, mock_constitution, pending
+    ):
+        # The first bill's update was committed, but the worker died before it was
+        # marked done, and the second bill was merged since
+        Submission.objects.filter(pk=pending[0].pk).update(constitution_sha="a" * 40)
+        mock_repo().get_contents.return_value.sha = "a" * 40
+        mock_repo().get_contents.return_value.decoded_content = b'{"file": [[2, 3]]}'
+        second = pending[1].bill.pull_request.number
+
+        update_constitution()
+
+        mock_constitution.assert_called_once_with(
+            f"diff {second}", raw={"file": [[2, 3]]}
+        )
+        mock_repo().update_file.assert_called_once_with(
+            "democrasite/webiscite/constitution.json",
+            message=f"Update Constitution for PR #{second}",
+            content='{"file": null}',
+            sha="a" * 40,
+        )
+        assert not Submission.objects.filter(constitution_pending=True).exists()
+
+    @patch.object(diffs, "get_diff")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_retried_after_commit_all_applied(
+        self, mock_token, mock_repo, mock_get_diff, pending
+    ):
+        Submission.objects.update(constitution_sha="a" * 40)
+        mock_repo().get_contents.return_value.sha = "a" * 40
+        mock_repo().get_contents.return_value.decoded_content = b'{"file": [[2, 3]]}'
+
+        update_constitution()
+
+        mock_get_diff.assert_not_called()
+        mock_repo().update_file.assert_not_called()
+        assert not Submission.objects.filter(constitution_pending=True).exists()
+
+    @patch.object(constitution, "update_constitution", return_value="")
+    @patch.object(diffs, "get_diff")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_no_changes(
+        self, mock_token, mock_repo, mock_get_diff, mock_constitution, pending
+    ):
+        mock_repo().get_contents.return_value.decoded_content = b"{}"
+
+        update_constitution()
+
+        mock_repo().update_file.assert_not_called()
+        assert not Submission.objects.filter(constitution_pending=True).exists()
+
+    @patch.object(constitution, "update_constitution", return_value="{}")
+    @patch.object(diffs, "get_diff")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_error_stays_pending(
+        self, mock_token, mock_repo, mock_get_diff, mock_constitution, pending
+    ):
+        mock_repo().get_contents.return_value.decoded_content = b"{}"
+        mock_repo().update_file.side_effect = GithubException(409)
+
+        with pytest.raises(GithubException):
+            update_constitution()
+
+        assert Submission.objects.filter(
+            constitution_pending=True, locked_until__isnull=True
+        ).count() == len(pending)
+
+    @patch.object(diffs, "get_diff")
+    @patch("github.Github.get_repo")
+    @patch("github.Auth.Token", spec=True)
+    def test_download_error_releases_claim(
+        self, mock_token, mock_repo, mock_get_diff, pending
+    ):
+        mock_repo().get_contents.return_value.decoded_content = b"{}"
+        mock_get_diff.side_effect = requests.ConnectionError
+
+        with pytest.raises(requests.ConnectionError):
+            update_constitution()
+
+        mock_repo().update_file.assert_not_called()
+        assert not Submission.objects.filter(locked_until__isnull=False).exists()
+
+    @patch("github.Github.get_repo")
+    def test_claimed(self, mock_repo, pending):
+        Submission.objects.filter(pk=pending[0].pk).update(
+            locked_until=timezone.now() + timedelta(minutes=1)
+        )
+
+        update_constitution()
+
+        mock_repo.assert_not_called()
+        assert Submission.objects.filter(constitution_pending=True).count() == len(
+            pending
+        )
+
+    @patch("github.Github.get_repo")
+    def test_nothing_pending(self, mock_repo):
+        SubmissionFactory.create(completed_at=timezone.now())
+
+        update_constitution()
+
+        mock_repo.assert_not_called()
+
+
+class TestRecheckConstitutional:
+    @patch.object(Bill.objects, "recheck_constitutional")
+    def test_logs_changes(self, mock_recheck, bill: Bill, caplog):
+        bill.constitutional = True
+        mock_recheck.return_value = [ConstitutionCheck(bill, changed=True, seconds=1)]
+
+        recheck_constitutional()
+
+        mock_recheck.assert_called_once_with()
+        assert "Now constitutional" in caplog.text
+        assert "Checked 1 bills against the constitution, 1 changed" in caplog.text
+
+
+class TestSubmitDueBills:
+    @patch("democrasite.webiscite.tasks.submit_bill")
+    def test_submits_due_bills(self, mock_submit):
+        past = timezone.now() - timedelta(minutes=1)
+        due = BillFactory.create_batch(3, voting_ends_at=past)
+        BillFactory.create()  # Voting period hasn't ended
+        BillFactory.create(status=Bill.Status.CLOSED, voting_ends_at=past)
+        BillFactory.create(status=Bill.Status.DRAFT)
+
+        submit_due_bills()
+
+        assert [call.args for call in mock_submit.call_args_list] == [
+            (bill.id,) for bill in due
+        ]
+
+    @patch("democrasite.webiscite.tasks.SUBMIT_BATCH_SIZE", 2)
+    @patch("democrasite.webiscite.tasks.submit_bill")
+    def test_batches(self, mock_submit):
+        past = timezone.now() - timedelta(minutes=1)
+        due = BillFactory.create_batch(5, voting_ends_at=past)
+
+        submit_due_bills()
+
+        assert mock_submit.call_count == len(due)
+
+    @patch("democrasite.webiscite.tasks.submit_bill")
+    def test_failure_does_not_block_others(self, mock_submit, caplog):
+        past = timezone.now() - timedelta(minutes=1)
+        failing, due = BillFactory.create_batch(2, voting_ends_at=past)
+        mock_submit.side_effect = [RuntimeError("GitHub is down"), None]
+
+        submit_due_bills()
+
+        mock_submit.assert_called_with(due.id)
+        assert f"Failed to submit bill {failing.id}" in caplog.text
+
+
+class TestRetrySubmissions:
+    @patch("democrasite.webiscite.tasks.process_submission")
+    def test_retries_unfinished(self, mock_process):
+        stale = timezone.now() - timedelta(hours=1)
+        pending = SubmissionFactory.create()
+        SubmissionFactory.create(completed_at=timezone.now())
+        SubmissionFactory.create(locked_until=timezone.now() + timedelta(minutes=1))
+        recent = SubmissionFactory.create()
+        Submission.objects.exclude(pk=recent.pk).update(created=stale)
+
+        retry_submissions()
+
+        mock_process.delay.assert_called_once_with(pending.bill_id)
+
+    @patch("democrasite.webiscite.tasks.update_constitution")
+    def test_queues_constitution_update(self, mock_update):
+        SubmissionFactory.create(completed_at=timezone.now(), constitution_pending=True)
+
+        retry_submissions()
+
+        mock_update.delay.assert_called_once_with()
+
+
+def _count_deliveries(outcome: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "webiscite_webhook_deliveries_total", {"outcome": outcome}
+        )
+        or 0
+    )
+
+
+class TestProcessWebhook:
+    @patch.object(PullRequestHandler, "closed")
+    def test_processed(self, mock_closed, bill: Bill):
+        mock_closed.return_value = (bill.pull_request, bill)
+        payload = {"action": "closed", "pull_request": {"number": 1}}
+        delivery = WebhookDeliveryFactory.create(payload=payload)
+
+        process_webhook(delivery.delivery_id)
+
+        mock_closed.assert_called_once_with({"number": 1})
+        delivery.refresh_from_db()
+        assert delivery.status == WebhookDelivery.Status.PROCESSED
+        assert delivery.processed_at is not None
+        assert delivery.result == {
+            "action": "closed",
+            "pull_request": bill.pull_request.number,
+            "bill": bill.id,
+        }
+
+    @patch.object(PullRequestHandler, "synchronize")
+    def test_synchronize_coalesced(self, mock_synchronize, bill: Bill):
+        mock_synchronize.return_value = (bill.pull_request, None)
+        first, second, latest = WebhookDeliveryFactory.create_batch(
+            3, action="synchronize"
+        )
+        other_pr = WebhookDeliveryFactory.create(
+            action="synchronize", pull_request_number=-2
+        )
+        coalesced_before = _count_deliveries("coalesced")
+
+        process_webhook(first.delivery_id)
+
+        mock_synchronize.assert_called_once_with(latest.payload["pull_request"])
+        assert _count_deliveries("coalesced") - coalesced_before == 2  # noqa: PLR2004
+        for delivery in (first, second):
+            delivery.refresh_from_db()
+            assert delivery.status == WebhookDelivery.Status.COALESCED
+            assert delivery.result == {"coalesced_into": latest.delivery_id}
+        latest.refresh_from_db()
+        assert latest.status == WebhookDelivery.Status.PROCESSED
+        other_pr.refresh_from_db()
+        assert other_pr.status == WebhookDelivery.Status.PENDING
+
+    @patch.object(PullRequestHandler, "closed")
+    @patch.object(PullRequestHandler, "synchronize")
+    def test_synchronize_not_coalesced_past_other_actions(
+        self, mock_synchronize, mock_closed, bill: Bill
+    ):
+        mock_synchronize.return_value = (bill.pull_request, None)
+        mock_closed.return_value = (bill.pull_request, bill)
+        first = WebhookDeliveryFactory.create(action="synchronize")
+        closed = WebhookDeliveryFactory.create(action="closed")
+        last = WebhookDeliveryFactory.create(action="synchronize")
+
+        process_webhook(first.delivery_id)
+
+        assert mock_synchronize.call_args_list == [
+            call(first.payload["pull_request"]),
+            call(last.payload["pull_request"]),
+        ]
+        mock_closed.assert_called_once_with(closed.payload["pull_request"])
+        for delivery in (first, closed, last):
+            delivery.refresh_from_db()
+            assert delivery.status == WebhookDelivery.Status.PROCESSED
+
+    @patch.object(PullRequestHandler, "synchronize")
+    @patch.object(PullRequestHandler, "opened")
+    def test_out_of_order(self, mock_opened, mock_synchronize, bill: Bill):
+        handled = []
+        mock_opened.side_effect = lambda _: handled.append("opened") or (None, bill)
+        mock_synchronize.side_effect = lambda _: (
+            handled.append("synchronize")
+            or (
+                None,
+                None,
+            )
+        )
+        WebhookDeliveryFactory.create(action="opened")
+        synchronize = WebhookDeliveryFactory.create(action="synchronize")
+
+        # The task for the later delivery runs first
+        process_webhook(synchronize.delivery_id)
+
+        assert handled == ["opened", "synchronize"]
+        assert not WebhookDelivery.objects.filter(
+            status=WebhookDelivery.Status.PENDING
+        ).exists()
+
+    @patch.object(PullRequestHandler, "closed")
+    def test_claimed(self, mock_closed):
+        delivery = WebhookDeliveryFactory.create(
+            action="closed", locked_until=timezone.now() + timedelta(minutes=1)
+        )
+
+        process_webhook(delivery.delivery_id)
+
+        mock_closed.assert_not_called()
+        delivery.refresh_from_db()
+        assert delivery.status == WebhookDelivery.Status.PENDING
+
+    @patch.object(PullRequestHandler, "closed")
+    def test_failed(self, mock_closed):
+        mock_closed.side_effect = requests.ConnectionError
+        delivery = WebhookDeliveryFactory.create(action="closed")
+
+        with pytest.raises(requests.ConnectionError):
+            process_webhook(delivery.delivery_id)
+
+        delivery.refresh_from_db()
+        assert delivery.status == WebhookDelivery.Status.PENDING
+        assert delivery.locked_until is None
+        assert delivery.attempts == 1
+        assert "ConnectionError" in delivery.last_error
+
+    @patch.object(PullRequestHandler, "synchronize")
+    def test_failed_too_many_times(self, mock_synchronize):
+        mock_synchronize.side_effect = ValueError("Bad payload")
+        earlier = WebhookDeliveryFactory.create(action="synchronize")
+        delivery = WebhookDeliveryFactory.create(
+            action="synchronize", attempts=tasks.WEBHOOK_MAX_ATTEMPTS - 1
+        )
+        failed_before = _count_deliveries("failed")
+
+        with pytest.raises(ValueError, match="Bad payload"):
+            process_webhook(delivery.delivery_id)
+
+        assert _count_deliveries("failed") - failed_before == 2  # noqa: PLR2004
+        for failed in (earlier, delivery):
+            failed.refresh_from_db()
+            assert failed.status == WebhookDelivery.Status.FAILED
+            assert failed.locked_until is None
+
+    @patch.object(PullRequestHandler, "closed")
+    def test_already_processed(self, mock_closed):
+        delivery = WebhookDeliveryFactory.create(
+            status=WebhookDelivery.Status.PROCESSED
+        )
+
+        process_webhook(delivery.delivery_id)
+
+        mock_closed.assert_not_called()
+
+
+class TestRetryWebhookDeliveries:
+    @patch("democrasite.webiscite.tasks.process_webhook")
+    def test_retries_pending(self, mock_process):
+        stale = timezone.now() - timedelta(hours=1)
+        pending = WebhookDeliveryFactory.create()
+        WebhookDeliveryFactory.create(status=WebhookDelivery.Status.PROCESSED)
+        WebhookDeliveryFactory.create(status=WebhookDelivery.Status.FAILED)
+        WebhookDeliveryFactory.create(
+            locked_until=timezone.now() + timedelta(minutes=1)
+        )
+        recent = WebhookDeliveryFactory.create()
+        WebhookDelivery.objects.exclude(pk=recent.pk).update(created=stale)
+
+        retry_webhook_deliveries()
+
+        mock_process.delay.assert_called_once_with(pending.delivery_id)
+
+
+def _github_pull(bill: Bill, **kwargs) -> dict:
+    """Return a pull request from the GitHub API matching a bill's pull request"""
+    pull_request = bill.pull_request
+    fields = {
+        "title": pull_request.title,
+        "head": {"sha": pull_request.sha},
+        "draft": pull_request.draft,
+    }
+    return GithubPullRequestFactory.create(bill=bill, **(fields | kwargs))
+
+
+class TestReconcilePullRequests:
+    def test_unchanged(self, fake_github: FakeGithub, bill: Bill):
+        fake_github.add_pull(_github_pull(bill))
+
+        reconcile_pull_requests()
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.OPEN
+        assert len(fake_github.requests) == 1
+
+    @patch.object(github_api, "PER_PAGE", 2)
+    def test_pages(self, fake_github: FakeGithub):
+        for bill in BillFactory.create_batch(5):
+            fake_github.add_pull(_github_pull(bill))
+
+        reconcile_pull_requests()
+
+        # Only the list of open pull requests, in pages of 2
+        assert len(fake_github.requests) == 3  # noqa: PLR2004
+        assert Bill.objects.filter(status=Bill.Status.OPEN).count() == 5  # noqa: PLR2004
+
+    def test_closed(self, fake_github: FakeGithub, bill: Bill):
+        draft = BillFactory.create(status=Bill.Status.DRAFT)
+
+        reconcile_pull_requests()
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.CLOSED
+        assert bill.pull_request.status == "closed"
+        draft.refresh_from_db()
+        assert draft.status == Bill.Status.CLOSED
+        assert bill.history.count() == 2  # noqa: PLR2004
+
+    def test_synchronize(self, fake_github: FakeGithub, bill: Bill):
+        pr = fake_github.add_pull(
+            _github_pull(bill, head={"sha": "a" * 40}, additions=1234)
+        )
+
+        reconcile_pull_requests()
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.AMENDED
+        pull_request = bill.pull_request
+        assert pull_request.sha == "a" * 40
+        assert pull_request.additions == 1234  # noqa: PLR2004
+        assert pull_request.diff_url == pr["diff_url"]
+        # The list, then the pull request in full for the number of lines changed
+        assert fake_github.requests[1].endswith(f"/pulls/{pull_request.number}")
+
+    def test_ready_for_review(self, fake_github: FakeGithub):
+        bill = BillFactory.create(status=Bill.Status.DRAFT, pull_request__draft=True)
+        fake_github.add_pull(_github_pull(bill, draft=False))
+
+        reconcile_pull_requests()
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.OPEN
+        assert bill.voting_ends_at is not None
+        assert bill.pull_request.draft is False
+
+    def test_edited(self, fake_github: FakeGithub, bill: Bill):
+        fake_github.add_pull(_github_pull(bill, title="New title"))
+
+        reconcile_pull_requests()
+
+        bill.refresh_from_db()
+        assert bill.status == Bill.Status.OPEN
+        assert bill.pull_request.title == "New title"
+
+    def test_opened(self, fake_github: FakeGithub, user: User):
+        pr = GithubPullRequestFactory.create(number=1)
+        pr["user"]["id"] = SocialAccount.objects.create(
+            user=user, provider="github", uid=faker.Faker().random_int()
+        ).uid
+        fake_github.add_pull(pr)
+
+        reconcile_pull_requests()
+
+        pull_request = PullRequest.objects.get(number=pr["number"])
+        bill = pull_request.bill_set.get()
+        assert bill.author == user
+        assert bill.status == Bill.Status.OPEN
+
+    def test_reopened(self, fake_github: FakeGithub):
+        bill = BillFactory.create(
+            status=Bill.Status.CLOSED, pull_request__status="closed"
+        )
+        fake_github.add_pull(_github_pull(bill))
+
+        with patch.object(PullRequestHandler, "opened") as mock_opened:
+            reconcile_pull_requests()
+
+        mock_opened.assert_called_once()
+        assert mock_opened.call_args.args[0]["number"] == bill.pull_request.number
+
+    @patch.object(tasks.reconcile_pull_requests, "apply_async")
+    @patch.object(github_api, "wait_time", return_value=30)
+    def test_deferred_for_rate_limit(self, mock_wait, mock_apply):
+        reconcile_pull_requests()
+
+        mock_apply.assert_called_once_with((), countdown=30)
+
+
+class TestPullRequestHandler:
+    @pytest.fixture
+    def pr_handler(self):
+        return PullRequestHandler()
+
+    @patch.object(PullRequestHandler, "opened")
+    def test_pr_handler_dispatch(self, mock_opened, bill, pr_handler):
+        mock_opened.return_value = (bill.pull_request, bill)
+
+        result = pr_handler({"action": "opened", "pull_request": {"number": 1}})
+
+        mock_opened.assert_called_once_with({"number": 1})
+        assert result == {
+            "action": "opened",
+            "pull_request": bill.pull_request.number,
+            "bill": bill.id,
+        }
+
+    def test_pr_handler_dispatch_invalid(self, pr_handler: PullRequestHandler):
+        with pytest.raises(ValueError, match="Unsupported action: test"):
+            pr_handler({"action": "test", "pull_request": {"number": 1}})
+
+    @patch("requests.get")
+    def test_opened(self, mock_get, user: User, pr_handler: PullRequestHandler):
+        mock_get.return_value.iter_content.return_value = []
+        pr = GithubPullRequestFactory.create()
+        pr["user"]["id"] = SocialAccount.objects.create(
+            user=user,
+            provider="github",
+            uid=faker.Faker().random_int(),
+        ).uid
+
+        pull_request, bill = pr_handler.opened(pr)
+
+        assert pull_request is not None
+        assert bill is not None
+        assert bill.author == user
+
+    @patch("requests.get")
+    def test_opened_draft(self, mock_get, user: User, pr_handler: PullRequestHandler):
+        mock_get.return_value.iter_content.return_value = []
+        pr = GithubPullRequestFactory.create(draft=True)
+        pr["user"]["id"] = SocialAccount.objects.create(
+            user=user,
+            provider="github",
+            uid=faker.Faker().random_int(),
+        ).uid
+
+        pull_request, bill = pr_handler.opened(pr)
+
+        assert pull_request is not None
+        assert pull_request.draft is True
+        assert bill is not None
+        assert bill.status == Bill.Status.DRAFT
+        assert bill.voting_ends_at is None
+
+    def test_ready_for_review(self, pr_handler: PullRequestHandler):
+        bill = BillFactory.create(status=Bill.Status.DRAFT)
+        bill.pull_request.draft = True
+        bill.pull_request.save()
+
+        pull_request, published_bill = pr_handler.ready_for_review(
+            {"number": bill.pull_request.number}
+        )
+
+        assert pull_request is not None
+        assert pull_request.draft is False
+        assert published_bill is not None
+        published_bill.refresh_from_db()
+        assert published_bill.status == Bill.Status.OPEN
+        assert published_bill.voting_ends_at is not None
+
+    def test_ready_for_review_no_pr(self, pr_handler: PullRequestHandler):
+        result = pr_handler.ready_for_review({"number": 1})
+        assert result == (None, None)
+
+    def test_ready_for_review_no_draft_bill(
+        self, pr_handler: PullRequestHandler, bill: Bill
+    ):
+        pull_request, result_bill = pr_handler.ready_for_review(
+            {"number": bill.pull_request.number}
+        )
+
+        assert pull_request is not None
+        assert result_bill is None
+
+    @patch.object(PullRequestHandler, "opened")
+    def test_reopened(self, mock_opened, pr_handler: PullRequestHandler):
+        # Basically just for 100% coverage
+        response = pr_handler.reopened({})
+
+        mock_opened.assert_called_once_with({})
+        assert response == mock_opened.return_value
+
+    def test_closed_no_pr(self, pr_handler: PullRequestHandler):
+        response = pr_handler.closed({"number": 1})
+        assert response == (None, None)
+
+    @patch.object(PullRequest, "close")
+    def test_closed(self, mock_close, pr_handler: PullRequestHandler, bill: Bill):
+        response = pr_handler.closed({"number": bill.pull_request.number})
+
+        assert response == (bill.pull_request, mock_close.return_value)
+        mock_close.assert_called_once()
+
+    def test_synchronize(self, pr_handler: PullRequestHandler):
+        bill = BillFactory.create(status=Bill.Status.OPEN)
+        pr = GithubPullRequestFactory.create(bill=bill)
+
+        pull_request, amended_bill = pr_handler.synchronize(pr)
+
+        assert pull_request is not None
+        assert amended_bill is not None
+        amended_bill.refresh_from_db()
+        assert amended_bill.status == Bill.Status.AMENDED
+
+    def test_synchronize_no_open_bill(self, pr_handler: PullRequestHandler):
+        # Default GithubPullRequestFactory creates a closed bill (no active bill)
+        pr = GithubPullRequestFactory.create()
+
+        pull_request, bill = pr_handler.synchronize(pr)
+
+        assert pull_request is not None
+        assert bill is None
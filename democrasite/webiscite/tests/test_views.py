@@ -1,5 +1,6 @@
 import json
 from http import HTTPStatus
+from unittest.mock import patch
 
 import pytest
 from django.conf import settings
@@ -50,6 +51,28 @@ class TestBillListView:
         assert closed_bill not in queryset
         assert queryset.first().user_vote is None
 
+    @patch.object(views.BillListView, "paginate_by", 2)
+    def test_pages(self, client: Client):
+        bills = BillFactory.create_batch(3)
+        url = reverse("webiscite:index")
+
+        response = client.get(url)
+
+        assert list(response.context["bill_list"]) == bills[:2]
+        next_cursor = response.context["page_obj"].next_cursor
+        assert f"?cursor={next_cursor}" in response.content.decode()
+
+        response = client.get(url, {"cursor": next_cursor})
+
+        assert list(response.context["bill_list"]) == bills[2:]
+        assert not response.context["page_obj"].has_next
+
+    @pytest.mark.parametrize("cursor", ["invalid", "QAAAAAAAAAAAAAAAAAAAAQ"])
+    def test_invalid_cursor(self, client: Client, cursor: str):
+        response = client.get(reverse("webiscite:index"), {"cursor": cursor})
+
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
 
 class TestBillProposalsView:
     def test_get_queryset(self, bill: Bill, rf: RequestFactory):
@@ -170,6 +193,16 @@ class TestBillUpdateView:
         messages = [m.message for m in response.context["messages"]]
         assert messages == ["Information successfully updated"]
 
+    def test_bills_changed(self, bill: Bill, client: Client):
+        client.force_login(bill.author)
+
+        with patch.object(views.bills_changed, "send") as send:
+            client.post(
+                bill.get_update_url(), data={"name": "test", "description": "testing"}
+            )
+
+        send.assert_called_once_with(sender=Bill, bill_ids=[bill.pk])
+
 
 class TestVoteView:
     # I'd normally give a method-based view method-based tests, but this has many tests
@@ -218,3 +251,20 @@ class TestVoteView:
         assert data["yes-votes"] == (1 if vote == "vote-yes" else 0)
         assert data["no-votes"] == (1 if vote == "vote-no" else 0)
         assert user.votes.filter(pk=bill.pk).exists()
+
+    def test_vote_queries(
+        self, rf: RequestFactory, user: User, bill: Bill, django_assert_num_queries
+    ):
+        request = rf.post("/fake-url/", data={"vote": "vote-yes"})
+        request.user = user
+
+        # One query to fetch the bill and one to record the vote
+        with django_assert_num_queries(2):
+            views.vote_view(request, bill.id)
+
+    def test_vote_not_found(self, rf: RequestFactory, user: User):
+        request = rf.post("/fake-url/", data={"vote": "vote-yes"})
+        request.user = user
+
+        with pytest.raises(Http404):
+            views.vote_view(request, 0)
@@ -5,21 +5,15 @@ from typing import cast
 from unittest.mock import patch
 
 import pytest
-from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
 from django.http import HttpResponse
-from django.http import JsonResponse
 from django.test import RequestFactory
 from django.utils.encoding import force_bytes
-from factory.faker import faker
+from prometheus_client import REGISTRY
 
-from democrasite.users.models import User
-from democrasite.webiscite.models import Bill
-from democrasite.webiscite.models import PullRequest
-from democrasite.webiscite.tests.factories import BillFactory
-from democrasite.webiscite.tests.factories import GithubPullRequestFactory
+from democrasite.webiscite.models import WebhookDelivery
+from democrasite.webiscite.tests.factories import WebhookDeliveryFactory
 from democrasite.webiscite.webhooks import GithubWebhookView
-from democrasite.webiscite.webhooks import PullRequestHandler
 from democrasite.webiscite.webhooks import github_webhook_view
 
 
@@ -115,127 +109,76 @@ class TestGithubHookView:
         assert response.status_code == HTTPStatus.OK
         assert response.content == b"push received"
 
-
-class TestPullRequestHandler:
     @pytest.fixture
-    def pr_handler(self):
-        return GithubWebhookView().pull_request
-
-    @patch.object(PullRequestHandler, "opened")
-    def test_pr_handler_dispatch(self, mock_opened, bill, pr_handler):
-        mock_opened.return_value = (bill.pull_request, bill)
-
-        response = pr_handler({"action": "opened", "pull_request": {"number": 1}})
-
-        mock_opened.assert_called_once_with({"number": 1})
-        assert isinstance(response, JsonResponse)
-
-    def test_pr_handler_dispatch_invalid(self, pr_handler: PullRequestHandler):
-        response = pr_handler({"action": "test", "pull_request": {"number": 1}})
-
-        assert response.status_code == HTTPStatus.BAD_REQUEST
-        assert response.content == b"Unsupported action: test"
-
-    @patch("requests.get")
-    def test_opened(self, mock_get, user: User, pr_handler: PullRequestHandler):
-        pr = GithubPullRequestFactory.create()
-        pr["user"]["id"] = SocialAccount.objects.create(
-            user=user,
-            provider="github",
-            uid=faker.Faker().random_int(),
-        ).uid
-
-        pull_request, bill = pr_handler.opened(pr)
-
-        assert pull_request is not None
-        assert bill is not None
-        assert bill.author == user
-
-    @patch("requests.get")
-    def test_opened_draft(self, mock_get, user: User, pr_handler: PullRequestHandler):
-        pr = GithubPullRequestFactory.create(draft=True)
-        pr["user"]["id"] = SocialAccount.objects.create(
-            user=user,
-            provider="github",
-            uid=faker.Faker().random_int(),
-        ).uid
-
-        pull_request, bill = pr_handler.opened(pr)
-
-        assert pull_request is not None
-        assert pull_request.draft is True
-        assert bill is not None
-        assert bill.status == Bill.Status.DRAFT
-        assert bill._submit_task is None  # noqa: SLF001
-
-    def test_ready_for_review(self, pr_handler: PullRequestHandler):
-        bill = BillFactory.create(status=Bill.Status.DRAFT)
-        bill.pull_request.draft = True
-        bill.pull_request.save()
-
-        pull_request, published_bill = pr_handler.ready_for_review(
-            {"number": bill.pull_request.number}
+    def pr_request(self, rf: RequestFactory):
+        request = rf.post(
+            "/fake-url/",
+            data=json.dumps({"action": "opened", "pull_request": {"number": -1}}),
+            content_type="application/json",
+            HTTP_X_GITHUB_EVENT="pull_request",
+            HTTP_X_GITHUB_DELIVERY="72d3162e-cc78-11e3-81ab-4c9367dc0958",
         )
 
-        assert pull_request is not None
-        assert pull_request.draft is False
-        assert published_bill is not None
-        published_bill.refresh_from_db()
-        assert published_bill.status == Bill.Status.OPEN
-        assert published_bill._submit_task is not None  # noqa: SLF001
-        assert published_bill._submit_task.enabled is True  # noqa: SLF001
+        request.META["HTTP_X_HUB_SIGNATURE_256"] = (
+            "sha256="
+            + hmac.new(
+                force_bytes(settings.WEBISCITE_GITHUB_WEBHOOK_SECRET),
+                msg=request.body,
+                digestmod="sha256",
+            ).hexdigest()
+        )
 
-    def test_ready_for_review_no_pr(self, pr_handler: PullRequestHandler):
-        result = pr_handler.ready_for_review({"number": 1})
-        assert result == (None, None)
+        return request
 
-    def test_ready_for_review_no_draft_bill(
-        self, pr_handler: PullRequestHandler, bill: Bill
+    @patch("democrasite.webiscite.webhooks.process_webhook")
+    def test_pull_request_queued(
+        self, mock_process, pr_request, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = github_webhook_view(pr_request)
+
+        assert response.status_code == HTTPStatus.ACCEPTED
+        delivery = WebhookDelivery.objects.get()
+        assert delivery.delivery_id == "72d3162e-cc78-11e3-81ab-4c9367dc0958"
+        assert delivery.action == "opened"
+        assert delivery.pull_request_number == -1
+        assert delivery.status == WebhookDelivery.Status.PENDING
+        mock_process.delay.assert_called_once_with(delivery.delivery_id)
+
+    @patch("democrasite.webiscite.webhooks.process_webhook")
+    def test_pull_request_redelivered(
+        self, mock_process, pr_request, django_capture_on_commit_callbacks
     ):
-        pull_request, result_bill = pr_handler.ready_for_review(
-            {"number": bill.pull_request.number}
+        WebhookDeliveryFactory.create(
+            delivery_id="72d3162e-cc78-11e3-81ab-4c9367dc0958"
+        )
+        dropped = REGISTRY.get_sample_value(
+            "webiscite_webhook_deliveries_total", {"outcome": "dropped"}
         )
 
-        assert pull_request is not None
-        assert result_bill is None
-
-    @patch.object(PullRequestHandler, "opened")
-    def test_reopened(self, mock_opened, pr_handler: PullRequestHandler):
-        # Basically just for 100% coverage
-        response = pr_handler.reopened({})
-
-        mock_opened.assert_called_once_with({})
-        assert response == mock_opened.return_value
-
-    def test_closed_no_pr(self, pr_handler: PullRequestHandler):
-        response = pr_handler.closed({"number": 1})
-        assert response == (None, None)
-
-    @patch.object(PullRequest, "close")
-    def test_closed(self, mock_close, pr_handler: PullRequestHandler, bill: Bill):
-        response = pr_handler.closed({"number": bill.pull_request.number})
-
-        assert response == (bill.pull_request, mock_close.return_value)
-        mock_close.assert_called_once()
-
-    def test_synchronize(self, pr_handler: PullRequestHandler):
-        bill = BillFactory.create(status=Bill.Status.OPEN)
-        pr = GithubPullRequestFactory.create(bill=bill)
-
-        pull_request, amended_bill = pr_handler.synchronize(pr)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = github_webhook_view(pr_request)
+
+        assert response.status_code == HTTPStatus.ACCEPTED
+        assert WebhookDelivery.objects.count() == 1
+        mock_process.delay.assert_not_called()
+        assert (
+            REGISTRY.get_sample_value(
+                "webiscite_webhook_deliveries_total", {"outcome": "dropped"}
+            )
+            == (dropped or 0) + 1
+        )
 
-        assert pull_request is not None
-        assert amended_bill is not None
-        amended_bill.refresh_from_db()
-        assert amended_bill.status == Bill.Status.AMENDED
-        assert amended_bill._submit_task is not None  # noqa: SLF001
-        assert amended_bill._submit_task.enabled is False  # noqa: SLF001
+    def test_pull_request_no_delivery(self, pr_request):
+        del pr_request.META["HTTP_X_GITHUB_DELIVERY"]
 
-    def test_synchronize_no_open_bill(self, pr_handler: PullRequestHandler):
-        # Default GithubPullRequestFactory creates a closed bill (no active bill)
-        pr = GithubPullRequestFactory.create()
+        self.check_response(
+            pr_request, 400, b"Request does not contain X-GITHUB-DELIVERY header"
+        )
 
-        pull_request, bill = pr_handler.synchronize(pr)
+    def test_pull_request_unsupported_action(self, signed_request):
+        signed_request.META["HTTP_X_GITHUB_EVENT"] = "pull_request"
+        signed_request.META["HTTP_X_GITHUB_DELIVERY"] = "1"
 
-        assert pull_request is not None
-        assert bill is None
+        self.check_response(signed_request, 400, b"Unsupported action: none")
+        assert not WebhookDelivery.objects.exists()
@@ -13,11 +13,32 @@ from django.views.generic import DetailView
 from django.views.generic import ListView
 from django.views.generic import UpdateView
 
+from . import pagination
 from .models import Bill
 from .models import ClosedBillVoteError
+from .signals import bills_changed
 
 
-class BillListView(ListView):
+class KeysetPaginationMixin:
+    """Paginate a list of bills by cursor instead of by page number
+
+    The cursor of the next page is ``page_obj.next_cursor``, and is passed back in the
+    ``cursor`` query parameter. See :mod:`~democrasite.webiscite.pagination`.
+    """
+
+    paginate_by = pagination.PAGE_SIZE
+    request: http.HttpRequest
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get("cursor")
+        try:
+            page = pagination.paginate(queryset, cursor, page_size)
+        except pagination.InvalidCursorError as e:
+            raise http.Http404(_("Invalid cursor")) from e
+        return (None, page, page.object_list, cursor is not None or page.has_next)
+
+
+class BillListView(KeysetPaginationMixin, ListView):
     """View listing all open bills. Used for webiscite:index."""
 
     model = Bill
@@ -38,7 +59,7 @@ class BillListView(ListView):
 bill_list_view = BillListView.as_view()
 
 
-class BillProposalsView(LoginRequiredMixin, ListView):
+class BillProposalsView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View for listing bills proposed by the current user."""
 
     model = Bill
@@ -63,7 +84,7 @@ class BillProposalsView(LoginRequiredMixin, ListView):
 bill_proposals_view = BillProposalsView.as_view()
 
 
-class BillVotesView(LoginRequiredMixin, ListView):
+class BillVotesView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View for listing bills voted on by the current user."""
 
     model = Bill
@@ -118,6 +139,11 @@ class BillUpdateView(UserPassesTestMixin, SuccessMessageMixin, UpdateView):
     def test_func(self):
         return self.get_object().author == self.request.user
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        bills_changed.send(sender=Bill, bill_ids=[self.object.pk])
+        return response
+
 
 bill_update_view = BillUpdateView.as_view()
 
@@ -155,13 +181,12 @@ def vote_view(request: http.HttpRequest, pk: int) -> http.HttpResponse:
             '"vote" must be one of ("vote-yes", "vote-no").'
         )
 
-    bill = Bill.objects.get(pk=pk)
+    bill = get_object_or_404(Bill, pk=pk)
     try:
         bill.vote(request.user, support=support)
     except ClosedBillVoteError as err:
         return http.HttpResponseForbidden(str(err))
 
-    bill = Bill.objects.get(pk=pk)  # refresh vote annotations
     return http.JsonResponse(
         {
             "yes-votes": bill.yes_count,
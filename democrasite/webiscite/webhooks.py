@@ -4,12 +4,12 @@ Each service that sends webhooks should have its own class-based view."""
 
 import hmac
 import json
+from http import HTTPStatus
 from logging import getLogger
-from typing import TYPE_CHECKING
-from typing import Any
 
 import requests
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpRequest
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
@@ -20,148 +20,21 @@ from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import Bill
-from .models import PullRequest
-
-if TYPE_CHECKING:
-    from collections.abc import Callable  # pragma: no cover
+from .metrics import WEBHOOK_DELIVERIES
+from .models import WebhookDelivery
+from .tasks import PullRequestHandler
+from .tasks import process_webhook
 
 logger = getLogger(__name__)
 
 
-class PullRequestHandler:
-    """Handle pull requests from GitHub webhooks"""
-
-    def __call__(self, payload: dict) -> HttpResponse:
-        """Handle a pull request from a GitHub webhook
-
-        Args:
-            payload: The parsed JSON object representing the pull request
-
-        Returns:
-            An object containing the primary keys of the pull request and bill affected,
-            if applicable
-        """
-        action = payload["action"]
-        handler: (
-            Callable[[dict[str, Any]], tuple[PullRequest | None, Bill | None]] | None
-        )
-        handler = getattr(self, action, None)
-        if handler is None:
-            logger.warning(
-                "GitHub pull request webhook failed with unsupported action: %s",
-                payload["action"],
-            )
-            return HttpResponseBadRequest(f"Unsupported action: {payload['action']}")
-
-        pull_request, bill = handler(payload["pull_request"])
-
-        response = {"action": action}
-        if pull_request is not None:
-            response["pull_request"] = pull_request.number
-        if bill is not None:
-            response["bill"] = bill.id
-
-        return JsonResponse(response)
-
-    def reopened(self, pr: dict[str, Any]) -> tuple[PullRequest, Bill | None]:
-        return self.opened(pr)
-
-    def opened(self, pr: dict[str, Any]) -> tuple[PullRequest, Bill | None]:
-        """Create a :class:`~democrasite.webiscite.models.PullRequest` and, if the
-        creator has an account, :class:`~democrasite.webiscite.models.Bill` instance
-        from a pull request
-
-        Args:
-            pr: The parsed JSON object representing the pull request
-
-        Returns:
-            A tuple containing the pull request and bill, if applicable
-        """
-        pull_request: PullRequest = PullRequest.objects.create_from_github(pr)
-
-        # pr["body"] is None if the body is empty
-        bill_desc = pr["body"] or ""
-        user_id = pr["user"]["id"]
-        bill = Bill.objects.create_from_github(pull_request, bill_desc, user_id)
-
-        return pull_request, bill
-
-    def ready_for_review(
-        self, pr: dict[str, Any]
-    ) -> tuple[PullRequest | None, Bill | None]:
-        """Publish the draft bill associated with the pull request
-
-        Args:
-            pr: The parsed JSON object representing the pull request
-        """
-        try:
-            pull_request = PullRequest.objects.get(number=pr["number"])
-        except PullRequest.DoesNotExist:
-            logger.warning(
-                "PR #%s: Nothing changed (no pull request found)", pr["number"]
-            )
-            return (None, None)
-
-        pull_request.draft = False
-        pull_request.save()
-
-        try:
-            bill: Bill = pull_request.bill_set.get(status=Bill.Status.DRAFT)
-        except Bill.DoesNotExist:
-            pull_request.log("No draft bill found")
-            return (pull_request, None)
-
-        bill.publish()
-        return (pull_request, bill)
-
-    def synchronize(self, pr: dict[str, Any]) -> tuple[PullRequest, Bill | None]:
-        """Handle new commits pushed to an open pull request.
-
-        Updates the pull request with the new SHA and closes any active bill
-        as amended, since votes on the old version no longer apply.
-
-        Args:
-            pr: The parsed JSON object representing the pull request
-
-        Returns:
-            A tuple containing the updated pull request and the closed bill, if any
-        """
-        pull_request = PullRequest.objects.create_from_github(pr)
-
-        try:
-            bill: Bill = pull_request.bill_set.get(status=Bill.Status.OPEN)
-        except Bill.DoesNotExist:
-            pull_request.log("No open bill found")
-            return (pull_request, None)
-
-        bill.close(status=Bill.Status.AMENDED)
-        return (pull_request, bill)
-
-    def closed(self, pr: dict[str, Any]) -> tuple[PullRequest | None, Bill | None]:
-        """Disables the open bill associated with the pull request
-
-        Args:
-            pr: The parsed JSON object representing the pull request
-        """
-        try:
-            pull_request = PullRequest.objects.get(number=pr["number"])
-        except PullRequest.DoesNotExist:
-            logger.warning(
-                "PR #%s: Nothing changed (no pull request found)", pr["number"]
-            )
-            return (None, None)
-
-        bill = pull_request.close()
-        return (pull_request, bill)
-
-
 # This class is largely adapted from https://github.com/fladi/django-github-webhook
 @method_decorator(csrf_exempt, name="dispatch")
 class GithubWebhookView(View):
     """View for GitHub webhook alerts
 
-    Verifies that the request is valid and, if so, creates a Celery task to process it
+    Verifies that the request is valid and, if so, stores the delivery and creates a
+    Celery task to process it, responding before it is processed
     """
 
     http_method_names = ["post"]
@@ -275,7 +148,46 @@ class GithubWebhookView(View):
     def push(self, payload: dict) -> HttpResponse:
         return HttpResponse("push received")
 
-    pull_request = PullRequestHandler()
+    def pull_request(self, payload: dict) -> HttpResponse:
+        """Store a pull request delivery and queue
+        :func:`~democrasite.webiscite.tasks.process_webhook` to process it
+
+        Args:
+            payload: The parsed JSON object representing the pull request event
+
+        Returns:
+            An accepted response with the id of the delivery
+        """
+        delivery_id = self.request.headers.get("x-github-delivery")
+        if delivery_id is None:
+            return HttpResponseBadRequest(
+                "Request does not contain X-GITHUB-DELIVERY header"
+            )
+
+        action = payload["action"]
+        if action not in PullRequestHandler.ACTIONS:
+            logger.warning(
+                "GitHub pull request webhook failed with unsupported action: %s", action
+            )
+            return HttpResponseBadRequest(f"Unsupported action: {action}")
+
+        # GitHub redelivers with the same id, which is only processed once
+        __, created = WebhookDelivery.objects.get_or_create(
+            delivery_id=delivery_id,
+            defaults={
+                "event": "pull_request",
+                "action": action,
+                "pull_request_number": payload["pull_request"]["number"],
+                "payload": payload,
+            },
+        )
+        if created:
+            transaction.on_commit(lambda: process_webhook.delay(delivery_id))
+        else:
+            logger.info("Dropped duplicate delivery %s", delivery_id)
+            WEBHOOK_DELIVERIES.labels(outcome="dropped").inc()
+
+        return JsonResponse({"delivery": delivery_id}, status=HTTPStatus.ACCEPTED)
 
 
 github_webhook_view = GithubWebhookView.as_view()